@@ -1,3 +1,4 @@
+from typing import Callable, Optional
 from pathlib import Path
 
 import pandas as pd
@@ -52,10 +53,18 @@ queries_dict = {
 
 
 class AcquireData:
-    def __init__(self, client: str, fname: str, data_dir_str: str = "raw_data"):
+    def __init__(
+        self,
+        client: str,
+        fname: str,
+        data_dir_str: str = "raw_data",
+        run_query: Optional[Callable[[str], pd.DataFrame]] = None,
+    ):
         self.client = client
         self.fname = fname
         self.data_dir_path = Path(data_dir_str)
+        # query function, e.g. QueryCache of the app (uncached Athena query if None)
+        self.run_query = run_query or FeatureStoreOfflineClient.run_athena_query_pandas
 
         if not self.data_dir_path.exists():
             self.data_dir_path.mkdir(parents=True, exist_ok=True)
@@ -64,9 +73,7 @@ class AcquireData:
         data = self._read_if_exists()
         if data.empty:
             if self.client in queries_dict.keys():
-                data = FeatureStoreOfflineClient.run_athena_query_pandas(
-                    queries_dict[self.client]
-                )
+                data = self.run_query(queries_dict[self.client])
             else:
                 raise ValueError(f"Client name {self.client} not found.")
         data.to_parquet(self.data_dir_path / self.fname)
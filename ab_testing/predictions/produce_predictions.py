@@ -1,4 +1,4 @@
-from typing import Dict, List, Union
+from typing import Dict, List, Tuple, Union, Iterable
 
 import numpy as np
 import pandas as pd
@@ -7,6 +7,7 @@ import pandas as pd
 from bayesian_testing.experiments import BinaryDataTest, DeltaLognormalDataTest
 
 from ab_testing.constants import target_col
+from ab_testing.predictions.stream_data import variant_stats_from_batches
 
 
 class ProducePredictions:
@@ -48,6 +49,30 @@ class ProducePredictions:
 
         return test.evaluate(seed=self.seed)
 
+    def produce_results_from_batches(
+        self, batches: Iterable
+    ) -> Tuple[List[Dict[str, Union[float, int]]], List[Dict[str, Union[float, int]]]]:
+        """
+        Conversion and lognorm revenue results from user level data coming in batches
+        (e.g. Parquet row groups from iter_parquet_batches or pandas chunks).
+        Data is read in one pass and only aggregated per variant, so whole dataset
+        does not need to fit in memory.
+        """
+        stats = variant_stats_from_batches(batches)
+
+        test_conversion = BinaryDataTest()
+        test_revenue = DeltaLognormalDataTest()
+        for name in ["P", "C"]:
+            test_conversion.add_variant_data_agg(
+                name, stats[name].totals, stats[name].positives
+            )
+            test_revenue.add_variant_data_stats(name, stats[name])
+
+        return (
+            test_conversion.evaluate(seed=self.seed),
+            test_revenue.evaluate(seed=self.seed),
+        )
+
     def _produce_results_lognorm_dist(
         self, df: pd.DataFrame
     ) -> List[Dict[str, Union[float, int]]]:
@@ -0,0 +1,73 @@
+from typing import Dict, Union, Iterable, Iterator, Sequence
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bayesian_testing.experiments import DeltaLognormalStats
+
+from ab_testing.constants import target_col
+
+# lower case test_group labels of personalised (P) and control (C) variants
+VARIANT_GROUPS: Dict[str, Sequence[str]] = {
+    "P": ("p", "assetario"),
+    "C": ("c", "control"),
+}
+
+
+def iter_parquet_batches(
+    path: Union[str, Path],
+    columns: Sequence[str] = ("test_group", target_col),
+    batch_size: int = None,
+) -> Iterator[pa.RecordBatch]:
+    """
+    Read Parquet file batch by batch, so that only one batch is in memory at once.
+    Parameters
+    ----------
+    path : Path to Parquet file.
+    columns : Columns to be read.
+    batch_size : Maximal number of rows in batch, whole row groups are read if None.
+    Returns
+    -------
+    batches : Iterator of Arrow record batches.
+    """
+    parquet_file = pq.ParquetFile(path)
+    if batch_size is None:
+        for i in range(parquet_file.num_row_groups):
+            yield from parquet_file.read_row_group(
+                i, columns=list(columns)
+            ).to_batches()
+    else:
+        yield from parquet_file.iter_batches(
+            batch_size=batch_size, columns=list(columns)
+        )
+
+
+def variant_stats_from_batches(
+    batches: Iterable[Union[pd.DataFrame, pa.RecordBatch, pa.Table]],
+    value_col: str = target_col,
+    group_col: str = "test_group",
+) -> Dict[str, DeltaLognormalStats]:
+    """
+    Aggregate user level data coming in batches (Parquet row groups, pandas chunks, ...)
+    to sufficient statistics of P and C variants, keeping constant memory.
+    Conversion statistics are given by totals and positives of the same statistics.
+    Parameters
+    ----------
+    batches : Iterable of pandas DataFrames or Arrow record batches (tables).
+    value_col : Column with user level revenue.
+    group_col : Column with test group of the user.
+    Returns
+    -------
+    stats : Dictionary with sufficient statistics of P and C variants.
+    """
+    stats = {name: DeltaLognormalStats() for name in VARIANT_GROUPS}
+    for batch in batches:
+        if not isinstance(batch, pd.DataFrame):
+            batch = batch.to_pandas()
+        groups = batch[group_col].str.lower()
+        for name, labels in VARIANT_GROUPS.items():
+            stats[name] += DeltaLognormalStats.from_data(
+                batch.loc[groups.isin(labels), value_col]
+            )
+    return stats
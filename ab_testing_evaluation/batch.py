@@ -0,0 +1,271 @@
+"""
+Evaluation of many A/B tests in one run. Aggregation queries of all tests are issued
+concurrently in a bounded thread pool (tests on the same source table share one merged
+query scanning the table once), tests are evaluated in a process pool and outputs are
+written in bulk, one object per output destination. A failed query or evaluation gives
+an error output of the affected tests only.
+Configs are read from JSONL file, one AbTestEvaluationConfig (as JSON object) per line.
+Usage: python batch.py --configs configs.jsonl [--query-workers 8] [--n-jobs -1]
+"""
+import json
+import logging
+import argparse
+from typing import Dict, List, Tuple, Union
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from testing import (
+    QueryBackend,
+    AbTestEvaluationConfig,
+    build_data_query,
+    evaluate_ab_test,
+    merged_query_key,
+    run_athena_query,
+    select_test_data,
+    build_error_output,
+    upload_output_to_s3,
+    build_too_early_output,
+    build_merged_data_query,
+    is_too_early_to_run_test,
+)
+from query_cache import QueryCache
+from bayesian_testing.utilities.common import parallel_map
+
+MAX_TESTS_PER_QUERY = 50
+
+logger = logging.getLogger(__name__)
+
+
+def load_configs(path: str) -> List[AbTestEvaluationConfig]:
+    """
+    Read test configurations from JSONL file (empty lines are skipped).
+    """
+    with open(path) as file:
+        return [
+            AbTestEvaluationConfig(**json.loads(line)) for line in file if line.strip()
+        ]
+
+
+def run_queries(
+    queries: List[str],
+    query_backend: QueryBackend = run_athena_query,
+    max_workers: int = 8,
+) -> Dict[str, Union[pd.DataFrame, Exception]]:
+    """
+    Run queries concurrently in a bounded thread pool, identical queries run only once.
+    Failure of a query does not stop the others.
+    Parameters
+    ----------
+    queries : SQL queries.
+    query_backend : Function running SQL query and returning its result as DataFrame.
+    max_workers : Maximal number of queries running at once.
+    Returns
+    -------
+    res : Dictionary {query: result}, result of a failed query is its exception.
+    """
+
+    def run_query(query: str) -> Union[pd.DataFrame, Exception]:
+        try:
+            return query_backend(query)
+        except Exception as error:
+            logger.exception("Data query failed.")
+            return error
+
+    distinct_queries = list(dict.fromkeys(queries))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(run_query, distinct_queries))
+    return dict(zip(distinct_queries, results))
+
+
+def plan_queries(
+    configs: List[AbTestEvaluationConfig],
+    merge: bool = True,
+    max_tests_per_query: int = MAX_TESTS_PER_QUERY,
+) -> List[Tuple[str, List[int]]]:
+    """
+    Plan data queries of tests. Tests with the same source table and datapoint type
+    are merged into one query (tests with the same ab_test_id but different configs go
+    to different queries), a single test gets the same query as in run_ab_testing.
+    Parameters
+    ----------
+    configs : Test configurations.
+    merge : Merge tests into shared queries, one query per test if False.
+    max_tests_per_query : Maximal number of distinct tests in one merged query.
+    Returns
+    -------
+    plan : List of (query, indices of configs using its result).
+    """
+    if not merge:
+        return [(build_data_query(config), [i]) for i, config in enumerate(configs)]
+
+    # scans of each merge key, scan is a dictionary {ab_test_id: indices of configs}
+    scans = defaultdict(list)
+    for i, config in enumerate(configs):
+        scans_of_key = scans[merged_query_key(config)]
+        for scan in scans_of_key:
+            if config.ab_test_id in scan:
+                if build_data_query(configs[scan[config.ab_test_id][0]]) == (
+                    build_data_query(config)
+                ):
+                    scan[config.ab_test_id].append(i)
+                    break
+            elif len(scan) < max_tests_per_query:
+                scan[config.ab_test_id] = [i]
+                break
+        else:
+            scans_of_key.append({config.ab_test_id: [i]})
+
+    plan = []
+    for scans_of_key in scans.values():
+        for scan in scans_of_key:
+            indices = [i for test_indices in scan.values() for i in test_indices]
+            if len(scan) == 1:
+                query = build_data_query(configs[indices[0]])
+            else:
+                query = build_merged_data_query(
+                    [configs[test_indices[0]] for test_indices in scan.values()]
+                )
+            plan.append((query, indices))
+    return plan
+
+
+def _evaluate_or_error(
+    config: AbTestEvaluationConfig, data_df: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Evaluate the test, failed evaluation gives an error output.
+    """
+    try:
+        return evaluate_ab_test(config, data_df)
+    except Exception as error:
+        logger.exception(f"Evaluation of test {config.ab_test_id} failed.")
+        return build_error_output(config, f"{type(error).__name__}: {error}")
+
+
+def run_ab_testing_batch(
+    configs: List[AbTestEvaluationConfig],
+    query_backend: QueryBackend = run_athena_query,
+    max_query_workers: int = 8,
+    n_jobs: int = None,
+    merge_queries: bool = True,
+) -> List[pd.DataFrame]:
+    """
+    Query and evaluate many tests, results are the same as of run_ab_testing per config.
+    Tests with a failed query or evaluation get an error output (see build_error_output).
+    Parameters
+    ----------
+    configs : Test configurations.
+    query_backend : Function running SQL query and returning its result as DataFrame.
+    max_query_workers : Maximal number of queries running at once.
+    n_jobs : Number of processes evaluating tests (None or 1 for no parallelism,
+        -1 for all CPUs).
+    merge_queries : Query tests on the same source table by one merged query.
+    Returns
+    -------
+    outputs : One row output DataFrame per config (in order of configs).
+    """
+    outputs = [None] * len(configs)
+    pending = []
+    for i, config in enumerate(configs):
+        if is_too_early_to_run_test(config):
+            outputs[i] = build_too_early_output(config)
+        else:
+            pending.append(i)
+
+    plan = plan_queries([configs[i] for i in pending], merge_queries)
+    query_results = run_queries(
+        [query for query, _ in plan], query_backend, max_query_workers
+    )
+
+    # fan out results of merged queries to tests
+    evaluated, data = [], []
+    for query, indices in plan:
+        data_df = query_results[query]
+        for i in indices:
+            config = configs[pending[i]]
+            if isinstance(data_df, Exception):
+                error = f"{type(data_df).__name__}: {data_df}"
+                outputs[pending[i]] = build_error_output(config, error)
+                continue
+            evaluated.append(pending[i])
+            if "ab_test_id" in data_df.columns:
+                data.append(select_test_data(data_df, config.ab_test_id))
+            else:
+                data.append(data_df)
+
+    results = parallel_map(
+        _evaluate_or_error, [[configs[i] for i in evaluated], data], n_jobs
+    )
+    for i, output in zip(evaluated, results):
+        outputs[i] = output
+    return outputs
+
+
+def upload_outputs_to_s3(
+    configs: List[AbTestEvaluationConfig],
+    outputs: List[pd.DataFrame],
+    bucket: str = None,
+    key: str = None,
+) -> None:
+    """
+    Write outputs in bulk, outputs with the same destination are written
+    as one JSON lines object.
+    Parameters
+    ----------
+    configs : Test configurations with output_bucket and output_key.
+    outputs : Output DataFrames of configs.
+    bucket : If set, all outputs are written to this bucket.
+    key : If set, all outputs are written under this key.
+    """
+    destinations = defaultdict(list)
+    for config, output in zip(configs, outputs):
+        destination = (bucket or config.output_bucket, key or config.output_key)
+        destinations[destination].append(output)
+
+    for (output_bucket, output_key), frames in destinations.items():
+        upload_output_to_s3(
+            output=pd.concat(frames, ignore_index=True),
+            bucket=output_bucket,
+            key=output_key,
+        )
+
+
+if __name__ == "__main__":
+    from ml_lib.util.sentry import configure_sentry
+
+    parser = argparse.ArgumentParser(description="Evaluate many A/B tests.")
+    parser.add_argument(
+        "--configs", required=True, help="JSONL file with test configs."
+    )
+    parser.add_argument("--query-workers", type=int, default=8)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument("--output-bucket", default=None)
+    parser.add_argument("--output-key", default=None)
+    parser.add_argument(
+        "--query-cache-dir", default=None, help="Cache query results in directory."
+    )
+    parser.add_argument(
+        "--query-cache-ttl", type=float, default=None, help="TTL in seconds."
+    )
+    args = parser.parse_args()
+
+    configure_sentry()
+
+    if args.query_cache_dir:
+        batch_query_backend = QueryCache(
+            args.query_cache_dir, args.query_cache_ttl, run_query=run_athena_query
+        )
+    else:
+        batch_query_backend = run_athena_query
+
+    ab_test_configs = load_configs(args.configs)
+    ab_testing_outputs = run_ab_testing_batch(
+        ab_test_configs,
+        batch_query_backend,
+        max_query_workers=args.query_workers,
+        n_jobs=args.n_jobs,
+    )
+    upload_outputs_to_s3(
+        ab_test_configs, ab_testing_outputs, args.output_bucket, args.output_key
+    )
@@ -1,7 +1,12 @@
 from .binary import BinaryDataTest
+from .results import EvaluationResult
 from .delta_lognormal import DeltaLognormalDataTest
+from .sufficient_stats import BinaryStats, DeltaLognormalStats
 
 __all__ = [
     "BinaryDataTest",
     "DeltaLognormalDataTest",
+    "BinaryStats",
+    "DeltaLognormalStats",
+    "EvaluationResult",
 ]
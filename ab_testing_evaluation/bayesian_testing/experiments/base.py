@@ -1,5 +1,12 @@
+import copy
 import warnings
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union, Iterable
+from collections import OrderedDict
+
+import numpy as np
+from bayesian_testing.metrics.evaluation import METRICS, validate_metrics
+from bayesian_testing.experiments.results import EvaluationResult
+from bayesian_testing.experiments.storage import VariantStore
 
 
 class BaseDataTest:
@@ -7,53 +14,207 @@ class BaseDataTest:
     Base class for Bayesian A/B test.
     """
 
-    def __init__(self) -> None:
+    # maximal number of evaluation results kept for a current class state
+    max_cached_results = 16
+    # stored fields of variant data and their dtypes
+    fields: Dict[str, type] = {}
+
+    def __init__(self, sampler: str = "pseudo", n_threads: int = None) -> None:
         """
         Initialize BaseDataTest class.
+        Parameters
+        ----------
+        sampler : Default source of simulation draws, "pseudo" or "sobol".
+        n_threads : Number of threads drawing and reducing simulations (-1 for all CPUs).
         """
-        self.data: dict = {}
+        self.data = VariantStore(self.fields)
+        self.sampler = sampler
+        self.n_threads = n_threads
+        self._results = OrderedDict()
 
     @property
     def variant_names(self):
-        return [k for k in self.data]
+        return list(self.data)
 
     def eval_simulation(
-        self, sim_count: int = 20000, seed: int = None
-    ) -> Tuple[dict, dict, dict, Dict[str, dict]]:
+        self,
+        sim_count: int = 20000,
+        seed: int = None,
+        engine: str = "simulation",
+        target_se: float = None,
+        max_sim_count: int = 1000000,
+        sampler: str = None,
+        as_result: bool = False,
+        metrics: Iterable[str] = None,
+    ) -> Union[Tuple[dict, dict, dict, Dict[str, dict]], EvaluationResult]:
         """
         Should be implemented in each individual experiment.
         """
         raise NotImplementedError
 
-    def probabs_of_being_best(self, sim_count: int = 20000, seed: int = None) -> dict:
+    def _data_key(self) -> tuple:
+        """
+        Key of a current class state (data and priors of all variants).
+        """
+        return self.data.state_key()
+
+    def _clear_results(self) -> None:
+        """
+        Invalidate cached evaluation results after change of class state.
+        """
+        self._results.clear()
+
+    def _eval_simulation_cached(
+        self,
+        sim_count: int = 20000,
+        seed: int = None,
+        engine: str = "simulation",
+        target_se: float = None,
+        max_sim_count: int = 1000000,
+        sampler: str = None,
+        metrics: Iterable[str] = None,
+    ) -> EvaluationResult:
+        """
+        Result of eval_simulation reused for the same class state and arguments.
+        Results are cached only if they are reproducible, i.e. the seed is set
+        or the engine is deterministic (no sampling involved). Cached results have
+        all metrics, so that they are reused for requests of any metrics.
+        """
+        sampler = sampler or self.sampler
+        validate_metrics(metrics)
+        if metrics is not None:
+            metrics = tuple(metric for metric in METRICS if metric in metrics)
+        args = (sim_count, seed, engine, target_se, max_sim_count, sampler)
+        if seed is None and engine == "simulation":
+            if metrics != ():
+                return self.eval_simulation(*args, as_result=True, metrics=metrics)
+            # posteriors alone do not depend on draws
+        else:
+            metrics = None
+
+        # threaded draws differ from single generator draws
+        key = (self._data_key(), self.n_threads) + args + (metrics,)
+        if key[:-1] + (None,) in self._results:
+            key = key[:-1] + (None,)
+        if key not in self._results:
+            self._results[key] = self.eval_simulation(
+                *args, as_result=True, metrics=metrics
+            )
+            if len(self._results) > self.max_cached_results:
+                self._results.popitem(last=False)
+        self._results.move_to_end(key)
+        # copy, so that changes of returned result do not affect the cache
+        return copy.deepcopy(self._results[key])
+
+    def probabs_of_being_best(
+        self,
+        sim_count: int = 20000,
+        seed: int = None,
+        engine: str = "simulation",
+        target_se: float = None,
+        max_sim_count: int = 1000000,
+        sampler: str = None,
+    ) -> dict:
         """
         Calculate probabilities of being best for a current class state.
         Parameters
         ----------
         sim_count : Number of simulations to be used for probability estimation.
         seed : Random seed.
+        engine : Evaluation engine (see eval_simulation of particular experiment).
+        target_se : If set, simulations are drawn in batches of sim_count until Monte Carlo
+            standard errors of all probabilities and expected losses are below it.
+        max_sim_count : Maximal number of simulations used when target_se is set.
+        sampler : Source of simulation draws, "pseudo" or "sobol" (class default if None).
         Returns
         -------
         pbbs : Dictionary with probabilities of being best for all variants in experiment.
         """
-        pbbs, loss, total_gain, posteriors = self.eval_simulation(sim_count, seed)
+        res = self._eval_simulation_cached(
+            sim_count,
+            seed,
+            engine,
+            target_se,
+            max_sim_count,
+            sampler,
+            ["prob_being_best"],
+        )
 
-        return pbbs
+        return res.to_dict("prob_being_best")
 
-    def expected_loss(self, sim_count: int = 20000, seed: int = None) -> dict:
+    def expected_loss(
+        self,
+        sim_count: int = 20000,
+        seed: int = None,
+        engine: str = "simulation",
+        target_se: float = None,
+        max_sim_count: int = 1000000,
+        sampler: str = None,
+    ) -> dict:
         """
         Calculate expected loss for a current class state.
         Parameters
         ----------
         sim_count : Number of simulations to be used for probability estimation.
         seed : Random seed.
+        engine : Evaluation engine (see eval_simulation of particular experiment).
+        target_se : If set, simulations are drawn in batches of sim_count until Monte Carlo
+            standard errors of all probabilities and expected losses are below it.
+        max_sim_count : Maximal number of simulations used when target_se is set.
+        sampler : Source of simulation draws, "pseudo" or "sobol" (class default if None).
         Returns
         -------
         loss : Dictionary with expected loss for all variants in experiment.
         """
-        pbbs, loss, total_gain, posteriors = self.eval_simulation(sim_count, seed)
+        res = self._eval_simulation_cached(
+            sim_count,
+            seed,
+            engine,
+            target_se,
+            max_sim_count,
+            sampler,
+            ["expected_loss"],
+        )
+
+        return res.to_dict("expected_loss")
+
+    @staticmethod
+    def _diagnostics_columns(
+        diagnostics: dict, n_variants: int
+    ) -> Dict[str, np.ndarray]:
+        """
+        Per-variant columns with Monte Carlo diagnostics of adaptive simulation.
+        """
+        return {
+            "pbb_se": diagnostics["pbb_se"],
+            "loss_se": diagnostics["loss_se"],
+            "sim_count": np.full(n_variants, diagnostics["sim_count"]),
+        }
 
-        return loss
+    @staticmethod
+    def _simulation_dicts(
+        res: EvaluationResult,
+    ) -> Tuple[dict, dict, dict, Dict[str, dict]]:
+        """
+        Result of eval_simulation as dictionaries of metrics and of posterior parameters
+        (and Monte Carlo diagnostics, if available) per variant.
+        """
+        metrics = ["prob_being_best", "expected_loss", "expected_total_gain"]
+        res_posteriors_all = {
+            name: res.to_dict(name) for name in res.keys() if name not in metrics
+        }
+        return (*[res.to_dict(name) for name in metrics], res_posteriors_all)
+
+    @staticmethod
+    def _add_diagnostics(res: EvaluationResult, eval_res: EvaluationResult) -> None:
+        """
+        Add Monte Carlo diagnostics (if available) to evaluation results per variant.
+        """
+        if "pbb_se" not in eval_res:
+            return
+        res["prob_being_best_se"] = eval_res["pbb_se"]
+        res["expected_loss_se"] = eval_res["loss_se"]
+        res["sim_count"] = eval_res["sim_count"]
 
     def delete_variant(self, name: str) -> None:
         """
@@ -70,3 +231,4 @@ class BaseDataTest:
             )
         else:
             del self.data[name]
+            self._clear_results()
@@ -1,9 +1,12 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union, Iterable
 from numbers import Number
 
+import numpy as np
 from bayesian_testing.metrics import eval_bernoulli_agg
 from bayesian_testing.utilities import get_logger
 from bayesian_testing.experiments.base import BaseDataTest
+from bayesian_testing.experiments.results import EvaluationResult
+from bayesian_testing.experiments.sufficient_stats import BinaryStats
 
 logger = get_logger("bayesian_testing")
 
@@ -15,109 +18,163 @@ class BinaryDataTest(BaseDataTest):
     Then to get results of the test, use for instance `evaluate` method.
     """
 
-    def __init__(self) -> None:
+    fields = {
+        "totals": np.int64,
+        "positives": np.int64,
+        "a_prior": np.float64,
+        "b_prior": np.float64,
+        "a_posterior": np.float64,
+        "b_posterior": np.float64,
+    }
+
+    def __init__(self, sampler: str = "pseudo", n_threads: int = None) -> None:
         """
         Initialize BinaryDataTest class.
+        Parameters
+        ----------
+        sampler : Default source of simulation draws, "pseudo" (pseudo-random numbers)
+            or "sobol" (scrambled Sobol points, see eval_simulation).
+        n_threads : Number of threads drawing and reducing "pseudo" simulations
+            (-1 for all CPUs), results are identical for any number of threads.
+            Not used in evaluations with target_se.
         """
-        super().__init__()
+        super().__init__(sampler, n_threads)
 
     @property
     def totals(self):
-        return [self.data[k]["totals"] for k in self.data]
+        return self.data.column("totals")
 
     @property
     def positives(self):
-        return [self.data[k]["positives"] for k in self.data]
+        return self.data.column("positives")
 
     @property
     def a_priors(self):
-        return [self.data[k]["a_prior"] for k in self.data]
+        return self.data.column("a_prior")
 
     @property
     def b_priors(self):
-        return [self.data[k]["b_prior"] for k in self.data]
+        return self.data.column("b_prior")
 
     def eval_simulation(
-        self, sim_count: int = 20000, seed: int = None
-    ) -> Tuple[dict, dict, dict, Dict[str, dict]]:
+        self,
+        sim_count: int = 20000,
+        seed: int = None,
+        engine: str = "simulation",
+        target_se: float = None,
+        max_sim_count: int = 1000000,
+        sampler: str = None,
+        as_result: bool = False,
+        metrics: Iterable[str] = None,
+    ) -> Union[Tuple[dict, dict, dict, Dict[str, dict]], EvaluationResult]:
         """
         Calculate probabilities of being best and expected loss for a current class state.
         Parameters
         ----------
         sim_count : Number of simulations to be used for probability estimation.
         seed : Random seed.
+        engine : Evaluation engine, "simulation", "exact" (two variants, no sampling)
+            or "quadrature" (numerical integration, no sampling).
+        target_se : If set, simulations are drawn in batches of sim_count until Monte Carlo
+            standard errors of all probabilities and expected losses are below it.
+        max_sim_count : Maximal number of simulations used when target_se is set.
+        sampler : Source of simulation draws, "pseudo" or "sobol" (class default if None).
+        as_result : If True, EvaluationResult with all metrics and posterior parameters
+            (columns "prob_being_best", ..., "a_posteriors", "b_posteriors") is returned.
+        metrics : Metrics to be computed, some of "prob_being_best", "expected_loss"
+            and "expected_total_gain" (all if None), others may be NaN. If empty, only
+            posterior parameters are computed without any sampling.
         Returns
         -------
         res_pbbs : Dictionary with probabilities of being best for all variants in experiment.
         res_loss : Dictionary with expected loss for all variants in experiment.
         """
-        pbbs, loss, total_gain, a_posteriors, b_posteriors = eval_bernoulli_agg(
-            self.totals, self.positives, self.a_priors, self.b_priors, sim_count, seed
+        (
+            pbbs,
+            loss,
+            total_gain,
+            a_posteriors,
+            b_posteriors,
+            diagnostics,
+        ) = eval_bernoulli_agg(
+            self.totals,
+            self.positives,
+            self.a_priors,
+            self.b_priors,
+            sim_count,
+            seed,
+            engine,
+            target_se=target_se,
+            max_sim_count=max_sim_count,
+            sampler=sampler or self.sampler,
+            metrics=metrics,
+            # adaptive simulation draws batches without threads
+            n_threads=None if target_se else self.n_threads,
         )
-        res_pbbs = dict(zip(self.variant_names, pbbs))
-        res_loss = dict(zip(self.variant_names, loss))
-        res_total_gain = dict(zip(self.variant_names, total_gain))
-        res_a_posteriors = dict(zip(self.variant_names, a_posteriors))
-        res_b_posteriors = dict(zip(self.variant_names, b_posteriors))
-
-        res_posteriors_all = {
-            "res_a_posteriors": a_posteriors,
-            "res_b_posteriors": b_posteriors,
+        columns = {
+            "prob_being_best": pbbs,
+            "expected_loss": loss,
+            "expected_total_gain": total_gain,
+            "a_posteriors": a_posteriors,
+            "b_posteriors": b_posteriors,
         }
+        if diagnostics is not None:
+            columns.update(self._diagnostics_columns(diagnostics, len(pbbs)))
+        res = EvaluationResult(self.variant_names, columns)
 
-        return res_pbbs, res_loss, res_total_gain, res_posteriors_all
+        return res if as_result else self._simulation_dicts(res)
 
-    def evaluate(self, sim_count: int = 20000, seed: int = None) -> List[dict]:
+    def evaluate(
+        self,
+        sim_count: int = 20000,
+        seed: int = None,
+        engine: str = "simulation",
+        target_se: float = None,
+        max_sim_count: int = 1000000,
+        sampler: str = None,
+        as_result: bool = False,
+        metrics: Iterable[str] = None,
+    ) -> Union[List[dict], EvaluationResult]:
         """
         Evaluation of experiment.
         Parameters
         ----------
         sim_count : Number of simulations to be used for probability estimation.
         seed : Random seed.
+        engine : Evaluation engine, "simulation", "exact" (two variants, no sampling)
+            or "quadrature" (numerical integration, no sampling).
+        target_se : If set, simulations are drawn in batches of sim_count until Monte Carlo
+            standard errors of all probabilities and expected losses are below it.
+        max_sim_count : Maximal number of simulations used when target_se is set.
+        sampler : Source of simulation draws, "pseudo" or "sobol" (class default if None).
+        as_result : If True, EvaluationResult backed by numpy arrays is returned
+            (use its to_dicts, to_frame or to_json views).
+        metrics : Metrics to be computed (see eval_simulation).
         Returns
         -------
         res : List of dictionaries with results per variant.
         """
-        keys = [
-            "variant",
-            "totals",
-            "positives",
-            "positive_rate",
-            "prob_being_best",
-            "expected_loss",
-            "expected_total_gain",
-            "a_post",
-            "b_post",
-        ]
-
-        positive_rate = [
-            round(i[0] / i[1], 5) for i in zip(self.positives, self.totals)
-        ]
-        (
-            eval_pbbs,
-            eval_loss,
-            eval_total_gain,
-            eval_posteriors,
-        ) = self.eval_simulation(sim_count, seed)
-        pbbs = list(eval_pbbs.values())
-        loss = list(eval_loss.values())
-        total_gain = list(eval_total_gain.values())
-        a_post = list(eval_posteriors["a_posteriors"].values())
-        b_post = list(eval_posteriors["b_posteriors"].values())
-        data = [
+        eval_res = self._eval_simulation_cached(
+            sim_count, seed, engine, target_se, max_sim_count, sampler, metrics
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            positive_rate = np.round(self.positives / self.totals, 5)
+        res = EvaluationResult(
             self.variant_names,
-            self.totals,
-            self.positives,
-            positive_rate,
-            pbbs,
-            loss,
-            total_gain,
-            a_post,
-            b_post,
-        ]
-        res = [dict(zip(keys, item)) for item in zip(*data)]
+            {
+                "totals": self.totals,
+                "positives": self.positives,
+                "positive_rate": positive_rate,
+                "prob_being_best": eval_res["prob_being_best"],
+                "expected_loss": eval_res["expected_loss"],
+                "expected_total_gain": eval_res["expected_total_gain"],
+                "a_post": eval_res["a_posteriors"],
+                "b_post": eval_res["b_posteriors"],
+            },
+        )
+        self._add_diagnostics(res, eval_res)
 
-        return res
+        return res if as_result else res.to_dicts()
 
     def add_variant_data_agg(
         self,
@@ -160,6 +217,7 @@ class BinaryDataTest(BaseDataTest):
             msg = f"Variant {name} already exists - new data is replacing it. "
             logger.info(msg)
 
+        self._clear_results()
         self.data[name] = {
             "totals": totals,
             "positives": positives,
@@ -169,10 +227,35 @@ class BinaryDataTest(BaseDataTest):
             "b_posterior": totals - positives + b_prior,
         }
 
+    def add_variant_data_stats(
+        self,
+        name: str,
+        stats: BinaryStats,
+        a_prior: float = 0.5,
+        b_prior: float = 0.5,
+    ) -> None:
+        """
+        Add variant data to test class using sufficient statistics of binary data
+        (e.g. merged from several sources, see BinaryStats).
+        Default prior setup is set for Beta(1/2, 1/2) which is non-information prior.
+        Parameters
+        ----------
+        name : Variant name.
+        stats : BinaryStats with all aggregated data of a variant.
+        a_prior : Prior alpha parameter for Beta distributions.
+        b_prior : Prior beta parameter for Beta distributions.
+        """
+        if not isinstance(stats, BinaryStats):
+            raise ValueError("Input variable 'stats' is expected to be BinaryStats.")
+
+        self.add_variant_data_agg(
+            name, stats.totals, stats.positives, a_prior=a_prior, b_prior=b_prior
+        )
+
     def add_variant_data(
         self,
         name: str,
-        data: List[int],
+        data: Union[List[int], np.ndarray],
         a_prior: float = 0.5,
         b_prior: float = 0.5,
     ) -> None:
@@ -182,18 +265,70 @@ class BinaryDataTest(BaseDataTest):
         Parameters
         ----------
         name : Variant name.
-        data : List of binary data containing zeros (non-conversion) and ones (conversions).
+        data : Binary data containing zeros (non-conversion) and ones (conversions)
+            as list, numpy (e.g. boolean or uint8) array, pandas Series or Arrow array.
         a_prior : Prior alpha parameter for Beta distributions.
             Default value 0.5 is based on non-information prior Beta(0.5, 0.5).
         b_prior : Prior beta parameter for Beta distributions.
             Default value 0.5 is based on non-information prior Beta(0.5, 0.5).
         """
-        if len(data) == 0:
+        stats = BinaryStats.from_data(data)
+        if stats.totals == 0:
             raise ValueError("Data of added variant needs to have some observations.")
-        if not min([i in [0, 1] for i in data]):
-            raise ValueError("Input data needs to be a list of zeros and ones.")
 
-        totals = len(data)
-        positives = sum(data)
+        self.add_variant_data_stats(name, stats, a_prior=a_prior, b_prior=b_prior)
+
+    def add_variant_data_stream(
+        self,
+        name: str,
+        chunks: Iterable,
+        a_prior: float = 0.5,
+        b_prior: float = 0.5,
+    ) -> None:
+        """
+        Add variant data to test class using raw binary data coming in chunks
+        (e.g. Parquet row groups or pandas chunks). Only aggregated statistics are kept,
+        so memory does not grow with the size of data.
+        Default prior setup is set for Beta(1/2, 1/2) which is non-information prior.
+        Parameters
+        ----------
+        name : Variant name.
+        chunks : Iterable of chunks of binary data (see add_variant_data).
+        a_prior : Prior alpha parameter for Beta distributions.
+            Default value 0.5 is based on non-information prior Beta(0.5, 0.5).
+        b_prior : Prior beta parameter for Beta distributions.
+            Default value 0.5 is based on non-information prior Beta(0.5, 0.5).
+        """
+        stats = BinaryStats.from_chunks(chunks)
+        if stats.totals == 0:
+            raise ValueError("Data of added variant needs to have some observations.")
+
+        self.add_variant_data_stats(name, stats, a_prior=a_prior, b_prior=b_prior)
+
+    def add_variant_data_packed(
+        self,
+        name: str,
+        packed: np.ndarray,
+        totals: int,
+        a_prior: float = 0.5,
+        b_prior: float = 0.5,
+        bitorder: str = "big",
+    ) -> None:
+        """
+        Add variant data to test class using raw binary data packed into bits
+        (e.g. by np.packbits), i.e. 8 observations in one byte.
+        Default prior setup is set for Beta(1/2, 1/2) which is non-information prior.
+        Parameters
+        ----------
+        name : Variant name.
+        packed : Array of uint8 values with packed binary data.
+        totals : Number of observations (packed data is padded by zero bits to whole bytes).
+        a_prior : Prior alpha parameter for Beta distributions.
+            Default value 0.5 is based on non-information prior Beta(0.5, 0.5).
+        b_prior : Prior beta parameter for Beta distributions.
+            Default value 0.5 is based on non-information prior Beta(0.5, 0.5).
+        bitorder : Order of bits in bytes used for packing, "big" or "little".
+        """
+        stats = BinaryStats.from_packed(packed, totals, bitorder)
 
-        self.add_variant_data_agg(name, totals, positives, a_prior, b_prior)
+        self.add_variant_data_stats(name, stats, a_prior=a_prior, b_prior=b_prior)
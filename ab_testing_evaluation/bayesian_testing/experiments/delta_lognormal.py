@@ -1,11 +1,13 @@
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple, Union
 from numbers import Number
 
 import numpy as np
 
 from bayesian_testing.metrics import eval_delta_lognormal_agg
 from bayesian_testing.utilities import get_logger
+from bayesian_testing.experiments.sufficient_stats import DeltaLognormalStats
 from bayesian_testing.experiments.base import BaseDataTest
+from bayesian_testing.experiments.results import EvaluationResult
 
 logger = get_logger("bayesian_testing")
 
@@ -21,65 +23,110 @@ class DeltaLognormalDataTest(BaseDataTest):
     Then to get results of the test, use for instance `evaluate` method.
     """
 
-    def __init__(self) -> None:
+    fields = {
+        "totals": np.int64,
+        "positives": np.int64,
+        "sum_values": np.float64,
+        "sum_logs": np.float64,
+        "sum_logs_2": np.float64,
+        "a_prior_beta": np.float64,
+        "b_prior_beta": np.float64,
+        "m_prior": np.float64,
+        "a_prior_ig": np.float64,
+        "b_prior_ig": np.float64,
+        "w_prior": np.float64,
+    }
+
+    def __init__(
+        self, sampler: str = "pseudo", n_jobs: int = None, n_threads: int = None
+    ) -> None:
         """
         Initialize DeltaLognormalDataTest class.
+        Parameters
+        ----------
+        sampler : Default source of simulation draws, "pseudo" (pseudo-random numbers)
+            or "sobol" (scrambled Sobol points, see eval_simulation).
+        n_jobs : Number of processes sampling variants in parallel (-1 for all CPUs),
+            results are identical for any number of workers.
+        n_threads : Number of threads drawing and reducing "pseudo" simulations
+            of every variant (-1 for all CPUs), results are identical for any number
+            of threads. Not used in evaluations with target_se.
         """
-        super().__init__()
+        super().__init__(sampler, n_threads)
+        self.n_jobs = n_jobs
 
     @property
     def totals(self):
-        return [self.data[k]["totals"] for k in self.data]
+        return self.data.column("totals")
 
     @property
     def positives(self):
-        return [self.data[k]["positives"] for k in self.data]
+        return self.data.column("positives")
 
     @property
     def sum_values(self):
-        return [self.data[k]["sum_values"] for k in self.data]
+        return self.data.column("sum_values")
 
     @property
     def sum_logs(self):
-        return [self.data[k]["sum_logs"] for k in self.data]
+        return self.data.column("sum_logs")
 
     @property
     def sum_logs_2(self):
-        return [self.data[k]["sum_logs_2"] for k in self.data]
+        return self.data.column("sum_logs_2")
 
     @property
     def a_priors_beta(self):
-        return [self.data[k]["a_prior_beta"] for k in self.data]
+        return self.data.column("a_prior_beta")
 
     @property
     def b_priors_beta(self):
-        return [self.data[k]["b_prior_beta"] for k in self.data]
+        return self.data.column("b_prior_beta")
 
     @property
     def m_priors(self):
-        return [self.data[k]["m_prior"] for k in self.data]
+        return self.data.column("m_prior")
 
     @property
     def a_priors_ig(self):
-        return [self.data[k]["a_prior_ig"] for k in self.data]
+        return self.data.column("a_prior_ig")
 
     @property
     def b_priors_ig(self):
-        return [self.data[k]["b_prior_ig"] for k in self.data]
+        return self.data.column("b_prior_ig")
 
     @property
     def w_priors(self):
-        return [self.data[k]["w_prior"] for k in self.data]
+        return self.data.column("w_prior")
 
     def eval_simulation(
-        self, sim_count: int = 20000, seed: int = None
-    ) -> Tuple[dict, dict, dict, Dict[str, dict]]:
+        self,
+        sim_count: int = 20000,
+        seed: int = None,
+        engine: str = "simulation",
+        target_se: float = None,
+        max_sim_count: int = 1000000,
+        sampler: str = None,
+        as_result: bool = False,
+        metrics: Iterable[str] = None,
+    ) -> Union[Tuple[dict, dict, dict, Dict[str, dict]], EvaluationResult]:
         """
         Calculate probabilities of being best and expected loss for a current class state.
         Parameters
         ----------
         sim_count : Number of simulations to be used for probability estimation.
         seed : Random seed.
+        engine : Evaluation engine, "simulation" or "quadrature" (numerical integration
+            over posteriors of variant means, no sampling).
+        target_se : If set, simulations are drawn in batches of sim_count until Monte Carlo
+            standard errors of all probabilities and expected losses are below it.
+        max_sim_count : Maximal number of simulations used when target_se is set.
+        sampler : Source of simulation draws, "pseudo" or "sobol" (class default if None).
+        as_result : If True, EvaluationResult with all metrics and posterior parameters
+            (columns "prob_being_best", ..., "a_posteriors_beta", ...) is returned.
+        metrics : Metrics to be computed, some of "prob_being_best", "expected_loss"
+            and "expected_total_gain" (all if None), others may be NaN. If empty, only
+            posterior parameters are computed without any sampling.
         Returns
         -------
         res_pbbs : Dictionary with probabilities of being best for all variants in experiment.
@@ -95,6 +142,7 @@ class DeltaLognormalDataTest(BaseDataTest):
             b_posteriors_ig,
             w_posteriors,
             m_posteriors,
+            diagnostics,
         ) = eval_delta_lognormal_agg(
             self.totals,
             self.positives,
@@ -108,92 +156,90 @@ class DeltaLognormalDataTest(BaseDataTest):
             b_priors_ig=self.b_priors_ig,
             w_priors=self.w_priors,
             seed=seed,
+            engine=engine,
+            target_se=target_se,
+            max_sim_count=max_sim_count,
+            sampler=sampler or self.sampler,
+            metrics=metrics,
+            n_jobs=self.n_jobs,
+            # adaptive simulation draws batches without threads
+            n_threads=None if target_se else self.n_threads,
         )
-        res_pbbs = dict(zip(self.variant_names, pbbs))
-        res_loss = dict(zip(self.variant_names, loss))
-        res_total_gain = dict(zip(self.variant_names, total_gain))
-        res_a_posteriors_beta = dict(zip(self.variant_names, a_posteriors_beta))
-        res_b_posteriors_beta = dict(zip(self.variant_names, b_posteriors_beta))
-        res_a_posteriors_ig = dict(zip(self.variant_names, a_posteriors_ig))
-        res_b_posteriors_ig = dict(zip(self.variant_names, b_posteriors_ig))
-        res_w_posteriors = dict(zip(self.variant_names, w_posteriors))
-        res_m_posteriors = dict(zip(self.variant_names, m_posteriors))
-
-        res_posteriors_all = {
-            "a_posteriors_beta": res_a_posteriors_beta,
-            "b_posteriors_beta": res_b_posteriors_beta,
-            "a_posteriors_ig": res_a_posteriors_ig,
-            "b_posteriors_ig": res_b_posteriors_ig,
-            "w_posteriors": res_w_posteriors,
-            "m_posteriors": res_m_posteriors,
+        columns = {
+            "prob_being_best": pbbs,
+            "expected_loss": loss,
+            "expected_total_gain": total_gain,
+            "a_posteriors_beta": a_posteriors_beta,
+            "b_posteriors_beta": b_posteriors_beta,
+            "a_posteriors_ig": a_posteriors_ig,
+            "b_posteriors_ig": b_posteriors_ig,
+            "w_posteriors": w_posteriors,
+            "m_posteriors": m_posteriors,
         }
-        return (res_pbbs, res_loss, res_total_gain, res_posteriors_all)
+        if diagnostics is not None:
+            columns.update(self._diagnostics_columns(diagnostics, len(pbbs)))
+        res = EvaluationResult(self.variant_names, columns)
+
+        return res if as_result else self._simulation_dicts(res)
 
-    def evaluate(self, sim_count: int = 20000, seed: int = None) -> List[dict]:
+    def evaluate(
+        self,
+        sim_count: int = 20000,
+        seed: int = None,
+        engine: str = "simulation",
+        target_se: float = None,
+        max_sim_count: int = 1000000,
+        sampler: str = None,
+        as_result: bool = False,
+        metrics: Iterable[str] = None,
+    ) -> Union[List[dict], EvaluationResult]:
         """
         Evaluation of experiment.
         Parameters
         ----------
         sim_count : Number of simulations to be used for probability estimation.
         seed : Random seed.
+        engine : Evaluation engine, "simulation" or "quadrature" (numerical integration
+            over posteriors of variant means, no sampling).
+        target_se : If set, simulations are drawn in batches of sim_count until Monte Carlo
+            standard errors of all probabilities and expected losses are below it.
+        max_sim_count : Maximal number of simulations used when target_se is set.
+        sampler : Source of simulation draws, "pseudo" or "sobol" (class default if None).
+        as_result : If True, EvaluationResult backed by numpy arrays is returned
+            (use its to_dicts, to_frame or to_json views).
+        metrics : Metrics to be computed (see eval_simulation).
         Returns
         -------
         res : List of dictionaries with results per variant.
         """
-        keys = [
-            "variant",
-            "totals",
-            "positives",
-            "sum_values",
-            "avg_values",
-            "avg_positive_values",
-            "prob_being_best",
-            "expected_loss",
-            "expected_total_gain",
-            "a_post_beta",
-            "b_post_beta",
-            "a_post_ig",
-            "b_post_ig",
-            "w_post",
-            "m_post",
-        ]
-        avg_values = [round(i[0] / i[1], 5) for i in zip(self.sum_values, self.totals)]
-        avg_pos_values = [
-            round(i[0] / i[1], 5) for i in zip(self.sum_values, self.positives)
-        ]
-        (eval_pbbs, eval_loss, eval_total_gain, eval_posteriors) = self.eval_simulation(
-            sim_count, seed
+        eval_res = self._eval_simulation_cached(
+            sim_count, seed, engine, target_se, max_sim_count, sampler, metrics
         )
-        pbbs = list(eval_pbbs.values())
-        loss = list(eval_loss.values())
-        total_gain = list(eval_total_gain.values())
-        a_posteriors_beta = list(eval_posteriors["a_posteriors_beta"].values())
-        b_posteriors_beta = list(eval_posteriors["b_posteriors_beta"].values())
-        a_posteriors_ig = list(eval_posteriors["a_posteriors_ig"].values())
-        b_posteriors_ig = list(eval_posteriors["b_posteriors_ig"].values())
-        w_posteriors = list(eval_posteriors["w_posteriors"].values())
-        m_posteriors = list(eval_posteriors["m_posteriors"].values())
-
-        data = [
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg_values = np.round(self.sum_values / self.totals, 5)
+            avg_pos_values = np.round(self.sum_values / self.positives, 5)
+        res = EvaluationResult(
             self.variant_names,
-            self.totals,
-            self.positives,
-            [round(i, 5) for i in self.sum_values],
-            avg_values,
-            avg_pos_values,
-            pbbs,
-            loss,
-            total_gain,
-            a_posteriors_beta,
-            b_posteriors_beta,
-            a_posteriors_ig,
-            b_posteriors_ig,
-            w_posteriors,
-            m_posteriors,
-        ]
-        res = [dict(zip(keys, item)) for item in zip(*data)]
+            {
+                "totals": self.totals,
+                "positives": self.positives,
+                "sum_values": np.round(self.sum_values, 5),
+                "avg_values": avg_values,
+                "avg_positive_values": avg_pos_values,
+                "prob_being_best": eval_res["prob_being_best"],
+                "expected_loss": eval_res["expected_loss"],
+                "expected_total_gain": eval_res["expected_total_gain"],
+                "a_post_beta": eval_res["a_posteriors_beta"],
+                "b_post_beta": eval_res["b_posteriors_beta"],
+                "a_post_ig": eval_res["a_posteriors_ig"],
+                "b_post_ig": eval_res["b_posteriors_ig"],
+                "w_post": eval_res["w_posteriors"],
+                "m_post": eval_res["m_posteriors"],
+            },
+        )
+        self._add_diagnostics(res, eval_res)
 
-        return res
+        return res if as_result else res.to_dicts()
 
     def add_variant_data_agg(
         self,
@@ -253,6 +299,7 @@ class DeltaLognormalDataTest(BaseDataTest):
             msg = f"Variant {name} already exists - new data is replacing it. "
             logger.info(msg)
 
+        self._clear_results()
         self.data[name] = {
             "totals": totals,
             "positives": positives,
@@ -267,10 +314,56 @@ class DeltaLognormalDataTest(BaseDataTest):
             "w_prior": w_prior,
         }
 
+    def add_variant_data_stats(
+        self,
+        name: str,
+        stats: DeltaLognormalStats,
+        a_prior_beta: float = 0.5,
+        b_prior_beta: float = 0.5,
+        m_prior: float = 1,
+        a_prior_ig: float = 0,
+        b_prior_ig: float = 0,
+        w_prior: float = 0.01,
+    ) -> None:
+        """
+        Add variant data to test class using sufficient statistics of delta-lognormal data
+        (e.g. merged from several sources, see DeltaLognormalStats).
+        The goal of default prior setup is to be low information. It should be tuned with caution.
+        Parameters
+        ----------
+        name : Variant name.
+        stats : DeltaLognormalStats with all aggregated data of a variant.
+        a_prior_beta : Prior alpha parameter from Beta distribution for conversion part.
+        b_prior_beta : Prior beta parameter from Beta distribution for conversion part.
+        m_prior : Prior mean for logarithms of non-zero data.
+        a_prior_ig : Prior alpha from inverse gamma dist. for unknown variance of logarithms.
+        b_prior_ig : Prior beta from inverse gamma dist. for unknown variance of logarithms.
+        w_prior : Prior effective sample sizes for normal distribution of logarithms of data.
+        """
+        if not isinstance(stats, DeltaLognormalStats):
+            raise ValueError(
+                "Input variable 'stats' is expected to be DeltaLognormalStats."
+            )
+
+        self.add_variant_data_agg(
+            name,
+            stats.totals,
+            stats.positives,
+            stats.sum_values,
+            stats.sum_logs,
+            stats.sum_logs_2,
+            a_prior_beta=a_prior_beta,
+            b_prior_beta=b_prior_beta,
+            m_prior=m_prior,
+            a_prior_ig=a_prior_ig,
+            b_prior_ig=b_prior_ig,
+            w_prior=w_prior,
+        )
+
     def add_variant_data(
         self,
         name: str,
-        data: List[float],
+        data: Union[List[float], np.ndarray],
         a_prior_beta: float = 0.5,
         b_prior_beta: float = 0.5,
         m_prior: float = 1,
@@ -284,7 +377,8 @@ class DeltaLognormalDataTest(BaseDataTest):
         Parameters
         ----------
         name : Variant name.
-        data : List of delta-lognormal data (e.g. revenues in sessions).
+        data : Delta-lognormal data (e.g. revenues in sessions) as list, numpy array,
+            pandas Series or Arrow array.
         a_prior_beta : Prior alpha parameter from Beta distribution for conversion part.
         b_prior_beta : Prior beta parameter from Beta distribution for conversion part.
         m_prior : Prior mean for logarithms of non-zero data.
@@ -294,28 +388,59 @@ class DeltaLognormalDataTest(BaseDataTest):
             In theory b > 0, but as we always have at least one observation, we can start at 0.
         w_prior : Prior effective sample sizes for normal distribution of logarithms of data.
         """
-        if len(data) == 0:
+        stats = DeltaLognormalStats.from_data(data)
+        if stats.totals == 0:
             raise ValueError("Data of added variant needs to have some observations.")
-        if min(data) < 0:
-            raise ValueError("Input data needs to be a list of non-negative numbers.")
 
-        totals = len(data)
-        positives = sum(x > 0 for x in data)
-        sum_values = sum(data)
-        sum_logs = sum([np.log(x) for x in data if x > 0])
-        sum_logs_2 = sum([np.square(np.log(x)) for x in data if x > 0])
+        self.add_variant_data_stats(
+            name,
+            stats,
+            a_prior_beta=a_prior_beta,
+            b_prior_beta=b_prior_beta,
+            m_prior=m_prior,
+            a_prior_ig=a_prior_ig,
+            b_prior_ig=b_prior_ig,
+            w_prior=w_prior,
+        )
 
-        self.add_variant_data_agg(
+    def add_variant_data_stream(
+        self,
+        name: str,
+        chunks: Iterable,
+        a_prior_beta: float = 0.5,
+        b_prior_beta: float = 0.5,
+        m_prior: float = 1,
+        a_prior_ig: float = 0,
+        b_prior_ig: float = 0,
+        w_prior: float = 0.01,
+    ) -> None:
+        """
+        Add variant data to test class using raw delta-lognormal data coming in chunks
+        (e.g. Parquet row groups or pandas chunks). Only aggregated statistics are kept,
+        so memory does not grow with the size of data.
+        The goal of default prior setup is to be low information. It should be tuned with caution.
+        Parameters
+        ----------
+        name : Variant name.
+        chunks : Iterable of chunks of delta-lognormal data (see add_variant_data).
+        a_prior_beta : Prior alpha parameter from Beta distribution for conversion part.
+        b_prior_beta : Prior beta parameter from Beta distribution for conversion part.
+        m_prior : Prior mean for logarithms of non-zero data.
+        a_prior_ig : Prior alpha from inverse gamma dist. for unknown variance of logarithms.
+        b_prior_ig : Prior beta from inverse gamma dist. for unknown variance of logarithms.
+        w_prior : Prior effective sample sizes for normal distribution of logarithms of data.
+        """
+        stats = DeltaLognormalStats.from_chunks(chunks)
+        if stats.totals == 0:
+            raise ValueError("Data of added variant needs to have some observations.")
+
+        self.add_variant_data_stats(
             name,
-            totals,
-            positives,
-            sum_values,
-            sum_logs,
-            sum_logs_2,
-            a_prior_beta,
-            b_prior_beta,
-            m_prior,
-            a_prior_ig,
-            b_prior_ig,
-            w_prior,
+            stats,
+            a_prior_beta=a_prior_beta,
+            b_prior_beta=b_prior_beta,
+            m_prior=m_prior,
+            a_prior_ig=a_prior_ig,
+            b_prior_ig=b_prior_ig,
+            w_prior=w_prior,
         )
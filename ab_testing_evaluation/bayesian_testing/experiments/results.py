@@ -0,0 +1,114 @@
+import json
+import math
+from typing import Dict, List, Union, Iterable
+
+import numpy as np
+
+
+class EvaluationResult:
+    """
+    Evaluation results of experiment variants backed by numpy arrays, one array per metric
+    or posterior parameter in order of variants. Python objects (dictionaries, data frame,
+    JSON) are created only on request by to_dicts, to_frame and to_json views.
+    """
+
+    __slots__ = ("variants", "columns")
+
+    def __init__(
+        self,
+        variants: Iterable[str],
+        columns: Dict[str, Union[List, np.ndarray]],
+    ) -> None:
+        """
+        Initialize EvaluationResult class.
+        Parameters
+        ----------
+        variants : Variant names.
+        columns : Dictionary with column names and values for all variants.
+        """
+        self.variants = list(variants)
+        self.columns = {}
+        for name, values in columns.items():
+            self[name] = values
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __setitem__(self, name: str, values: Union[List, np.ndarray]) -> None:
+        # copy, so that later changes of experiment data do not change the result
+        values = np.array(values)
+        if values.shape != (len(self.variants),):
+            raise ValueError(
+                f"Column {name} needs {len(self.variants)} values, got {values.shape}."
+            )
+        self.columns[name] = values
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.columns
+
+    def __len__(self) -> int:
+        return len(self.variants)
+
+    def keys(self) -> List[str]:
+        """
+        Names of all columns (variant names are in column "variant" of views).
+        """
+        return list(self.columns)
+
+    def to_dict(self, name: str) -> dict:
+        """
+        Values of one column per variant.
+        Parameters
+        ----------
+        name : Column name.
+        Returns
+        -------
+        res : Dictionary {variant name: value}.
+        """
+        return dict(zip(self.variants, self.columns[name].tolist()))
+
+    def to_dicts(self) -> List[dict]:
+        """
+        Results per variant as list of dictionaries with Python values.
+        Returns
+        -------
+        res : List of dictionaries {"variant": name, column: value, ...}.
+        """
+        keys = ["variant"] + self.keys()
+        values = [self.variants] + [column.tolist() for column in self.columns.values()]
+        return [dict(zip(keys, row)) for row in zip(*values)]
+
+    def to_frame(self):
+        """
+        Results as pandas DataFrame with one row per variant.
+        Returns
+        -------
+        res : pandas DataFrame with column "variant" and all result columns.
+        """
+        import pandas as pd
+
+        return pd.DataFrame({"variant": self.variants, **self.columns})
+
+    def to_json(self, **kwargs) -> str:
+        """
+        Results as JSON list of objects per variant (NaN and infinite values are null).
+        Parameters
+        ----------
+        kwargs : Keyword arguments of json.dumps.
+        Returns
+        -------
+        res : JSON string.
+        """
+        rows = [
+            {
+                key: None
+                if isinstance(value, float) and not math.isfinite(value)
+                else value
+                for key, value in row.items()
+            }
+            for row in self.to_dicts()
+        ]
+        return json.dumps(rows, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(variants={self.variants}, columns={self.keys()})"
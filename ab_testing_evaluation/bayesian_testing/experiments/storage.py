@@ -0,0 +1,101 @@
+from typing import Dict, List, Iterator
+from collections.abc import MutableMapping
+
+import numpy as np
+
+
+class VariantStore(MutableMapping):
+    """
+    Columnar storage of variant data of one experiment.
+    Every field is kept in one contiguous numpy array (one row per variant) and variants
+    are looked up by name in O(1). It behaves like a dictionary of dictionaries
+    {variant name: {field: value}} with insertion order of variants.
+    """
+
+    __slots__ = ("fields", "_names", "_index", "_columns", "_size", "_capacity")
+
+    def __init__(self, fields: Dict[str, type], capacity: int = 4) -> None:
+        """
+        Initialize VariantStore class.
+        Parameters
+        ----------
+        fields : Dictionary with field names and their numpy dtypes.
+        capacity : Initial number of rows allocated for variants.
+        """
+        self.fields = dict(fields)
+        self._names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._columns = {
+            field: np.zeros(capacity, dtype=dtype) for field, dtype in fields.items()
+        }
+        self._size = 0
+        self._capacity = capacity
+
+    def _grow(self) -> None:
+        self._capacity = max(2 * self._capacity, 4)
+        for field, values in self._columns.items():
+            new_values = np.zeros(self._capacity, dtype=values.dtype)
+            new_values[: self._size] = values[: self._size]
+            self._columns[field] = new_values
+
+    def column(self, field: str) -> np.ndarray:
+        """
+        Read-only contiguous array with values of given field for all variants.
+        Parameters
+        ----------
+        field : Field name.
+        Returns
+        -------
+        res : Array of field values in order of variants.
+        """
+        res = self._columns[field][: self._size]
+        res.flags.writeable = False
+        return res
+
+    def state_key(self) -> tuple:
+        """
+        Hashable representation of all stored data (variant names and all columns).
+        """
+        return (tuple(self._names),) + tuple(
+            values[: self._size].tobytes() for values in self._columns.values()
+        )
+
+    def __getitem__(self, name: str) -> dict:
+        row = self._index[name]
+        return {field: values[row].item() for field, values in self._columns.items()}
+
+    def __setitem__(self, name: str, values: dict) -> None:
+        missing = set(self.fields) - set(values)
+        if missing:
+            raise ValueError(f"Missing fields {sorted(missing)} for variant {name}.")
+        row = self._index.get(name)
+        if row is None:
+            if self._size == self._capacity:
+                self._grow()
+            row = self._size
+            self._index[name] = row
+            self._names.append(name)
+            self._size += 1
+        for field, column in self._columns.items():
+            column[row] = values[field]
+
+    def __delitem__(self, name: str) -> None:
+        row = self._index.pop(name)
+        for values in self._columns.values():
+            values[row : self._size - 1] = values[row + 1 : self._size]
+        del self._names[row]
+        self._size -= 1
+        for i in range(row, self._size):
+            self._index[self._names[i]] = i
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._names))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._index
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())})"
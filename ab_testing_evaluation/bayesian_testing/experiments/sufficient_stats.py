@@ -0,0 +1,263 @@
+from typing import List, Union, Iterable
+
+import numpy as np
+from bayesian_testing.utilities.common import count_set_bits, to_numpy_array
+
+
+class BinaryStats:
+    """
+    Mergeable sufficient statistics of binary data (number of observations and ones).
+    Statistics of data chunks (e.g. Parquet row groups or data of separate processes)
+    can be computed independently and combined by `+` or `merge`.
+    """
+
+    __slots__ = ("totals", "positives")
+
+    def __init__(self, totals: int = 0, positives: int = 0) -> None:
+        """
+        Initialize BinaryStats class.
+        Parameters
+        ----------
+        totals : Number of observations (e.g. number of sessions).
+        positives : Number of ones (e.g. number of conversions).
+        """
+        self.totals = int(totals)
+        self.positives = int(positives)
+
+    @classmethod
+    def from_data(cls, data: Union[List[int], np.ndarray]) -> "BinaryStats":
+        """
+        Statistics of raw binary data.
+        Parameters
+        ----------
+        data : Binary data containing zeros (non-conversion) and ones (conversions)
+            as list, numpy (e.g. boolean or uint8) array, pandas Series or Arrow array.
+        Returns
+        -------
+        res : Statistics of the data.
+        """
+        data = to_numpy_array(data, dtype=None)
+        if len(data) == 0:
+            return cls()
+        if data.dtype == bool:
+            valid = True
+        elif np.issubdtype(data.dtype, np.integer):
+            valid = data.min() >= 0 and data.max() <= 1
+        else:
+            valid = np.all((data == 0) | (data == 1))
+        if not valid:
+            raise ValueError("Input data needs to be a list of zeros and ones.")
+        return cls(len(data), np.count_nonzero(data))
+
+    @classmethod
+    def from_packed(
+        cls, packed: np.ndarray, totals: int, bitorder: str = "big"
+    ) -> "BinaryStats":
+        """
+        Statistics of raw binary data packed into bits (e.g. by np.packbits).
+        Parameters
+        ----------
+        packed : Array of uint8 values with packed binary data.
+        totals : Number of observations (packed data is padded by zero bits to whole bytes).
+        bitorder : Order of bits in bytes used for packing, "big" or "little".
+        Returns
+        -------
+        res : Statistics of the data.
+        """
+        if bitorder not in ("big", "little"):
+            raise ValueError(
+                f"Bit order needs to be 'big' or 'little', got {bitorder!r}."
+            )
+        packed = to_numpy_array(packed, dtype=None)
+        if packed.dtype != np.uint8:
+            raise ValueError("Packed data needs to be an array of uint8 values.")
+        if totals < 0 or len(packed) != (totals + 7) // 8:
+            raise ValueError(
+                f"Packed data of {len(packed)} bytes cannot hold {totals} observations."
+            )
+        n_padding = 8 * len(packed) - totals
+        if n_padding:
+            if bitorder == "big":
+                padding = packed[-1] & ((1 << n_padding) - 1)
+            else:
+                padding = packed[-1] >> (8 - n_padding)
+            if padding:
+                raise ValueError("Padding bits of packed data need to be zeros.")
+        return cls(totals, count_set_bits(packed))
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable) -> "BinaryStats":
+        """
+        Statistics of raw binary data coming in chunks.
+        Parameters
+        ----------
+        chunks : Iterable of chunks of binary data (see from_data).
+        Returns
+        -------
+        res : Statistics of all chunks.
+        """
+        return sum((cls.from_data(chunk) for chunk in chunks), cls())
+
+    def merge(self, other: "BinaryStats") -> "BinaryStats":
+        """
+        Statistics of union of data of both statistics.
+        """
+        if not isinstance(other, BinaryStats):
+            raise TypeError(f"Cannot merge BinaryStats with {type(other).__name__}.")
+        return BinaryStats(self.totals + other.totals, self.positives + other.positives)
+
+    def __add__(self, other: "BinaryStats") -> "BinaryStats":
+        if not isinstance(other, BinaryStats):
+            return NotImplemented
+        return self.merge(other)
+
+    def __radd__(self, other) -> "BinaryStats":
+        # sum() starts with 0
+        if isinstance(other, int) and other == 0:
+            return self
+        return NotImplemented
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BinaryStats):
+            return NotImplemented
+        return (self.totals, self.positives) == (other.totals, other.positives)
+
+    def __getstate__(self) -> tuple:
+        return self.totals, self.positives
+
+    def __setstate__(self, state: tuple) -> None:
+        self.totals, self.positives = state
+
+    def __repr__(self) -> str:
+        return f"BinaryStats(totals={self.totals}, positives={self.positives})"
+
+
+class DeltaLognormalStats:
+    """
+    Mergeable sufficient statistics of delta-lognormal data (number of observations,
+    number of non-zero values, sum of values and sums of logarithms and their squares
+    of non-zero values). Statistics of data chunks (e.g. Parquet row groups or data
+    of separate processes) can be computed independently and combined by `+` or `merge`.
+    """
+
+    __slots__ = ("totals", "positives", "sum_values", "sum_logs", "sum_logs_2")
+
+    def __init__(
+        self,
+        totals: int = 0,
+        positives: int = 0,
+        sum_values: float = 0.0,
+        sum_logs: float = 0.0,
+        sum_logs_2: float = 0.0,
+    ) -> None:
+        """
+        Initialize DeltaLognormalStats class.
+        Parameters
+        ----------
+        totals : Number of observations (e.g. number of sessions).
+        positives : Number of non-zero values.
+        sum_values : Sum of values.
+        sum_logs : Sum of logarithms of non-zero values.
+        sum_logs_2 : Sum of logarithms squared of non-zero values.
+        """
+        self.totals = int(totals)
+        self.positives = int(positives)
+        self.sum_values = float(sum_values)
+        self.sum_logs = float(sum_logs)
+        self.sum_logs_2 = float(sum_logs_2)
+
+    @classmethod
+    def from_data(cls, data: Union[List[float], np.ndarray]) -> "DeltaLognormalStats":
+        """
+        Statistics of raw delta-lognormal data.
+        Parameters
+        ----------
+        data : Delta-lognormal data (e.g. revenues in sessions) as list, numpy array,
+            pandas Series or Arrow array.
+        Returns
+        -------
+        res : Statistics of the data.
+        """
+        data = to_numpy_array(data)
+        # also fails for NaN values
+        if not np.all(data >= 0):
+            raise ValueError("Input data needs to be a list of non-negative numbers.")
+
+        logs = np.log(data[data > 0])
+        return cls(
+            len(data),
+            len(logs),
+            np.sum(data),
+            np.sum(logs),
+            np.dot(logs, logs),
+        )
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable) -> "DeltaLognormalStats":
+        """
+        Statistics of raw delta-lognormal data coming in chunks.
+        Parameters
+        ----------
+        chunks : Iterable of chunks of delta-lognormal data (see from_data).
+        Returns
+        -------
+        res : Statistics of all chunks.
+        """
+        return sum((cls.from_data(chunk) for chunk in chunks), cls())
+
+    def merge(self, other: "DeltaLognormalStats") -> "DeltaLognormalStats":
+        """
+        Statistics of union of data of both statistics.
+        """
+        if not isinstance(other, DeltaLognormalStats):
+            raise TypeError(
+                f"Cannot merge DeltaLognormalStats with {type(other).__name__}."
+            )
+        return DeltaLognormalStats(
+            self.totals + other.totals,
+            self.positives + other.positives,
+            self.sum_values + other.sum_values,
+            self.sum_logs + other.sum_logs,
+            self.sum_logs_2 + other.sum_logs_2,
+        )
+
+    def __add__(self, other: "DeltaLognormalStats") -> "DeltaLognormalStats":
+        if not isinstance(other, DeltaLognormalStats):
+            return NotImplemented
+        return self.merge(other)
+
+    def __radd__(self, other) -> "DeltaLognormalStats":
+        # sum() starts with 0
+        if isinstance(other, int) and other == 0:
+            return self
+        return NotImplemented
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, DeltaLognormalStats):
+            return NotImplemented
+        return self.__getstate__() == other.__getstate__()
+
+    def __getstate__(self) -> tuple:
+        return (
+            self.totals,
+            self.positives,
+            self.sum_values,
+            self.sum_logs,
+            self.sum_logs_2,
+        )
+
+    def __setstate__(self, state: tuple) -> None:
+        (
+            self.totals,
+            self.positives,
+            self.sum_values,
+            self.sum_logs,
+            self.sum_logs_2,
+        ) = state
+
+    def __repr__(self) -> str:
+        return (
+            f"DeltaLognormalStats(totals={self.totals}, positives={self.positives}, "
+            f"sum_values={self.sum_values}, sum_logs={self.sum_logs}, "
+            f"sum_logs_2={self.sum_logs_2})"
+        )
@@ -1,6 +1,15 @@
-from .evaluation import eval_bernoulli_agg, eval_delta_lognormal_agg
+from .evaluation import (
+    eval_bernoulli_agg,
+    eval_bernoulli_batch,
+    eval_delta_lognormal_agg,
+    eval_delta_lognormal_batch,
+)
+from .posteriors import SimulationWorkspace
 
 __all__ = [
     "eval_bernoulli_agg",
+    "eval_bernoulli_batch",
     "eval_delta_lognormal_agg",
+    "eval_delta_lognormal_batch",
+    "SimulationWorkspace",
 ]
@@ -1,18 +1,58 @@
-import pdb
-from typing import List, Tuple, Union
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Tuple, Union, Iterable, Optional
 from numbers import Number
 
 import numpy as np
 
 from bayesian_testing.utilities import get_logger
+from bayesian_testing.utilities.common import (
+    thread_map,
+    parallel_map,
+    two_variant_differences,
+)
+from bayesian_testing.metrics.exact import eval_beta_exact
 from bayesian_testing.metrics.posteriors import (
+    BASE_DRAWS_CACHE,
+    THREAD_BLOCK_SIZE,
+    SimulationWorkspace,
     normal_posteriors,
     beta_posteriors_all,
     lognormal_posteriors,
+    beta_posteriors_batch,
+    beta_posteriors_chunks,
+    beta_posteriors_sampler,
+    beta_posteriors_sobol,
+    beta_posterior_params,
+    lognormal_posteriors_chunks,
+    lognormal_posteriors_sampler,
+    lognormal_posteriors_sobol,
+    sobol_uniforms,
+    lognormal_posterior_params,
+    delta_lognormal_posteriors_batch,
+)
+from bayesian_testing.metrics.quadrature import (
+    QuadratureError,
+    eval_beta_quadrature,
+    eval_delta_lognormal_quadrature,
 )
 
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover
+    njit = None
+
 logger = get_logger("bayesian_testing")
 
+ENGINES_BERNOULLI = ("simulation", "exact", "quadrature")
+ENGINES_DELTA_LOGNORMAL = ("simulation", "quadrature")
+SAMPLERS = ("pseudo", "sobol")
+DTYPES = (np.float64, np.float32)
+METRICS = ("prob_being_best", "expected_loss", "expected_total_gain")
+
+# default priors in the order of the last axis of batch priors arrays
+DEFAULT_PRIORS_BERNOULLI = [0.5, 0.5]
+DEFAULT_PRIORS_DELTA_LOGNORMAL = [0.5, 0.5, 1, 0, 0, 0.01]
+
 
 def validate_bernoulli_input(totals: List[int], positives: List[int]) -> None:
     """
@@ -26,6 +66,127 @@ def validate_bernoulli_input(totals: List[int], positives: List[int]) -> None:
         raise ValueError(msg)
 
 
+def validate_engine(engine: str, engines: Tuple[str, ...]) -> None:
+    """
+    Simple validation of selected evaluation engine.
+    """
+    if engine not in engines:
+        msg = f"Engine '{engine}' is not supported, use one of {list(engines)}."
+        logger.error(msg)
+        raise ValueError(msg)
+
+
+def validate_sampler(sampler: str, chunk_size: int, target_se: float) -> None:
+    """
+    Simple validation of selected posterior sampler.
+    """
+    if sampler not in SAMPLERS:
+        msg = f"Sampler '{sampler}' is not supported, use one of {list(SAMPLERS)}."
+        logger.error(msg)
+        raise ValueError(msg)
+    if sampler == "sobol" and (chunk_size or target_se):
+        msg = "Sobol sampler can be used only without chunk_size and target_se."
+        logger.error(msg)
+        raise ValueError(msg)
+
+
+def validate_simulation_options(
+    sampler: str,
+    chunk_size: int,
+    target_se: float,
+    n_threads: int,
+    workspace: SimulationWorkspace,
+    dtype: type,
+) -> None:
+    """
+    Simple validation that options of one-shot simulation are not combined with
+    simulations which would ignore them.
+    """
+    if chunk_size or target_se:
+        ignored = {
+            "n_threads": n_threads is not None,
+            "workspace": workspace is not None,
+            "dtype": np.dtype(dtype) != np.float64,
+        }
+    elif sampler == "sobol":
+        ignored = {"dtype": np.dtype(dtype) != np.float64}
+    else:
+        return
+    ignored = [option for option, is_set in ignored.items() if is_set]
+    if ignored:
+        msg = (
+            f"Options {ignored} can be used only with one-shot simulation "
+            f"(without chunk_size and target_se, dtype only with pseudo sampler)."
+        )
+        logger.error(msg)
+        raise ValueError(msg)
+
+
+def validate_dtype(dtype: type) -> None:
+    """
+    Simple validation of selected data type of simulations.
+    """
+    if np.dtype(dtype) not in DTYPES:
+        names = [np.dtype(supported).name for supported in DTYPES]
+        msg = (
+            f"Data type '{np.dtype(dtype).name}' is not supported, use one of {names}."
+        )
+        logger.error(msg)
+        raise ValueError(msg)
+
+
+def validate_metrics(metrics: Iterable[str]) -> None:
+    """
+    Simple validation of selected metrics (None means all metrics).
+    """
+    if metrics is None:
+        return
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        msg = f"Metrics {unknown} are not supported, use some of {list(METRICS)}."
+        logger.error(msg)
+        raise ValueError(msg)
+
+
+def _posteriors_only(metrics: Iterable[str]) -> bool:
+    """
+    True if no metric is requested, i.e. only posterior parameters are needed.
+    """
+    return metrics is not None and len(metrics) == 0
+
+
+def _simulation_array(data: Union[List[List[float]], np.ndarray]) -> np.ndarray:
+    """
+    Contiguous array of simulations, float32 data is kept in float32.
+    """
+    data = np.asarray(data)
+    dtype = np.float32 if data.dtype == np.float32 else np.float64
+    return np.ascontiguousarray(data, dtype=dtype)
+
+
+def validate_batch_input(
+    stats: np.ndarray, priors: np.ndarray, n_stats: int, default_priors: List[float]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Validation of batch inputs, priors are broadcasted to all tests and variants.
+    """
+    stats = np.asarray(stats, dtype=float)
+    if stats.ndim != 3 or stats.shape[2] != n_stats:
+        msg = f"Stats need to have shape (n_tests, n_variants, {n_stats}), got {stats.shape}."
+        logger.error(msg)
+        raise ValueError(msg)
+    if priors is None:
+        priors = default_priors
+    priors_shape = stats.shape[:2] + (len(default_priors),)
+    try:
+        priors = np.broadcast_to(np.asarray(priors, dtype=float), priors_shape)
+    except ValueError:
+        msg = f"Priors need to be broadcastable to shape {priors_shape}."
+        logger.error(msg)
+        raise ValueError(msg)
+    return stats, priors
+
+
 def estimate_probabilities(data: Union[List[List[float]], np.ndarray]) -> List[float]:
     """
     Estimate probabilities for variants considering simulated data from respective posteriors.
@@ -61,7 +222,6 @@ def estimate_expected_loss(data: Union[List[List[float]], np.ndarray]) -> List[f
     return res
 
 
-# TODO: For now this only works for the case of two variants and not more
 def estimate_expected_total_gain(
     data: Union[List[List[float]], np.ndarray]
 ) -> List[float]:
@@ -72,13 +232,292 @@ def estimate_expected_total_gain(
     data : List of simulated data for each variant.
     Returns
     -------
-    res : List of expected total gains for each variant.
+    res : List of expected total gains for each variant (NaN unless there are two variants).
     """
-    # pdb.set_trace()
-    res = list(np.mean(data - data[[1, 0], :], axis=1).round(7))
+    res = list(np.mean(two_variant_differences(data), axis=1).round(7))
     return res
 
 
+def _fused_sums_numpy(
+    data: np.ndarray,
+    workspace: SimulationWorkspace = None,
+    count_wins: bool = True,
+    sum_max: bool = True,
+) -> Tuple[np.ndarray, float, np.ndarray]:
+    """
+    Numbers of wins, sum of maximal values and sums of values of all variants.
+    Only arrays of size sim_count are created, no (n_variants, sim_count) temporaries
+    (and none at all if workspace is set). Sums are accumulated in float64.
+    Wins (zeros) or sum of maximal values (NaN) are skipped if they are not needed.
+    """
+    n_variants, sim_count = data.shape
+    value_sums = np.sum(data, axis=1, dtype=np.float64)
+    if workspace is None:
+        wins = np.zeros(n_variants, dtype=np.int64)
+        if count_wins:
+            wins = np.bincount(np.argmax(data, axis=0), minlength=n_variants)
+        max_sum = np.nan
+        if sum_max:
+            max_sum = float(np.sum(np.max(data, axis=0), dtype=np.float64))
+        return wins, max_sum, value_sums
+
+    # argmax over axis 0 copies data, wins are counted against maximal values instead
+    # (ties go to the first variant, as in argmax)
+    wins = np.zeros(n_variants, dtype=np.int64)
+    if not count_wins and not sum_max:
+        return wins, np.nan, value_sums
+    max_values = np.max(
+        data, axis=0, out=workspace.get("max_values", sim_count, data.dtype)
+    )
+    is_best = workspace.get("is_best", sim_count, bool)
+    has_best = workspace.get("has_best", sim_count, bool)
+    has_best[:] = False
+    for i in range(n_variants if count_wins else 0):
+        np.equal(data[i], max_values, out=is_best)
+        np.greater(is_best, has_best, out=is_best)
+        wins[i] = np.count_nonzero(is_best)
+        np.logical_or(has_best, is_best, out=has_best)
+    max_sum = float(np.sum(max_values, dtype=np.float64)) if sum_max else np.nan
+    return wins, max_sum, value_sums
+
+
+def _fused_sums_loop(data: np.ndarray) -> Tuple[np.ndarray, float, np.ndarray]:
+    """
+    Same as _fused_sums_numpy in one pass over simulations (compiled by numba if available).
+    Sums are accumulated in float64 also for float32 data.
+    """
+    n_variants, sim_count = data.shape
+    wins = np.zeros(n_variants, dtype=np.int64)
+    value_sums = np.zeros(n_variants)
+    max_sum = 0.0
+    for j in range(sim_count):
+        best = 0
+        best_value = data[0, j]
+        value_sums[0] += best_value
+        for i in range(1, n_variants):
+            value = data[i, j]
+            value_sums[i] += value
+            if value > best_value:
+                best = i
+                best_value = value
+        wins[best] += 1
+        max_sum += best_value
+    return wins, max_sum, value_sums
+
+
+if njit is not None:
+    # nogil, so that blocks of simulations can be reduced in threads
+    _fused_sums = njit(cache=True, nogil=True)(_fused_sums_loop)
+else:
+    _fused_sums = _fused_sums_numpy
+
+
+def estimate_metrics(
+    data: Union[List[List[float]], np.ndarray],
+    n_threads: int = None,
+    workspace: SimulationWorkspace = None,
+    metrics: Iterable[str] = None,
+) -> Tuple[List[float], List[float], List[float]]:
+    """
+    Estimate probabilities of being best, expected loss and expected total gain for variants
+    in one pass over simulated data from respective posteriors. Expected loss is computed as
+    mean(max_j X_j) - mean(X_i), so only counts and sums are needed.
+    Parameters
+    ----------
+    data : List of simulated data for each variant (float32 arrays are not converted).
+    n_threads : If set, blocks of THREAD_BLOCK_SIZE simulations are reduced by this many
+        threads (-1 for all CPUs) and partial sums are added in order of blocks.
+    workspace : Workspace for temporaries of the numpy reduction (used without threads
+        if numba is not available, compiled reduction needs no temporaries).
+    metrics : Metrics to be estimated (all if None), others are NaN. Reductions needed
+        only by other metrics are skipped by the numpy reduction.
+    Returns
+    -------
+    res_pbbs : List of probabilities of being best for each variant.
+    res_loss : List of expected loss for each variant.
+    res_total_gain : List of expected total gains for each variant.
+    """
+    data = _simulation_array(data)
+    n_variants, sim_count = data.shape
+    if metrics is None:
+        metrics = METRICS
+    if n_threads is None and njit is None:
+        wins, max_sum, value_sums = _fused_sums_numpy(
+            data,
+            workspace,
+            count_wins="prob_being_best" in metrics,
+            sum_max="expected_loss" in metrics,
+        )
+    elif n_threads is None:
+        wins, max_sum, value_sums = _fused_sums(data)
+    else:
+        blocks = [
+            data[:, start : start + THREAD_BLOCK_SIZE]
+            for start in range(0, sim_count, THREAD_BLOCK_SIZE)
+        ]
+        block_sums = thread_map(_fused_sums, [blocks], n_threads)
+        wins, max_sum, value_sums = [sum(sums) for sums in zip(*block_sums)]
+
+    res_pbbs = list((wins / sim_count).round(7))
+    res_loss = list(((max_sum - value_sums) / sim_count).round(7))
+    res_total_gain = list((two_variant_differences(value_sums) / sim_count).round(7))
+    res = res_pbbs, res_loss, res_total_gain
+    return tuple(
+        values if metric in metrics else [np.nan] * n_variants
+        for metric, values in zip(METRICS, res)
+    )
+
+
+def estimate_metrics_streaming(
+    chunks: Iterable[np.ndarray], n_variants: int
+) -> Tuple[List[float], List[float], List[float]]:
+    """
+    Estimate probabilities of being best, expected loss and expected total gain from
+    simulated data coming in chunks, keeping only running counts and sums in memory.
+    Parameters
+    ----------
+    chunks : Iterable of arrays of shape (n_variants, chunk) with simulated data.
+    n_variants : Number of variants.
+    Returns
+    -------
+    res_pbbs : List of probabilities of being best for each variant.
+    res_loss : List of expected loss for each variant.
+    res_total_gain : List of expected total gains for each variant.
+    """
+    wins = np.zeros(n_variants, dtype=np.int64)
+    max_sum = 0.0
+    value_sums = np.zeros(n_variants)
+    sim_count = 0
+    for data in chunks:
+        chunk_wins, chunk_max_sum, chunk_value_sums = _fused_sums(
+            _simulation_array(data)
+        )
+        wins += chunk_wins
+        max_sum += chunk_max_sum
+        value_sums += chunk_value_sums
+        sim_count += data.shape[1]
+
+    res_pbbs = list((wins / sim_count).round(7))
+    res_loss = list(((max_sum - value_sums) / sim_count).round(7))
+    res_total_gain = list((two_variant_differences(value_sums) / sim_count).round(7))
+    return res_pbbs, res_loss, res_total_gain
+
+
+def estimate_metrics_adaptive(
+    draw: Callable[[int], np.ndarray],
+    n_variants: int,
+    batch_size: int,
+    target_se: float,
+    max_sim_count: int,
+) -> Tuple[List[float], List[float], List[float], Dict]:
+    """
+    Estimate probabilities of being best, expected loss and expected total gain drawing
+    simulations in batches until Monte Carlo standard errors of all probabilities
+    and expected losses are below target_se (or max_sim_count simulations are used).
+    Parameters
+    ----------
+    draw : Function returning array of shape (n_variants, size) with new simulated data.
+    n_variants : Number of variants.
+    batch_size : Number of simulations drawn in one batch.
+    target_se : Target standard error of probabilities of being best and expected loss.
+    max_sim_count : Maximal number of simulations.
+    Returns
+    -------
+    res_pbbs : List of probabilities of being best for each variant.
+    res_loss : List of expected loss for each variant.
+    res_total_gain : List of expected total gains for each variant.
+    diagnostics : Dictionary with achieved standard errors "pbb_se" and "loss_se"
+        (lists for each variant) and number of simulations used "sim_count".
+    """
+    if batch_size <= 0 or max_sim_count < batch_size:
+        msg = (
+            f"Maximal number of simulations ({max_sim_count}) needs to be at least "
+            f"sim_count ({batch_size}), which needs to be positive."
+        )
+        logger.error(msg)
+        raise ValueError(msg)
+
+    wins = np.zeros(n_variants, dtype=np.int64)
+    loss_sums = np.zeros(n_variants)
+    loss_sums_2 = np.zeros(n_variants)
+    value_sums = np.zeros(n_variants)
+    sim_count = 0
+    while sim_count < max_sim_count:
+        data = draw(min(batch_size, max_sim_count - sim_count))
+        losses = np.max(data, axis=0) - data
+        wins += np.bincount(np.argmax(data, axis=0), minlength=n_variants)
+        loss_sums += np.sum(losses, axis=1)
+        loss_sums_2 += np.sum(losses**2, axis=1)
+        value_sums += np.sum(data, axis=1)
+        sim_count += data.shape[1]
+
+        pbbs = wins / sim_count
+        loss = loss_sums / sim_count
+        pbb_se = np.sqrt(pbbs * (1 - pbbs) / sim_count)
+        with np.errstate(invalid="ignore"):
+            loss_var = np.maximum(loss_sums_2 / sim_count - loss**2, 0)
+        loss_se = np.sqrt(loss_var / sim_count)
+        # NaN errors (e.g. from infinite loss) never reach the target
+        if np.all(pbb_se < target_se) and np.all(loss_se < target_se):
+            break
+
+    res_pbbs = list(pbbs.round(7))
+    res_loss = list(loss.round(7))
+    res_total_gain = list((two_variant_differences(value_sums) / sim_count).round(7))
+    diagnostics = {
+        "pbb_se": list(pbb_se.round(7)),
+        "loss_se": list(loss_se.round(7)),
+        "sim_count": sim_count,
+    }
+    return res_pbbs, res_loss, res_total_gain, diagnostics
+
+
+def estimate_probabilities_batch(data: np.ndarray) -> np.ndarray:
+    """
+    Estimate probabilities of being best for variants of many experiments at once.
+    Parameters
+    ----------
+    data : Array of shape (n_tests, n_variants, sim_count) with simulated data.
+    Returns
+    -------
+    res : Array of shape (n_tests, n_variants) with probabilities of being best.
+    """
+    n_tests, n_variants, sim_count = data.shape
+    winners = np.argmax(data, axis=1) + n_variants * np.arange(n_tests)[:, None]
+    counts = np.bincount(winners.ravel(), minlength=n_tests * n_variants)
+    return (counts.reshape(n_tests, n_variants) / sim_count).round(7)
+
+
+def estimate_expected_loss_batch(data: np.ndarray) -> np.ndarray:
+    """
+    Estimate expected losses for variants of many experiments at once.
+    Parameters
+    ----------
+    data : Array of shape (n_tests, n_variants, sim_count) with simulated data.
+    Returns
+    -------
+    res : Array of shape (n_tests, n_variants) with expected loss.
+    """
+    max_values = np.max(data, axis=1, keepdims=True)
+    return np.mean(max_values - data, axis=2).round(7)
+
+
+def estimate_expected_total_gain_batch(data: np.ndarray) -> np.ndarray:
+    """
+    Estimate expected total gains for variants of many experiments at once.
+    Parameters
+    ----------
+    data : Array of shape (n_tests, n_variants, sim_count) with simulated data.
+    Returns
+    -------
+    res : Array of shape (n_tests, n_variants) with expected total gains
+        (NaN unless there are two variants).
+    """
+    if data.shape[1] != 2:
+        return np.full(data.shape[:2], np.nan)
+    return np.mean(data - data[:, [1, 0], :], axis=2).round(7)
+
+
 def eval_bernoulli_agg(
     totals: List[int],
     positives: List[int],
@@ -86,7 +525,19 @@ def eval_bernoulli_agg(
     b_priors_beta: List[float] = None,
     sim_count: int = 20000,
     seed: int = None,
-) -> Tuple[List[float], List[float], List[float], List[float], List[float]]:
+    engine: str = "simulation",
+    tol: float = 1e-6,
+    chunk_size: int = None,
+    target_se: float = None,
+    max_sim_count: int = 1000000,
+    sampler: str = "pseudo",
+    n_threads: int = None,
+    workspace: SimulationWorkspace = None,
+    dtype: type = np.float64,
+    metrics: Iterable[str] = None,
+) -> Tuple[
+    List[float], List[float], List[float], List[float], List[float], Optional[dict]
+]:
     """
     Method estimating probabilities of being best and expected loss for beta-bernoulli
     aggregated data per variant.
@@ -98,31 +549,169 @@ def eval_bernoulli_agg(
     a_priors_beta : List of prior alpha parameters for Beta distributions for each variant.
     b_priors_beta : List of prior beta parameters for Beta distributions for each variant.
     seed : Random seed.
+    engine : Evaluation engine, one of:
+        "simulation" - Monte Carlo estimates from sim_count posterior samples,
+        "exact" - closed-form/finite-sum solution (two variants only, no sampling),
+            exact unless variants have different non-integer priors, which need
+            numerical integration of a base problem,
+        "quadrature" - numerical integration over posterior CDFs (no sampling).
+    tol : Absolute tolerance of "quadrature" engine results.
+    chunk_size : If set, simulations are drawn and reduced in chunks of this size,
+        so memory does not grow with sim_count. Results match the one-shot simulation.
+    target_se : If set, "simulation" engine draws batches of sim_count simulations until
+        Monte Carlo standard errors of all probabilities and expected losses are below it.
+    max_sim_count : Maximal number of simulations used when target_se is set
+        (at least sim_count).
+    sampler : Source of "simulation" engine draws, one of:
+        "pseudo" - pseudo-random draws from numpy generator,
+        "sobol" - scrambled Sobol points transformed by inverse CDFs of posteriors
+            (sim_count is rounded up to power of two, lower error for the same count).
+    n_threads : If set, one-shot "pseudo" simulation is drawn and reduced by this many
+        threads (-1 for all CPUs) in blocks with own generators. Results do not depend
+        on the number of threads, but differ from the single generator draws (None).
+        One-shot "sobol" simulation is only reduced by threads.
+        Not allowed with chunk_size or target_se.
+    workspace : If set, one-shot "pseudo" simulation is written into its buffers,
+        so repeated evaluations of the same size do not allocate new arrays.
+        Not allowed with chunk_size or target_se.
+    dtype : Data type of one-shot "pseudo" simulation, np.float64 or np.float32.
+        Only np.float64 is allowed with chunk_size, target_se or "sobol" sampler.
+        Float32 halves memory of simulations, sums are still accumulated in float64.
+        Beta draws are only rounded to float32, so results equal float64 ones
+        up to rounding (far below Monte Carlo error, see benchmarks/benchmark_float32.py).
+    metrics : Metrics to be estimated, some of "prob_being_best", "expected_loss",
+        "expected_total_gain" (all if None). Other metrics of one-shot "simulation" are NaN
+        and reductions needed only by them are skipped. If empty, only posterior parameters
+        are computed (no sampling, all metrics are NaN).
     Returns
     -------
     res_pbbs : List of probabilities of being best for each variant.
     res_loss : List of expected loss for each variant.
+    res_total_gain : List of expected total gains for each variant.
+    a_posteriors_beta : List of posterior alpha parameters for each variant.
+    b_posteriors_beta : List of posterior beta parameters for each variant.
+    diagnostics : Dictionary with achieved standard errors "pbb_se", "loss_se"
+        and number of simulations used "sim_count" if target_se is set, None otherwise.
     """
     validate_bernoulli_input(totals, positives)
+    validate_engine(engine, ENGINES_BERNOULLI)
+    validate_sampler(sampler, chunk_size, target_se)
+    validate_simulation_options(
+        sampler, chunk_size, target_se, n_threads, workspace, dtype
+    )
+    validate_dtype(dtype)
+    validate_metrics(metrics)
 
     if len(totals) == 0:
-        return [], []
+        return [], [], [], [], [], None
 
     # Default prior for all variants is Beta(0.5, 0.5) which is non-information prior.
-    if not a_priors_beta:
+    if a_priors_beta is None:
         a_priors_beta = [0.5] * len(totals)
-    if not b_priors_beta:
+    if b_priors_beta is None:
         b_priors_beta = [0.5] * len(totals)
 
-    beta_samples, a_posteriors_beta, b_posteriors_beta = beta_posteriors_all(
-        totals, positives, sim_count, a_priors_beta, b_priors_beta, seed
-    )
+    if engine in ["exact", "quadrature"] or _posteriors_only(metrics):
+        a_posteriors_beta, b_posteriors_beta = beta_posterior_params(
+            totals, positives, a_priors_beta, b_priors_beta
+        )
+        if _posteriors_only(metrics):
+            res_pbbs, res_loss, res_total_gain = [[np.nan] * len(totals)] * 3
+        elif engine == "exact":
+            res_pbbs, res_loss, res_total_gain = eval_beta_exact(
+                a_posteriors_beta, b_posteriors_beta
+            )
+        else:
+            res_pbbs, res_loss, res_total_gain = eval_beta_quadrature(
+                a_posteriors_beta, b_posteriors_beta, tol
+            )
+        return (
+            res_pbbs,
+            res_loss,
+            res_total_gain,
+            a_posteriors_beta,
+            b_posteriors_beta,
+            None,
+        )
+
+    if target_se:
+        a_posteriors_beta, b_posteriors_beta = beta_posterior_params(
+            totals, positives, a_priors_beta, b_priors_beta
+        )
+        draw = beta_posteriors_sampler(a_posteriors_beta, b_posteriors_beta, seed)
+        res_pbbs, res_loss, res_total_gain, diagnostics = estimate_metrics_adaptive(
+            draw, len(totals), sim_count, target_se, max_sim_count
+        )
+        return (
+            res_pbbs,
+            res_loss,
+            res_total_gain,
+            a_posteriors_beta,
+            b_posteriors_beta,
+            diagnostics,
+        )
+
+    if chunk_size:
+        a_posteriors_beta, b_posteriors_beta = beta_posterior_params(
+            totals, positives, a_priors_beta, b_priors_beta
+        )
+        chunks = beta_posteriors_chunks(
+            totals,
+            positives,
+            sim_count,
+            a_priors_beta,
+            b_priors_beta,
+            seed,
+            chunk_size,
+        )
+        res_pbbs, res_loss, res_total_gain = estimate_metrics_streaming(
+            chunks, len(totals)
+        )
+        return (
+            res_pbbs,
+            res_loss,
+            res_total_gain,
+            a_posteriors_beta,
+            b_posteriors_beta,
+            None,
+        )
+
+    if sampler == "sobol":
+        a_posteriors_beta, b_posteriors_beta = beta_posterior_params(
+            totals, positives, a_priors_beta, b_priors_beta
+        )
+        beta_samples = beta_posteriors_sobol(
+            a_posteriors_beta,
+            b_posteriors_beta,
+            sobol_uniforms(len(totals), sim_count, seed),
+        )
+    else:
+        beta_samples, a_posteriors_beta, b_posteriors_beta = beta_posteriors_all(
+            totals,
+            positives,
+            sim_count,
+            a_priors_beta,
+            b_priors_beta,
+            seed,
+            n_threads,
+            None
+            if workspace is None
+            else workspace.get("beta_samples", (len(totals), sim_count), dtype),
+            dtype,
+        )
 
-    res_pbbs = estimate_probabilities(beta_samples)
-    res_loss = estimate_expected_loss(beta_samples)
-    res_total_gain = estimate_expected_total_gain(beta_samples)
+    res_pbbs, res_loss, res_total_gain = estimate_metrics(
+        beta_samples, n_threads, workspace, metrics
+    )
 
-    return res_pbbs, res_loss, res_total_gain, a_posteriors_beta, b_posteriors_beta
+    return (
+        res_pbbs,
+        res_loss,
+        res_total_gain,
+        a_posteriors_beta,
+        b_posteriors_beta,
+        None,
+    )
 
 
 def eval_delta_lognormal_agg(
@@ -138,6 +727,19 @@ def eval_delta_lognormal_agg(
     b_priors_ig: List[float] = None,
     w_priors: List[float] = None,
     seed: int = None,
+    engine: str = "simulation",
+    tol: float = 1e-6,
+    chunk_size: int = None,
+    target_se: float = None,
+    max_sim_count: int = 1000000,
+    sampler: str = "pseudo",
+    cache_draws: bool = False,
+    n_jobs: int = None,
+    executor: Executor = None,
+    n_threads: int = None,
+    workspace: SimulationWorkspace = None,
+    dtype: type = np.float64,
+    metrics: Iterable[str] = None,
 ) -> Tuple[
     List[float],
     List[float],
@@ -148,6 +750,7 @@ def eval_delta_lognormal_agg(
     List[float],
     List[float],
     List[float],
+    Optional[dict],
 ]:
     """
     Method estimating probabilities of being best and expected loss for delta-lognormal
@@ -166,59 +769,311 @@ def eval_delta_lognormal_agg(
     b_priors_ig : List of prior betas from inverse gamma dist approximating variance of logarithms.
     w_priors : List of prior effective sample sizes for each variant.
     seed : Random seed.
+    engine : Evaluation engine, one of:
+        "simulation" - Monte Carlo estimates from sim_count posterior samples,
+        "quadrature" - numerical integration over posterior CDFs of means (no sampling),
+            falls back to "simulation" if results are not finite (few positives).
+    tol : Absolute tolerance of "quadrature" engine results.
+    chunk_size : If set, simulations are drawn and reduced in chunks of this size,
+        so memory does not grow with sim_count. Results match the one-shot simulation.
+    target_se : If set, "simulation" engine draws batches of sim_count simulations until
+        Monte Carlo standard errors of all probabilities and expected losses are below it.
+    max_sim_count : Maximal number of simulations used when target_se is set
+        (at least sim_count).
+    sampler : Source of "simulation" engine draws, one of:
+        "pseudo" - pseudo-random draws from numpy generator,
+        "sobol" - scrambled Sobol points transformed by inverse CDFs of posteriors
+            (sim_count is rounded up to power of two, lower error for the same count).
+    cache_draws : If True and seed is set, standard Gamma and Normal draws of one-shot
+        "pseudo" simulation are cached and only rescaled by posterior parameters
+        in repeated evaluations (results are the same as without cache). Useful for
+        repeated evaluations with the same seed and sim_count (e.g. grid of priors),
+        process-wide cache holds at most BASE_DRAWS_CACHE.max_bytes.
+        Cache is not used when variants are sampled in parallel.
+    n_jobs : Number of processes sampling variants of one-shot "pseudo" simulation
+        in parallel (-1 for all CPUs). Every variant has its own child seed,
+        so results are identical for any number of workers.
+    executor : Existing process or thread pool used instead of n_jobs.
+    n_threads : If set, one-shot "pseudo" simulation of every variant is drawn and reduced
+        by this many threads (-1 for all CPUs) in blocks with own generators. Results do not
+        depend on the number of threads, but differ from the single generator draws (None).
+        Cache of draws is not used with threads. One-shot "sobol" simulation is only
+        reduced by threads. Not allowed with chunk_size or target_se.
+    workspace : If set, one-shot "pseudo" simulation and its intermediate results are
+        computed in place in its buffers, so repeated evaluations of the same size
+        do not allocate new arrays (results are the same). Not used with n_jobs or executor.
+        Not allowed with chunk_size or target_se.
+    dtype : Data type of one-shot "pseudo" simulation, np.float64 or np.float32.
+        Only np.float64 is allowed with chunk_size, target_se or "sobol" sampler.
+        Float32 halves memory of simulations, sums are still accumulated in float64
+        and cache of draws is not used.
+        Float32 normal and gamma draws come from other generator routines than float64
+        ones, so results differ by Monte Carlo error of the evaluation (two estimates
+        with about the same standard error, rounding to float32 is far below it,
+        see benchmarks/benchmark_float32.py).
+    metrics : Metrics to be estimated, some of "prob_being_best", "expected_loss",
+        "expected_total_gain" (all if None). Other metrics of one-shot "simulation" are NaN
+        and reductions needed only by them are skipped. If empty, only posterior parameters
+        are computed (no sampling, all metrics are NaN).
     Returns
     -------
     res_pbbs : List of probabilities of being best for each variant.
     res_loss : List of expected loss for each variant.
     res_total_gain: List of expected total gain for each variant.
+    a_posteriors_beta : List of posterior alpha parameters of Beta distributions.
+    b_posteriors_beta : List of posterior beta parameters of Beta distributions.
+    a_posteriors_ig : List of posterior alpha parameters of Inverse Gamma distributions.
+    b_posteriors_ig : List of posterior beta parameters of Inverse Gamma distributions.
+    w_posteriors : List of posterior w parameters of Normal distributions.
+    m_posteriors : List of posterior m parameters of Normal distributions.
+    diagnostics : Dictionary with achieved standard errors "pbb_se", "loss_se"
+        and number of simulations used "sim_count" if target_se is set, None otherwise.
     """
+    validate_engine(engine, ENGINES_DELTA_LOGNORMAL)
+    validate_sampler(sampler, chunk_size, target_se)
+    validate_simulation_options(
+        sampler, chunk_size, target_se, n_threads, workspace, dtype
+    )
+    validate_dtype(dtype)
+    validate_metrics(metrics)
+
     if len(totals) == 0:
-        return [], [], [], [], [], [], [], [], []
+        return [], [], [], [], [], [], [], [], [], None
     # Same default priors for all variants if they are not provided.
-    if not a_priors_beta:
+    if a_priors_beta is None:
         a_priors_beta = [0.5] * len(totals)
-    if not b_priors_beta:
+    if b_priors_beta is None:
         b_priors_beta = [0.5] * len(totals)
-    if not m_priors:
+    if m_priors is None:
         m_priors = [1] * len(totals)
-    if not a_priors_ig:
+    if a_priors_ig is None:
         a_priors_ig = [0] * len(totals)
-    if not b_priors_ig:
+    if b_priors_ig is None:
         b_priors_ig = [0] * len(totals)
-    if not w_priors:
+    if w_priors is None:
         w_priors = [0.01] * len(totals)
 
-    if max(non_zeros) <= 0:
-        # if only zeros in all variants
-        res_pbbs = list(np.full(len(totals), round(1 / len(totals), 7)))
-        res_loss = [np.nan] * len(totals)
-        return (
-            res_pbbs,
-            res_loss,
-        )
-    else:
-        # we will need different generators for each call of lognormal_posteriors
-        ss = np.random.SeedSequence(seed)
-        child_seeds = ss.spawn(len(totals) + 1)
-
-        beta_samples, a_posteriors_beta, b_posteriors_beta = beta_posteriors_all(
-            totals, non_zeros, sim_count, a_priors_beta, b_priors_beta, child_seeds[0]
+    if (
+        max(non_zeros) <= 0
+        or engine == "quadrature"
+        or chunk_size
+        or target_se
+        or sampler == "sobol"
+        or _posteriors_only(metrics)
+    ):
+        a_posteriors_beta, b_posteriors_beta = beta_posterior_params(
+            totals, non_zeros, a_priors_beta, b_priors_beta
         )
-
-        lognorm_samples_and_post_vals = [
-            lognormal_posteriors(
+        normal_post_vals = [
+            lognormal_posterior_params(
                 non_zeros[i],
                 sum_logs[i],
                 sum_logs_2[i],
-                sim_count,
                 m_priors[i],
                 a_priors_ig[i],
                 b_priors_ig[i],
                 w_priors[i],
-                child_seeds[1 + i],
             )
             for i in range(len(totals))
         ]
+        a_posteriors_ig, b_posteriors_ig, w_posteriors, m_posteriors = [
+            list(vals) for vals in zip(*normal_post_vals)
+        ]
+
+        if max(non_zeros) <= 0:
+            # if only zeros in all variants
+            res_pbbs = list(np.full(len(totals), round(1 / len(totals), 7)))
+            res_loss, res_total_gain = [[np.nan] * len(totals)] * 2
+        elif _posteriors_only(metrics):
+            res_pbbs, res_loss, res_total_gain = [[np.nan] * len(totals)] * 3
+        elif engine == "quadrature":
+            try:
+                res_pbbs, res_loss, res_total_gain = eval_delta_lognormal_quadrature(
+                    a_posteriors_beta,
+                    b_posteriors_beta,
+                    a_posteriors_ig,
+                    b_posteriors_ig,
+                    w_posteriors,
+                    m_posteriors,
+                    tol,
+                )
+            except QuadratureError as error:
+                logger.warning(f"{error} Using simulation engine instead.")
+                return eval_delta_lognormal_agg(
+                    totals,
+                    non_zeros,
+                    sum_logs,
+                    sum_logs_2,
+                    sim_count=sim_count,
+                    a_priors_beta=a_priors_beta,
+                    b_priors_beta=b_priors_beta,
+                    m_priors=m_priors,
+                    a_priors_ig=a_priors_ig,
+                    b_priors_ig=b_priors_ig,
+                    w_priors=w_priors,
+                    seed=seed,
+                    engine="simulation",
+                    chunk_size=chunk_size,
+                    target_se=target_se,
+                    max_sim_count=max_sim_count,
+                    sampler=sampler,
+                    cache_draws=cache_draws,
+                    n_jobs=n_jobs,
+                    executor=executor,
+                    n_threads=n_threads,
+                    workspace=workspace,
+                    dtype=dtype,
+                    metrics=metrics,
+                )
+        elif sampler == "sobol":
+            n_variants = len(totals)
+            # independent dimensions for beta, inverse gamma and normal part of each variant
+            uniforms = sobol_uniforms(3 * n_variants, sim_count, seed)
+            beta_samples = beta_posteriors_sobol(
+                a_posteriors_beta, b_posteriors_beta, uniforms[:n_variants]
+            )
+            lognorm_samples = [
+                lognormal_posteriors_sobol(
+                    a_posteriors_ig[i],
+                    b_posteriors_ig[i],
+                    w_posteriors[i],
+                    m_posteriors[i],
+                    uniforms[n_variants + i],
+                    uniforms[2 * n_variants + i],
+                )
+                for i in range(n_variants)
+            ]
+            combined_samples = beta_samples * np.array(lognorm_samples)
+
+            res_pbbs, res_loss, res_total_gain = estimate_metrics(
+                combined_samples, n_threads, workspace, metrics
+            )
+        elif target_se:
+            child_seeds = np.random.SeedSequence(seed).spawn(len(totals) + 1)
+            draw_beta = beta_posteriors_sampler(
+                a_posteriors_beta, b_posteriors_beta, child_seeds[0]
+            )
+            draw_lognorm = [
+                lognormal_posteriors_sampler(
+                    non_zeros[i],
+                    sum_logs[i],
+                    sum_logs_2[i],
+                    m_priors[i],
+                    a_priors_ig[i],
+                    b_priors_ig[i],
+                    w_priors[i],
+                    child_seeds[1 + i],
+                )
+                for i in range(len(totals))
+            ]
+            res_pbbs, res_loss, res_total_gain, diagnostics = estimate_metrics_adaptive(
+                lambda size: draw_beta(size)
+                * np.array([draw(size) for draw in draw_lognorm]),
+                len(totals),
+                sim_count,
+                target_se,
+                max_sim_count,
+            )
+            return (
+                res_pbbs,
+                res_loss,
+                res_total_gain,
+                a_posteriors_beta,
+                b_posteriors_beta,
+                a_posteriors_ig,
+                b_posteriors_ig,
+                w_posteriors,
+                m_posteriors,
+                diagnostics,
+            )
+        else:
+            # same generators as in one-shot simulation below
+            child_seeds = np.random.SeedSequence(seed).spawn(len(totals) + 1)
+            beta_chunks = beta_posteriors_chunks(
+                totals,
+                non_zeros,
+                sim_count,
+                a_priors_beta,
+                b_priors_beta,
+                child_seeds[0],
+                chunk_size,
+            )
+            lognorm_chunks = [
+                lognormal_posteriors_chunks(
+                    non_zeros[i],
+                    sum_logs[i],
+                    sum_logs_2[i],
+                    sim_count,
+                    m_priors[i],
+                    a_priors_ig[i],
+                    b_priors_ig[i],
+                    w_priors[i],
+                    child_seeds[1 + i],
+                    chunk_size,
+                )
+                for i in range(len(totals))
+            ]
+            combined_chunks = (
+                beta_chunk * np.array([next(chunks) for chunks in lognorm_chunks])
+                for beta_chunk in beta_chunks
+            )
+            res_pbbs, res_loss, res_total_gain = estimate_metrics_streaming(
+                combined_chunks, len(totals)
+            )
+    else:
+        # we will need different generators for each call of lognormal_posteriors
+        ss = np.random.SeedSequence(seed)
+        child_seeds = ss.spawn(len(totals) + 1)
+        parallel = executor is not None or (n_jobs is not None and n_jobs != 1)
+        if cache_draws and seed is not None and not parallel and n_threads is None:
+            cache = BASE_DRAWS_CACHE
+        else:
+            cache = None
+        if parallel:
+            workspace = None
+
+        n_variants = len(totals)
+        if workspace is not None:
+            beta_samples = workspace.get("beta_samples", (n_variants, sim_count), dtype)
+            lognorm_out = workspace.get(
+                "lognorm_samples", (n_variants, sim_count), dtype
+            )
+        else:
+            beta_samples, lognorm_out = None, [None] * n_variants
+
+        beta_samples, a_posteriors_beta, b_posteriors_beta = beta_posteriors_all(
+            totals,
+            non_zeros,
+            sim_count,
+            a_priors_beta,
+            b_priors_beta,
+            child_seeds[0],
+            n_threads,
+            beta_samples,
+            dtype,
+        )
+
+        lognorm_samples_and_post_vals = parallel_map(
+            lognormal_posteriors,
+            [
+                non_zeros,
+                sum_logs,
+                sum_logs_2,
+                [sim_count] * n_variants,
+                m_priors,
+                a_priors_ig,
+                b_priors_ig,
+                w_priors,
+                child_seeds[1:],
+                [cache] * n_variants,
+                [n_threads] * n_variants,
+                [workspace] * n_variants,
+                list(lognorm_out),
+                [dtype] * n_variants,
+            ],
+            n_jobs,
+            executor,
+        )
 
         lognorm_samples = [
             lognorm_samples_and_post_vals[i][0] for i in range(len(totals))
@@ -232,13 +1087,14 @@ def eval_delta_lognormal_agg(
         w_posteriors = [lognorm_samples_and_post_vals[i][3] for i in range(len(totals))]
         m_posteriors = [lognorm_samples_and_post_vals[i][4] for i in range(len(totals))]
 
-        # pdb.set_trace()
+        if workspace is not None:
+            combined_samples = np.multiply(beta_samples, lognorm_out, out=beta_samples)
+        else:
+            combined_samples = beta_samples * lognorm_samples
 
-        combined_samples = beta_samples * lognorm_samples
-
-        res_pbbs = estimate_probabilities(combined_samples)
-        res_loss = estimate_expected_loss(combined_samples)
-        res_total_gain = estimate_expected_total_gain(combined_samples)
+        res_pbbs, res_loss, res_total_gain = estimate_metrics(
+            combined_samples, n_threads, workspace, metrics
+        )
 
     return (
         res_pbbs,
@@ -250,4 +1106,161 @@ def eval_delta_lognormal_agg(
         b_posteriors_ig,
         w_posteriors,
         m_posteriors,
+        None,
     )
+
+
+def _eval_block(
+    draw_posteriors: Callable,
+    stats: np.ndarray,
+    priors: np.ndarray,
+    sim_count: int,
+    seeds: List[np.random.SeedSequence],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Evaluate one block of experiments.
+    """
+    samples, posteriors = draw_posteriors(stats, priors, sim_count, seeds)
+    res_pbbs = estimate_probabilities_batch(samples)
+    res_loss = estimate_expected_loss_batch(samples)
+    res_total_gain = estimate_expected_total_gain_batch(samples)
+    return res_pbbs, res_loss, res_total_gain, posteriors
+
+
+def _eval_batch(
+    draw_posteriors: Callable,
+    stats: np.ndarray,
+    priors: np.ndarray,
+    sim_count: int,
+    seed: int,
+    block_size: int,
+    n_jobs: int = None,
+    executor: Executor = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Evaluate experiments in blocks of block_size tests to keep memory bounded.
+    Blocks can be evaluated in parallel. Every test has its own child seed,
+    so results do not depend on block_size nor on the number of workers.
+    """
+    n_tests = stats.shape[0]
+    seeds = np.random.SeedSequence(seed).spawn(n_tests)
+    blocks = [
+        slice(start, start + block_size) for start in range(0, n_tests, block_size)
+    ]
+
+    results = parallel_map(
+        _eval_block,
+        [
+            [draw_posteriors] * len(blocks),
+            [stats[block] for block in blocks],
+            [np.ascontiguousarray(priors[block]) for block in blocks],
+            [sim_count] * len(blocks),
+            [seeds[block] for block in blocks],
+        ],
+        n_jobs,
+        executor,
+    )
+    res_pbbs, res_loss, res_total_gain, posteriors = [
+        np.concatenate(res) for res in zip(*results)
+    ]
+    return res_pbbs, res_loss, res_total_gain, posteriors
+
+
+def eval_bernoulli_batch(
+    stats: np.ndarray,
+    priors: np.ndarray = None,
+    sim_count: int = 20000,
+    seed: int = None,
+    block_size: int = 100,
+    n_jobs: int = None,
+    executor: Executor = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Method estimating probabilities of being best, expected loss and expected total gain
+    for beta-bernoulli aggregated data of many experiments at once.
+    Parameters
+    ----------
+    stats : Array of shape (n_tests, n_variants, 2) with [totals, positives] for each variant.
+    priors : Array broadcastable to shape (n_tests, n_variants, 2) with [a_prior, b_prior].
+        Default prior for all variants is Beta(0.5, 0.5) which is non-information prior.
+    sim_count : Number of simulations.
+    seed : Random seed, each test gets its own child seed spawned from it.
+    block_size : Number of tests simulated at once (limits memory usage).
+    n_jobs : Number of processes evaluating blocks of tests in parallel (-1 for all CPUs).
+        Results are identical for any number of workers.
+    executor : Existing process or thread pool used instead of n_jobs.
+    Returns
+    -------
+    res_pbbs : Array of shape (n_tests, n_variants) with probabilities of being best.
+    res_loss : Array of shape (n_tests, n_variants) with expected loss.
+    res_total_gain : Array of shape (n_tests, n_variants) with expected total gains.
+    posteriors : Array of shape (n_tests, n_variants, 2) with [a_post, b_post].
+    """
+    stats, priors = validate_batch_input(stats, priors, 2, DEFAULT_PRIORS_BERNOULLI)
+    return _eval_batch(
+        beta_posteriors_batch,
+        stats,
+        priors,
+        sim_count,
+        seed,
+        block_size,
+        n_jobs,
+        executor,
+    )
+
+
+def eval_delta_lognormal_batch(
+    stats: np.ndarray,
+    priors: np.ndarray = None,
+    sim_count: int = 20000,
+    seed: int = None,
+    block_size: int = 100,
+    n_jobs: int = None,
+    executor: Executor = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Method estimating probabilities of being best, expected loss and expected total gain
+    for delta-lognormal aggregated data of many experiments (e.g. test x segment x day) at once.
+    Tests without any positive observations get equal probabilities and NaN loss and gain.
+    Parameters
+    ----------
+    stats : Array of shape (n_tests, n_variants, 5) with aggregated data
+        [totals, positives, sum_values, sum_logs, sum_logs_2] for each variant.
+    priors : Array broadcastable to shape (n_tests, n_variants, 6) with priors
+        [a_prior_beta, b_prior_beta, m_prior, a_prior_ig, b_prior_ig, w_prior].
+        Default priors are the same as in eval_delta_lognormal_agg.
+    sim_count : Number of simulations.
+    seed : Random seed, each test gets its own child seed spawned from it.
+    block_size : Number of tests simulated at once (limits memory usage).
+    n_jobs : Number of processes evaluating blocks of tests in parallel (-1 for all CPUs).
+        Results are identical for any number of workers.
+    executor : Existing process or thread pool used instead of n_jobs.
+    Returns
+    -------
+    res_pbbs : Array of shape (n_tests, n_variants) with probabilities of being best.
+    res_loss : Array of shape (n_tests, n_variants) with expected loss.
+    res_total_gain : Array of shape (n_tests, n_variants) with expected total gains.
+    posteriors : Array of shape (n_tests, n_variants, 6) with posterior parameters
+        [a_post_beta, b_post_beta, a_post_ig, b_post_ig, w_post, m_post].
+    """
+    stats, priors = validate_batch_input(
+        stats, priors, 5, DEFAULT_PRIORS_DELTA_LOGNORMAL
+    )
+    res_pbbs, res_loss, res_total_gain, posteriors = _eval_batch(
+        delta_lognormal_posteriors_batch,
+        stats,
+        priors,
+        sim_count,
+        seed,
+        block_size,
+        n_jobs,
+        executor,
+    )
+
+    # if only zeros in all variants
+    no_positives = np.max(stats[..., 1], axis=1) <= 0
+    res_pbbs[no_positives] = round(1 / stats.shape[1], 7)
+    res_loss[no_positives] = np.nan
+    res_total_gain[no_positives] = np.nan
+
+    return res_pbbs, res_loss, res_total_gain, posteriors
@@ -0,0 +1,202 @@
+import warnings
+from typing import List, Tuple
+
+import numpy as np
+from scipy import stats, special, integrate
+from bayesian_testing.utilities import get_logger
+
+logger = get_logger("bayesian_testing")
+
+# Finite sums are evaluated in one vectorized call, so they are only used while the
+# number of terms stays reasonable. Larger inputs are integrated numerically instead.
+MAX_SUM_TERMS = 1_000_000
+
+
+def _is_integer(value: float) -> bool:
+    return float(value).is_integer()
+
+
+def _prob_greater_sum(a_x: float, b_x: float, a_y: float, b_y: float) -> float:
+    """
+    Finite-sum solution of P(X > Y) for X ~ Beta(a_x, b_x), Y ~ Beta(a_y, b_y).
+    Valid only for integer a_x (Evan Miller's formula), terms are summed in log-space.
+    """
+    i = np.arange(int(a_x), dtype=float)
+    log_terms = (
+        special.betaln(a_y + i, b_y + b_x)
+        - np.log(b_x + i)
+        - special.betaln(1 + i, b_x)
+        - special.betaln(a_y, b_y)
+    )
+    return float(np.exp(special.logsumexp(log_terms)))
+
+
+def _prob_greater_quad(a_x: float, b_x: float, a_y: float, b_y: float) -> float:
+    """
+    Numerical solution of P(X > Y) = integral of f_X(x) * F_Y(x) over the support of X.
+    The integration range is limited to the region where X has non-negligible mass.
+    """
+    lower, upper = stats.beta.ppf([1e-15, 1 - 1e-15], a_x, b_x)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", integrate.IntegrationWarning)
+        res, error = integrate.quad(
+            lambda x: stats.beta.pdf(x, a_x, b_x) * special.betainc(a_y, b_y, x),
+            lower,
+            upper,
+            points=[a_x / (a_x + b_x)],
+            epsabs=1e-13,
+            epsrel=1e-11,
+            limit=200,
+        )
+    if any(issubclass(w.category, integrate.IntegrationWarning) for w in caught):
+        logger.warning(
+            f"Numerical integration of P(X > Y) for Beta({a_x}, {b_x}) and "
+            f"Beta({a_y}, {b_y}) may be inaccurate, estimated error {error:.3g}."
+        )
+    return float(min(max(res, 0.0), 1.0))
+
+
+def _recurrence_start(x: float, y: float) -> Tuple[float, float]:
+    """
+    Parameters from which x and y are reached by steps of one, common minimum if they
+    differ by an integer (up to rounding errors of posterior parameters),
+    otherwise their fractional parts in (0, 1].
+    """
+    if abs(x - y - round(x - y)) < 1e-9:
+        return min(x, y), min(x, y)
+    return float(x - np.ceil(x) + 1), float(y - np.ceil(y) + 1)
+
+
+def _increments(start: float, stop: float, b_x: float, a_y: float, b_y: float) -> float:
+    """
+    Change of P(X > Y) for X ~ Beta(a, b_x), Y ~ Beta(a_y, b_y) when a grows from start
+    to stop by steps of one. Increments P(a + 1) - P(a) = B(a + a_y, b_x + b_y) /
+    (a B(a, b_x) B(a_y, b_y)) are computed from the first one by their ratios
+    (a + a_y) (a + b_x) / ((a + a_y + b_x + b_y) (a + 1)) in log-space.
+    """
+    n_terms = round(stop - start)
+    if n_terms == 0:
+        return 0.0
+    a = start + np.arange(n_terms - 1, dtype=float)
+    log_first = (
+        special.betaln(start + a_y, b_x + b_y)
+        - np.log(start)
+        - special.betaln(start, b_x)
+        - special.betaln(a_y, b_y)
+    )
+    log_ratios = np.log((a + a_y) * (a + b_x) / ((a + a_y + b_x + b_y) * (a + 1)))
+    log_terms = np.concatenate([[log_first], log_first + np.cumsum(log_ratios)])
+    # each increment is at most one, negligible ones may underflow to zero
+    return float(np.sum(np.exp(log_terms)))
+
+
+def _prob_greater_recurrence(a_x: float, b_x: float, a_y: float, b_y: float) -> float:
+    """
+    Solution of P(X > Y) by recurrences raising parameters by steps of one
+    (a_x, then b_y, a_y and b_x, using symmetries of the problem) from a base problem,
+    where parameters differing by an integer are equal. The base probability is 0.5
+    if both base distributions are the same, otherwise it is integrated numerically.
+    """
+    s_a_x, s_a_y = _recurrence_start(a_x, a_y)
+    s_b_x, s_b_y = _recurrence_start(b_x, b_y)
+    if (s_a_x, s_b_x) == (s_a_y, s_b_y):
+        prob = 0.5
+    else:
+        prob = _prob_greater_quad(s_a_x, s_b_x, s_a_y, s_b_y)
+    # X ~ Beta(a_x, s_b_x), Y ~ Beta(s_a_y, s_b_y)
+    prob += _increments(s_a_x, a_x, s_b_x, s_a_y, s_b_y)
+    # P(X > Y) = P(1 - Y > 1 - X), 1 - Y ~ Beta(b_y, s_a_y), 1 - X ~ Beta(s_b_x, a_x)
+    prob += _increments(s_b_y, b_y, s_a_y, s_b_x, a_x)
+    # P(X > Y) = 1 - P(Y > X), Y ~ Beta(a_y, b_y)
+    prob -= _increments(s_a_y, a_y, b_y, a_x, s_b_x)
+    # P(Y > X) = P(1 - X > 1 - Y), 1 - X ~ Beta(b_x, a_x), 1 - Y ~ Beta(b_y, a_y)
+    prob -= _increments(s_b_x, b_x, a_x, b_y, a_y)
+    return prob
+
+
+def _recurrence_terms(a_x: float, b_x: float, a_y: float, b_y: float) -> float:
+    s_a_x, s_a_y = _recurrence_start(a_x, a_y)
+    s_b_x, s_b_y = _recurrence_start(b_x, b_y)
+    return a_x - s_a_x + a_y - s_a_y + b_x - s_b_x + b_y - s_b_y
+
+
+def prob_greater_beta(a_x: float, b_x: float, a_y: float, b_y: float) -> float:
+    """
+    Exact probability P(X > Y) for independent X ~ Beta(a_x, b_x) and Y ~ Beta(a_y, b_y).
+    Finite-sum solution is used whenever one of the parameters is an integer
+    (using symmetries of the problem to move this parameter to the summation index).
+    Otherwise recurrences in all parameters reduce the problem to X and Y with the same
+    distribution, if a_x - a_y and b_x - b_y are integers (e.g. variants with the same
+    priors, such as the default Beta(0.5, 0.5), and integer data), so the result
+    is exact also in this case. Remaining base problems (variants with different
+    non-integer priors) and inputs needing more than MAX_SUM_TERMS terms
+    are evaluated by deterministic adaptive quadrature.
+    Parameters
+    ----------
+    a_x : Alpha parameter of Beta distribution of X.
+    b_x : Beta parameter of Beta distribution of X.
+    a_y : Alpha parameter of Beta distribution of Y.
+    b_y : Beta parameter of Beta distribution of Y.
+    Returns
+    -------
+    res : Probability that X is greater than Y.
+    """
+    # (parameter used as summation index, function of the sum giving P(X > Y))
+    candidates = [
+        (a_x, lambda: _prob_greater_sum(a_x, b_x, a_y, b_y)),
+        # P(X > Y) = P(1 - Y > 1 - X) and 1 - X ~ Beta(b_x, a_x)
+        (b_y, lambda: _prob_greater_sum(b_y, a_y, b_x, a_x)),
+        # P(X > Y) = 1 - P(Y > X)
+        (a_y, lambda: 1 - _prob_greater_sum(a_y, b_y, a_x, b_x)),
+        (b_x, lambda: 1 - _prob_greater_sum(b_x, a_x, b_y, a_y)),
+    ]
+    candidates = [c for c in candidates if _is_integer(c[0]) and c[0] <= MAX_SUM_TERMS]
+    if candidates:
+        _, prob_fn = min(candidates, key=lambda c: c[0])
+        return float(min(max(prob_fn(), 0.0), 1.0))
+    if _recurrence_terms(a_x, b_x, a_y, b_y) <= MAX_SUM_TERMS:
+        return float(min(max(_prob_greater_recurrence(a_x, b_x, a_y, b_y), 0.0), 1.0))
+    return _prob_greater_quad(a_x, b_x, a_y, b_y)
+
+
+def eval_beta_exact(
+    a_posteriors: List[float], b_posteriors: List[float]
+) -> Tuple[List[float], List[float], List[float]]:
+    """
+    Exact probabilities of being best, expected loss and expected total gain for two variants
+    with Beta posteriors. No simulation is involved, so results do not depend on any seed.
+    Expected loss uses identity x * Beta(x; a, b) = a / (a + b) * Beta(x; a + 1, b), i.e.
+    E[max(X_B - X_A, 0)] = E[X_B] * P(X_B' > X_A) - E[X_A] * P(X_B > X_A'),
+    where X' denotes a variable with alpha parameter increased by one.
+    Parameters
+    ----------
+    a_posteriors : List of posterior alpha parameters for Beta distributions for each variant.
+    b_posteriors : List of posterior beta parameters for Beta distributions for each variant.
+    Returns
+    -------
+    res_pbbs : List of probabilities of being best for each variant.
+    res_loss : List of expected loss for each variant.
+    res_total_gain : List of expected total gains for each variant.
+    """
+    if len(a_posteriors) != 2:
+        msg = "Exact evaluation is implemented only for two variants."
+        logger.error(msg)
+        raise ValueError(msg)
+
+    (a_1, a_2), (b_1, b_2) = a_posteriors, b_posteriors
+    mean_1 = a_1 / (a_1 + b_1)
+    mean_2 = a_2 / (a_2 + b_2)
+
+    pbb_1 = prob_greater_beta(a_1, b_1, a_2, b_2)
+    loss_1 = mean_2 * prob_greater_beta(a_2 + 1, b_2, a_1, b_1) - mean_1 * (
+        prob_greater_beta(a_2, b_2, a_1 + 1, b_1)
+    )
+    loss_2 = mean_1 * prob_greater_beta(a_1 + 1, b_1, a_2, b_2) - mean_2 * (
+        prob_greater_beta(a_1, b_1, a_2 + 1, b_2)
+    )
+
+    res_pbbs = [round(pbb_1, 7), round(1 - pbb_1, 7)]
+    res_loss = [round(max(loss_1, 0.0), 7), round(max(loss_2, 0.0), 7)]
+    res_total_gain = [round(mean_1 - mean_2, 7), round(mean_2 - mean_1, 7)]
+
+    return res_pbbs, res_loss, res_total_gain
@@ -1,6 +1,71 @@
-from typing import List, Tuple, Union
+import threading
+from typing import List, Tuple, Union, Callable, Iterator
+from collections import OrderedDict
 
 import numpy as np
+from scipy import special
+from scipy.stats import qmc
+from bayesian_testing.utilities.common import thread_map
+
+# number of simulations drawn by one generator in threaded sampling
+THREAD_BLOCK_SIZE = 65536
+
+
+def beta_posterior_params(
+    totals: List[int],
+    positives: List[int],
+    a_priors_beta: List[Union[float, int]],
+    b_priors_beta: List[Union[float, int]],
+) -> Tuple[List[float], List[float]]:
+    """
+    Posterior parameters of beta distributions for all variants.
+    Parameters
+    ----------
+    totals : List of numbers of experiment observations (e.g. number of sessions) for each variant.
+    positives : List of numbers of ones (e.g. number of conversions) for each variant.
+    a_priors_beta : List of prior alpha parameters for Beta distributions for each variant.
+    b_priors_beta : List of prior beta parameters for Beta distributions for each variant.
+    Returns
+    -------
+    a_posteriors_beta : List of posterior alpha parameters for Beta distributions for each variant.
+    b_posteriors_beta : List of posterior beta parameters for Beta distributions for each variant.
+    """
+    a_posteriors_beta = [positives[i] + a_priors_beta[i] for i in range(len(totals))]
+    b_posteriors_beta = [
+        totals[i] - positives[i] + b_priors_beta[i] for i in range(len(totals))
+    ]
+    return a_posteriors_beta, b_posteriors_beta
+
+
+def fill_blocks_threaded(
+    fill_block: Callable[[np.random.Generator, slice], None],
+    sim_count: int,
+    seed: Union[int, np.random.bit_generator.SeedSequence] = None,
+    n_threads: int = None,
+    block_size: int = THREAD_BLOCK_SIZE,
+) -> None:
+    """
+    Fill preallocated simulation arrays block by block in a thread pool.
+    Every block of block_size simulations has its own PCG64 generator spawned from seed
+    and blocks are disjoint slices, so results depend on seed and block_size only,
+    not on the number of threads.
+    Parameters
+    ----------
+    fill_block : Function filling simulations in given slice using given generator.
+    sim_count : Number of simulations.
+    seed : Random seed.
+    n_threads : Number of threads (None or 1 means no threads, -1 means all CPUs).
+    block_size : Number of simulations drawn by one generator.
+    """
+    blocks = [
+        slice(start, min(start + block_size, sim_count))
+        for start in range(0, sim_count, block_size)
+    ]
+    rngs = [
+        np.random.default_rng(child)
+        for child in _seed_sequence(seed).spawn(len(blocks))
+    ]
+    thread_map(fill_block, [rngs, blocks], n_threads)
 
 
 def beta_posteriors_all(
@@ -10,6 +75,9 @@ def beta_posteriors_all(
     a_priors_beta: List[Union[float, int]],
     b_priors_beta: List[Union[float, int]],
     seed: Union[int, np.random.bit_generator.SeedSequence] = None,
+    n_threads: int = None,
+    out: np.ndarray = None,
+    dtype: type = np.float64,
 ) -> Tuple[np.ndarray, List[float], List[float]]:
     """
     Draw from beta posterior distributions for all variants at once.
@@ -21,30 +89,226 @@ def beta_posteriors_all(
     a_priors_beta : List of prior alpha parameters for Beta distributions for each variant.
     b_priors_beta : List of prior beta parameters for Beta distributions for each variant.
     seed : Random seed.
+    n_threads : If set, simulations are drawn by this many threads (-1 for all CPUs)
+        in blocks with own generators (see fill_blocks_threaded). Results differ from
+        the single generator draws (n_threads=None), but not between numbers of threads.
+    out : Array of shape (number of variants, sim_count) the samples are written into.
+    dtype : Data type of samples, np.float64 or np.float32 (draws are rounded to float32,
+        as numpy generator draws beta distribution in float64 only).
     Returns
     -------
     beta_samples : List of lists of beta distribution samples for all variants.
     a_posteriors_beta : List of posterior alpha parameters for Beta distributions for each variant.
     b_posteriors_beta : List of posterior beta parameters for Beta distributions for each variant.
     """
+    a_posteriors_beta, b_posteriors_beta = beta_posterior_params(
+        totals, positives, a_priors_beta, b_priors_beta
+    )
+
+    if out is None:
+        beta_samples = np.empty((len(totals), sim_count), dtype=dtype)
+    else:
+        beta_samples = out
+
+    if n_threads is not None:
+
+        def fill_block(rng: np.random.Generator, block: slice) -> None:
+            for i in range(len(totals)):
+                beta_samples[i, block] = rng.beta(
+                    a_posteriors_beta[i], b_posteriors_beta[i], block.stop - block.start
+                )
+
+        fill_blocks_threaded(fill_block, sim_count, seed, n_threads)
+        return beta_samples, a_posteriors_beta, b_posteriors_beta
+
     rng = np.random.default_rng(seed)
 
-    a_posteriors_beta = [positives[i] + a_priors_beta[i] for i in range(len(totals))]
-    b_posteriors_beta = [
-        totals[i] - positives[i] + b_priors_beta[i] for i in range(len(totals))
-    ]
+    for i in range(len(totals)):
+        beta_samples[i] = rng.beta(
+            a_posteriors_beta[i],
+            b_posteriors_beta[i],
+            sim_count,
+        )
+    return beta_samples, a_posteriors_beta, b_posteriors_beta
 
-    beta_samples = np.array(
-        [
-            rng.beta(
-                a_posteriors_beta[i],
-                b_posteriors_beta[i],
-                sim_count,
-            )
-            for i in range(len(totals))
-        ]
+
+def normal_posterior_params(
+    total: int,
+    sums: float,
+    sums_2: float,
+    prior_m: Union[float, int] = 1,
+    prior_a: Union[float, int] = 0,
+    prior_b: Union[float, int] = 0,
+    prior_w: Union[float, int] = 0.01,
+) -> Tuple[float, float, float, float]:
+    """
+    Posterior parameters of Normal-Inverse Gamma distribution considering given aggregated data.
+    Parameters
+    ----------
+    total : Number of data observations from normal data.
+    sums : Sum of original data.
+    sums_2 : Sum of squares of original data.
+    prior_m : Prior mean.
+    prior_a : Prior alpha from inverse gamma dist. for unknown variance of original data.
+    prior_b : Prior beta from inverse gamma dist. for unknown variance of original data.
+    prior_w : Prior effective sample size.
+    Returns
+    -------
+    a_post_ig : Posterior alpha parameter for Inverse Gamma distributions for the given variant.
+    b_post_ig : Posterior beta parameter for Inverse Gamma distributions for the given variant.
+    w_post : Posterior w parameter for the variance of the Normal distributions for the given variant.
+    m_post : Posterior m (mean) parameter for the Normal distributions for the given variant.
+    """
+    x_bar = sums / total
+
+    a_post_ig = prior_a + (total / 2)
+    b_post_ig = (
+        prior_b
+        + (1 / 2) * (sums_2 - 2 * sums * x_bar + total * (x_bar**2))
+        + ((total * prior_w) / (2 * (total + prior_w))) * ((x_bar - prior_m) ** 2)
     )
-    return beta_samples, a_posteriors_beta, b_posteriors_beta
+    w_post = total + prior_w
+    m_post = (total * x_bar + prior_w * prior_m) / (total + prior_w)
+
+    return a_post_ig, b_post_ig, w_post, m_post
+
+
+class BaseDrawsCache:
+    """
+    LRU cache of standard Gamma and standard Normal draws used by normal_posteriors.
+    Posterior draws are only rescaled standard draws, i.e.
+    Gamma(a, scale) = scale * Gamma(a, 1) and Normal(m, s) = m + s * Normal(0, 1),
+    so repeated evaluations with the same seed, sim_count and Gamma shape (e.g. grid of
+    priors b, m, w or repeated evaluation of unchanged data) only transform cached draws.
+    Results are identical to drawing directly from the generator with the same seed.
+    The cache is bounded by total size of cached draws and safe to use from threads.
+    """
+
+    def __init__(self, max_bytes: int = 2**28) -> None:
+        """
+        Initialize BaseDrawsCache class.
+        Parameters
+        ----------
+        max_bytes : Maximal total size of cached draws in bytes, least recently used
+            draws are removed first. Draws larger than max_bytes are not cached.
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._draws = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _seed_key(seed: Union[int, np.random.bit_generator.SeedSequence]) -> tuple:
+        seed_seq = _seed_sequence(seed)
+        entropy = seed_seq.entropy
+        if not isinstance(entropy, int):
+            entropy = tuple(np.atleast_1d(entropy).tolist())
+        return entropy, tuple(seed_seq.spawn_key), seed_seq.pool_size
+
+    def get(
+        self,
+        seed: Union[int, np.random.bit_generator.SeedSequence],
+        sim_count: int,
+        shape: float,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Standard draws for given seed, drawn and stored if they are not cached yet.
+        Parameters
+        ----------
+        seed : Random seed (not None).
+        sim_count : Number of simulations.
+        shape : Shape parameter of Gamma distribution.
+        Returns
+        -------
+        std_gamma : Read-only array of sim_count standard Gamma(shape, 1) draws.
+        std_normal : Read-only array of sim_count standard Normal draws.
+        """
+        key = (self._seed_key(seed), sim_count, float(shape))
+        with self._lock:
+            if key in self._draws:
+                self._draws.move_to_end(key)
+                return self._draws[key]
+
+        # same order of draws as in gamma and normal calls of normal_posteriors
+        rng = np.random.default_rng(seed)
+        draws = rng.standard_gamma(shape, sim_count), rng.standard_normal(sim_count)
+        for draw in draws:
+            draw.flags.writeable = False
+        draws_nbytes = sum(draw.nbytes for draw in draws)
+        if draws_nbytes > self.max_bytes:
+            return draws
+
+        with self._lock:
+            if key not in self._draws:
+                self._draws[key] = draws
+                self.nbytes += draws_nbytes
+            while self.nbytes > self.max_bytes:
+                _, removed = self._draws.popitem(last=False)
+                self.nbytes -= sum(draw.nbytes for draw in removed)
+        return draws
+
+    def clear(self) -> None:
+        """
+        Remove all cached draws.
+        """
+        with self._lock:
+            self._draws.clear()
+            self.nbytes = 0
+
+
+BASE_DRAWS_CACHE = BaseDrawsCache()
+
+
+class SimulationWorkspace:
+    """
+    Reusable named buffers for simulations, so that repeated evaluations of the same size
+    (e.g. a loop over many experiments) write draws and intermediate results into
+    the same arrays instead of allocating new ones in every call.
+    Arrays returned from functions using a workspace are its buffers, they are overwritten
+    by the next call using the same workspace (copy them to keep them).
+    A workspace must not be shared by concurrently running evaluations.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize SimulationWorkspace class.
+        """
+        self._buffers = {}
+
+    def get(
+        self, name: str, shape: Union[int, Tuple[int, ...]], dtype=float
+    ) -> np.ndarray:
+        """
+        Buffer of given name, allocated only if it does not exist yet
+        or has different shape or dtype. Content of the buffer is arbitrary.
+        Parameters
+        ----------
+        name : Name of the buffer.
+        shape : Shape of the buffer.
+        dtype : Data type of the buffer.
+        Returns
+        -------
+        res : Contiguous array of given shape and dtype.
+        """
+        shape = tuple(np.atleast_1d(shape).tolist())
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Total size of all buffers in bytes.
+        """
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+
+    def clear(self) -> None:
+        """
+        Release all buffers.
+        """
+        self._buffers.clear()
 
 
 def normal_posteriors(
@@ -57,6 +321,10 @@ def normal_posteriors(
     prior_b: Union[float, int] = 0,
     prior_w: Union[float, int] = 0.01,
     seed: Union[int, np.random.bit_generator.SeedSequence] = None,
+    cache: BaseDrawsCache = None,
+    n_threads: int = None,
+    workspace: SimulationWorkspace = None,
+    dtype: type = np.float64,
 ) -> Tuple[np.ndarray, np.ndarray, float, float, float, float,]:
     """
     Drawing mus and sigmas from posterior normal distribution considering given aggregated data.
@@ -73,6 +341,15 @@ def normal_posteriors(
         In theory b > 0, but as we always have at least one observation, we can start at 0.
     prior_w : Prior effective sample size.
     seed : Random seed.
+    cache : Cache of standard draws to be transformed instead of drawing new ones.
+        It is used only if seed is set, results are the same as without cache.
+    n_threads : If set and cache is not used, simulations are drawn by this many threads
+        (-1 for all CPUs) in blocks with own generators (see fill_blocks_threaded).
+    workspace : If set, draws are computed in place in its buffers "mu_post", "sig_2_post"
+        and "std_normal" (returned arrays are the buffers). Results are the same.
+    dtype : Data type of draws, np.float64 or np.float32. Float32 standard draws come from
+        different generator routines, so results differ from float64 ones by Monte Carlo
+        error and rounding (cache is not used for float32).
     Returns
     -------
     mu_post : List of size sim_count with mus drawn from normal distribution.
@@ -82,28 +359,137 @@ def normal_posteriors(
     w_post : Posterior w parameter for the variance of the Normal distributions for the given variant.
     m_post : Posterior m (mean) parameter for the Normal distributions for the given variant.
     """
-    rng = np.random.default_rng(seed)
-
-    x_bar = sums / total
-
-    a_post_ig = prior_a + (total / 2)
-    b_post_ig = (
-        prior_b
-        + (1 / 2) * (sums_2 - 2 * sums * x_bar + total * (x_bar**2))
-        + ((total * prior_w) / (2 * (total + prior_w))) * ((x_bar - prior_m) ** 2)
+    a_post_ig, b_post_ig, w_post, m_post = normal_posterior_params(
+        total, sums, sums_2, prior_m, prior_a, prior_b, prior_w
     )
-    w_post = total + prior_w
 
-    # here it has to be 1/b as it is a scale, and not a rate
-    sig_2_post = 1 / rng.gamma(a_post_ig, 1 / b_post_ig, sim_count)
+    dtype = np.dtype(dtype)
+    if workspace is None and dtype == np.float64:
+        if cache is not None and seed is not None:
+            std_gamma, std_normal = cache.get(seed, sim_count, a_post_ig)
+            sig_2_post = 1 / (std_gamma * (1 / b_post_ig))
+            mu_post = m_post + np.sqrt(sig_2_post / (total + prior_w)) * std_normal
+        elif n_threads is not None:
+            sig_2_post, mu_post = np.empty(sim_count), np.empty(sim_count)
+            _normal_posteriors_threaded(
+                sig_2_post,
+                mu_post,
+                a_post_ig,
+                b_post_ig,
+                m_post,
+                total + prior_w,
+                seed,
+                n_threads,
+            )
+        else:
+            rng = np.random.default_rng(seed)
+            # here it has to be 1/b as it is a scale, and not a rate
+            sig_2_post = 1 / rng.gamma(a_post_ig, 1 / b_post_ig, sim_count)
+            mu_post = rng.normal(m_post, np.sqrt(sig_2_post / (total + prior_w)))
+        return mu_post, sig_2_post, a_post_ig, b_post_ig, w_post, m_post
 
-    m_post = (total * x_bar + prior_w * prior_m) / (total + prior_w)
+    # the same operations as above, in place in workspace buffers
+    if workspace is None:
+        workspace = SimulationWorkspace()
+    sig_2_post = workspace.get("sig_2_post", sim_count, dtype)
+    mu_post = workspace.get("mu_post", sim_count, dtype)
+    use_cache = cache is not None and seed is not None and dtype == np.float64
+    if n_threads is not None and not use_cache:
+        _normal_posteriors_threaded(
+            sig_2_post,
+            mu_post,
+            a_post_ig,
+            b_post_ig,
+            m_post,
+            total + prior_w,
+            seed,
+            n_threads,
+        )
+        return mu_post, sig_2_post, a_post_ig, b_post_ig, w_post, m_post
 
-    mu_post = rng.normal(m_post, np.sqrt(sig_2_post / (total + prior_w)))
+    if use_cache:
+        std_gamma, std_normal = cache.get(seed, sim_count, a_post_ig)
+        np.multiply(std_gamma, 1 / b_post_ig, out=sig_2_post)
+    else:
+        rng = np.random.default_rng(seed)
+        rng.standard_gamma(a_post_ig, out=sig_2_post, dtype=dtype)
+        sig_2_post *= 1 / b_post_ig
+        std_normal = rng.standard_normal(
+            out=workspace.get("std_normal", sim_count, dtype), dtype=dtype
+        )
+    np.reciprocal(sig_2_post, out=sig_2_post)
+    np.divide(sig_2_post, total + prior_w, out=mu_post)
+    np.sqrt(mu_post, out=mu_post)
+    mu_post *= std_normal
+    mu_post += m_post
 
     return mu_post, sig_2_post, a_post_ig, b_post_ig, w_post, m_post
 
 
+def _normal_posteriors_threaded(
+    sig_2_post: np.ndarray,
+    mu_post: np.ndarray,
+    a_post_ig: float,
+    b_post_ig: float,
+    m_post: float,
+    w_post: float,
+    seed: Union[int, np.random.bit_generator.SeedSequence],
+    n_threads: int,
+) -> None:
+    """
+    Fill sig_2_post and mu_post arrays with posterior draws by threads
+    (see fill_blocks_threaded).
+    """
+
+    def fill_block(rng: np.random.Generator, block: slice) -> None:
+        # same transformation of standard draws as in the cached branch of normal_posteriors
+        sig_2 = sig_2_post[block]
+        rng.standard_gamma(a_post_ig, out=sig_2, dtype=sig_2.dtype)
+        sig_2 *= 1 / b_post_ig
+        np.reciprocal(sig_2, out=sig_2)
+        mu = mu_post[block]
+        rng.standard_normal(out=mu, dtype=mu.dtype)
+        mu *= np.sqrt(sig_2 / w_post)
+        mu += m_post
+
+    fill_blocks_threaded(fill_block, len(sig_2_post), seed, n_threads)
+
+
+def lognormal_posterior_params(
+    total: int,
+    sum_logs: float,
+    sum_logs_2: float,
+    prior_m: Union[float, int] = 1,
+    prior_a: Union[float, int] = 0,
+    prior_b: Union[float, int] = 0,
+    prior_w: Union[float, int] = 0.01,
+) -> Tuple[float, float, float, float]:
+    """
+    Posterior parameters of lognormal model without drawing any samples.
+    Parameters are NaN if there is no lognormal observation (same as in lognormal_posteriors).
+    Parameters
+    ----------
+    total : Number of lognormal data observations.
+    sum_logs : Sum of logarithms of original data.
+    sum_logs_2 : Sum of logarithms squared of original data.
+    prior_m : Prior mean of logarithms of original data.
+    prior_a : Prior alpha from inverse gamma dist. for unknown variance of logarithms.
+    prior_b : Prior beta from inverse gamma dist. for unknown variance of logarithms.
+    prior_w : Prior effective sample size.
+    Returns
+    -------
+    a_post_ig : Posterior alpha parameter for Inverse Gamma distributions for the given variant.
+    b_post_ig : Posterior beta parameter for Inverse Gamma distributions for the given variant.
+    w_post : Posterior w parameter for the variance of the Normal distributions for the given variant.
+    m_post : Posterior m (mean) parameter for the Normal distributions for the given variant.
+    """
+    if total <= 0:
+        return float("nan"), float("nan"), float("nan"), float("nan")
+    return normal_posterior_params(
+        total, sum_logs, sum_logs_2, prior_m, prior_a, prior_b, prior_w
+    )
+
+
 def lognormal_posteriors(
     total: int,
     sum_logs: float,
@@ -114,6 +500,11 @@ def lognormal_posteriors(
     prior_b: Union[float, int] = 0,
     prior_w: Union[float, int] = 0.01,
     seed: Union[int, np.random.bit_generator.SeedSequence] = None,
+    cache: BaseDrawsCache = None,
+    n_threads: int = None,
+    workspace: SimulationWorkspace = None,
+    out: np.ndarray = None,
+    dtype: type = np.float64,
 ) -> Tuple[List[float], float, float, float, float]:
     """
     Drawing from posterior lognormal distribution using logarithms of original (lognormal) data
@@ -134,6 +525,12 @@ def lognormal_posteriors(
         we can start at 0.
     prior_w : Prior effective sample size.
     seed : Random seed.
+    cache : Cache of standard draws (see normal_posteriors).
+    n_threads : Number of threads drawing simulations (see normal_posteriors).
+    workspace : Workspace for intermediate normal draws (see normal_posteriors).
+    out : Array of size sim_count the result is written into.
+    dtype : Data type of draws, np.float64 or np.float32 (see normal_posteriors).
+        Float32 draws overflow to inf above about 3.4e38 (only for very few observations).
     Returns
     -------
     res : List of sim_count numbers drawn from lognormal distribution.
@@ -143,8 +540,12 @@ def lognormal_posteriors(
     m_post : Posterior m (mean) parameter for the Normal distributions for the given variant.
     """
     if total <= 0:
+        if out is not None:
+            out[:] = 0
+        elif np.dtype(dtype) != np.float64:
+            out = np.zeros(sim_count, dtype=dtype)
         return (
-            list(np.zeros(sim_count)),
+            out if out is not None else list(np.zeros(sim_count)),
             float("nan"),
             float("nan"),
             float("nan"),
@@ -160,10 +561,409 @@ def lognormal_posteriors(
         w_post,
         m_post,
     ) = normal_posteriors(
-        total, sum_logs, sum_logs_2, sim_count, prior_m, prior_a, prior_b, prior_w, seed
+        total,
+        sum_logs,
+        sum_logs_2,
+        sim_count,
+        prior_m,
+        prior_a,
+        prior_b,
+        prior_w,
+        seed,
+        cache,
+        n_threads,
+        workspace,
+        dtype,
     )
 
     # final simulated lognormal means using simulated normal means and sigmas
-    res = np.exp(normal_mu_post + (normal_sig_2_post / 2))
+    if out is None and workspace is None and np.dtype(dtype) == np.float64:
+        res = np.exp(normal_mu_post + (normal_sig_2_post / 2))
+    else:
+        res = out if out is not None else np.empty(sim_count, dtype=dtype)
+        np.divide(normal_sig_2_post, 2, out=res)
+        np.add(normal_mu_post, res, out=res)
+        np.exp(res, out=res)
 
     return res, a_post_ig, b_post_ig, w_post, m_post
+
+
+def _chunk_sizes(sim_count: int, chunk_size: int) -> Iterator[int]:
+    """
+    Sizes of consecutive chunks covering sim_count simulations.
+    """
+    for start in range(0, sim_count, chunk_size):
+        yield min(chunk_size, sim_count - start)
+
+
+def _copy_generator(rng: np.random.Generator) -> np.random.Generator:
+    """
+    Independent generator continuing from the current state of rng.
+    """
+    bit_generator = type(rng.bit_generator)()
+    bit_generator.state = rng.bit_generator.state
+    return np.random.Generator(bit_generator)
+
+
+def beta_posteriors_chunks(
+    totals: List[int],
+    positives: List[int],
+    sim_count: int,
+    a_priors_beta: List[Union[float, int]],
+    b_priors_beta: List[Union[float, int]],
+    seed: Union[int, np.random.bit_generator.SeedSequence] = None,
+    chunk_size: int = 100000,
+) -> Iterator[np.ndarray]:
+    """
+    Draw from beta posterior distributions for all variants in chunks of at most chunk_size.
+    Concatenated chunks are identical to samples of beta_posteriors_all with the same seed.
+    In beta_posteriors_all, the variants are drawn one after another from one generator,
+    so generators of all variants are first positioned by drawing (and discarding)
+    samples of preceding variants. This costs extra time, but memory stays bounded.
+    Parameters
+    ----------
+    totals : List of numbers of experiment observations (e.g. number of sessions) for each variant.
+    positives : List of numbers of ones (e.g. number of conversions) for each variant.
+    sim_count : Number of simulations.
+    a_priors_beta : List of prior alpha parameters for Beta distributions for each variant.
+    b_priors_beta : List of prior beta parameters for Beta distributions for each variant.
+    seed : Random seed.
+    chunk_size : Maximal number of simulations in one chunk.
+    Returns
+    -------
+    chunks : Iterator of arrays of shape (n_variants, chunk) with beta samples.
+    """
+    rng = np.random.default_rng(seed)
+    a_posteriors_beta, b_posteriors_beta = beta_posterior_params(
+        totals, positives, a_priors_beta, b_priors_beta
+    )
+
+    generators = []
+    for i in range(len(totals)):
+        generators.append(_copy_generator(rng))
+        if i < len(totals) - 1:
+            for size in _chunk_sizes(sim_count, chunk_size):
+                rng.beta(a_posteriors_beta[i], b_posteriors_beta[i], size)
+
+    for size in _chunk_sizes(sim_count, chunk_size):
+        yield np.array(
+            [
+                generators[i].beta(a_posteriors_beta[i], b_posteriors_beta[i], size)
+                for i in range(len(totals))
+            ]
+        )
+
+
+def lognormal_posteriors_chunks(
+    total: int,
+    sum_logs: float,
+    sum_logs_2: float,
+    sim_count: int = 20000,
+    prior_m: Union[float, int] = 1,
+    prior_a: Union[float, int] = 0,
+    prior_b: Union[float, int] = 0,
+    prior_w: Union[float, int] = 0.01,
+    seed: Union[int, np.random.bit_generator.SeedSequence] = None,
+    chunk_size: int = 100000,
+) -> Iterator[np.ndarray]:
+    """
+    Draw from posterior lognormal distribution in chunks of at most chunk_size.
+    Concatenated chunks are identical to samples of lognormal_posteriors with the same seed
+    (normal generator is positioned after all gamma draws, same as in normal_posteriors).
+    Parameters
+    ----------
+    total : Number of lognormal data observations.
+    sum_logs : Sum of logarithms of original data.
+    sum_logs_2 : Sum of logarithms squared of original data.
+    sim_count : Number of simulations.
+    prior_m : Prior mean of logarithms of original data.
+    prior_a : Prior alpha from inverse gamma dist. for unknown variance of logarithms.
+    prior_b : Prior beta from inverse gamma dist. for unknown variance of logarithms.
+    prior_w : Prior effective sample size.
+    seed : Random seed.
+    chunk_size : Maximal number of simulations in one chunk.
+    Returns
+    -------
+    chunks : Iterator of arrays with simulated lognormal means.
+    """
+    if total <= 0:
+        for size in _chunk_sizes(sim_count, chunk_size):
+            yield np.zeros(size)
+        return
+
+    a_post_ig, b_post_ig, w_post, m_post = normal_posterior_params(
+        total, sum_logs, sum_logs_2, prior_m, prior_a, prior_b, prior_w
+    )
+    gamma_rng = np.random.default_rng(seed)
+    normal_rng = _copy_generator(gamma_rng)
+    for size in _chunk_sizes(sim_count, chunk_size):
+        normal_rng.gamma(a_post_ig, 1 / b_post_ig, size)
+
+    for size in _chunk_sizes(sim_count, chunk_size):
+        sig_2_post = 1 / gamma_rng.gamma(a_post_ig, 1 / b_post_ig, size)
+        mu_post = normal_rng.normal(m_post, np.sqrt(sig_2_post / w_post))
+        yield np.exp(mu_post + (sig_2_post / 2))
+
+
+def _seed_sequence(
+    seed: Union[int, np.random.bit_generator.SeedSequence] = None
+) -> np.random.bit_generator.SeedSequence:
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+
+def beta_posteriors_sampler(
+    a_posteriors_beta: List[float],
+    b_posteriors_beta: List[float],
+    seed: Union[int, np.random.bit_generator.SeedSequence] = None,
+) -> Callable[[int], np.ndarray]:
+    """
+    Sampler drawing any number of new samples from beta posteriors of all variants.
+    Every variant has its own generator, so the sampler can be called repeatedly
+    (e.g. until required precision is reached) and stays reproducible for given seed.
+    Parameters
+    ----------
+    a_posteriors_beta : List of posterior alpha parameters for Beta distributions.
+    b_posteriors_beta : List of posterior beta parameters for Beta distributions.
+    seed : Random seed.
+    Returns
+    -------
+    draw : Function returning array of shape (n_variants, size) for given size.
+    """
+    generators = [
+        np.random.default_rng(child)
+        for child in _seed_sequence(seed).spawn(len(a_posteriors_beta))
+    ]
+
+    def draw(size: int) -> np.ndarray:
+        return np.array(
+            [
+                generators[i].beta(a_posteriors_beta[i], b_posteriors_beta[i], size)
+                for i in range(len(generators))
+            ]
+        )
+
+    return draw
+
+
+def lognormal_posteriors_sampler(
+    total: int,
+    sum_logs: float,
+    sum_logs_2: float,
+    prior_m: Union[float, int] = 1,
+    prior_a: Union[float, int] = 0,
+    prior_b: Union[float, int] = 0,
+    prior_w: Union[float, int] = 0.01,
+    seed: Union[int, np.random.bit_generator.SeedSequence] = None,
+) -> Callable[[int], np.ndarray]:
+    """
+    Sampler drawing any number of new samples from posterior lognormal distribution.
+    Gamma and normal draws have their own generators, so the sampler can be called
+    repeatedly and stays reproducible for given seed.
+    Parameters
+    ----------
+    total : Number of lognormal data observations.
+    sum_logs : Sum of logarithms of original data.
+    sum_logs_2 : Sum of logarithms squared of original data.
+    prior_m : Prior mean of logarithms of original data.
+    prior_a : Prior alpha from inverse gamma dist. for unknown variance of logarithms.
+    prior_b : Prior beta from inverse gamma dist. for unknown variance of logarithms.
+    prior_w : Prior effective sample size.
+    seed : Random seed.
+    Returns
+    -------
+    draw : Function returning array of simulated lognormal means for given size.
+    """
+    if total <= 0:
+        return np.zeros
+
+    a_post_ig, b_post_ig, w_post, m_post = normal_posterior_params(
+        total, sum_logs, sum_logs_2, prior_m, prior_a, prior_b, prior_w
+    )
+    gamma_rng, normal_rng = [
+        np.random.default_rng(child) for child in _seed_sequence(seed).spawn(2)
+    ]
+
+    def draw(size: int) -> np.ndarray:
+        sig_2_post = 1 / gamma_rng.gamma(a_post_ig, 1 / b_post_ig, size)
+        mu_post = normal_rng.normal(m_post, np.sqrt(sig_2_post / w_post))
+        return np.exp(mu_post + (sig_2_post / 2))
+
+    return draw
+
+
+def delta_lognormal_posteriors_batch(
+    stats: np.ndarray,
+    priors: np.ndarray,
+    sim_count: int,
+    seeds: List[np.random.bit_generator.SeedSequence],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Drawing from posterior distributions of delta-lognormal means for many experiments at once.
+    All variants of one experiment are drawn by a single broadcasted call per distribution
+    (beta, gamma, normal) from the experiment's own generator, so results of an experiment
+    do not depend on other experiments in the batch.
+    Parameters
+    ----------
+    stats : Array of shape (n_tests, n_variants, 5) with aggregated data
+        [totals, positives, sum_values, sum_logs, sum_logs_2] for each variant.
+    priors : Array of shape (n_tests, n_variants, 6) with priors
+        [a_prior_beta, b_prior_beta, m_prior, a_prior_ig, b_prior_ig, w_prior] for each variant.
+    sim_count : Number of simulations.
+    seeds : List of seeds (one per experiment).
+    Returns
+    -------
+    samples : Array of shape (n_tests, n_variants, sim_count) with simulated means.
+    posteriors : Array of shape (n_tests, n_variants, 6) with posterior parameters
+        [a_post_beta, b_post_beta, a_post_ig, b_post_ig, w_post, m_post] for each variant.
+    """
+    totals, positives, _, sum_logs, sum_logs_2 = np.moveaxis(stats, -1, 0)
+    a_prior_beta, b_prior_beta, m_prior, a_prior_ig, b_prior_ig, w_prior = np.moveaxis(
+        priors, -1, 0
+    )
+    has_positives = positives > 0
+
+    a_post_beta = positives + a_prior_beta
+    b_post_beta = totals - positives + b_prior_beta
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a_post_ig, b_post_ig, w_post, m_post = [
+            np.where(has_positives, param, np.nan)
+            for param in normal_posterior_params(
+                positives,
+                sum_logs,
+                sum_logs_2,
+                m_prior,
+                a_prior_ig,
+                b_prior_ig,
+                w_prior,
+            )
+        ]
+    # valid dummy parameters for variants without positives, their samples are zeroed anyway
+    shape_ig = np.where(has_positives, a_post_ig, 1)[..., None]
+    scale_ig = np.where(has_positives, 1 / b_post_ig, 1)[..., None]
+    w_norm = np.where(has_positives, w_post, 1)[..., None]
+    m_norm = np.where(has_positives, m_post, 0)[..., None]
+
+    samples = np.empty(stats.shape[:2] + (sim_count,))
+    for t, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+        size = (stats.shape[1], sim_count)
+        beta_samples = rng.beta(a_post_beta[t, :, None], b_post_beta[t, :, None], size)
+        sig_2_post = 1 / rng.gamma(shape_ig[t], scale_ig[t], size)
+        mu_post = rng.normal(m_norm[t], np.sqrt(sig_2_post / w_norm[t]))
+        samples[t] = beta_samples * np.exp(mu_post + sig_2_post / 2)
+    samples[~has_positives] = 0
+
+    posteriors = np.stack(
+        [a_post_beta, b_post_beta, a_post_ig, b_post_ig, w_post, m_post], axis=-1
+    )
+    return samples, posteriors
+
+
+def beta_posteriors_batch(
+    stats: np.ndarray,
+    priors: np.ndarray,
+    sim_count: int,
+    seeds: List[np.random.bit_generator.SeedSequence],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Drawing from beta posterior distributions for many experiments at once.
+    All variants of one experiment are drawn by a single broadcasted call from
+    the experiment's own generator.
+    Parameters
+    ----------
+    stats : Array of shape (n_tests, n_variants, 2) with [totals, positives] for each variant.
+    priors : Array of shape (n_tests, n_variants, 2) with [a_prior, b_prior] for each variant.
+    sim_count : Number of simulations.
+    seeds : List of seeds (one per experiment).
+    Returns
+    -------
+    samples : Array of shape (n_tests, n_variants, sim_count) with beta samples.
+    posteriors : Array of shape (n_tests, n_variants, 2) with [a_post, b_post] for each variant.
+    """
+    a_post = stats[..., 1] + priors[..., 0]
+    b_post = stats[..., 0] - stats[..., 1] + priors[..., 1]
+
+    samples = np.empty(stats.shape[:2] + (sim_count,))
+    for t, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+        samples[t] = rng.beta(
+            a_post[t, :, None], b_post[t, :, None], (stats.shape[1], sim_count)
+        )
+    return samples, np.stack([a_post, b_post], axis=-1)
+
+
+def sobol_uniforms(
+    n_dims: int,
+    sim_count: int,
+    seed: Union[int, np.random.bit_generator.SeedSequence] = None,
+) -> np.ndarray:
+    """
+    Scrambled Sobol points used as low-discrepancy replacement of uniform random draws.
+    Balance properties of Sobol points require number of points to be a power of two,
+    so sim_count is rounded up to the nearest power of two.
+    Parameters
+    ----------
+    n_dims : Number of dimensions (independent posterior variables).
+    sim_count : Minimal number of points.
+    seed : Random seed for scrambling.
+    Returns
+    -------
+    uniforms : Array of shape (n_dims, n_points) with values in (0, 1).
+    """
+    sobol = qmc.Sobol(n_dims, scramble=True, seed=np.random.default_rng(seed))
+    return sobol.random_base2(int(np.ceil(np.log2(max(sim_count, 2))))).T
+
+
+def beta_posteriors_sobol(
+    a_posteriors_beta: List[float],
+    b_posteriors_beta: List[float],
+    uniforms: np.ndarray,
+) -> np.ndarray:
+    """
+    Beta posterior samples for all variants obtained by inverse CDF from Sobol points.
+    Parameters
+    ----------
+    a_posteriors_beta : List of posterior alpha parameters for Beta distributions.
+    b_posteriors_beta : List of posterior beta parameters for Beta distributions.
+    uniforms : Array of shape (n_variants, n_points) with Sobol points.
+    Returns
+    -------
+    beta_samples : Array of shape (n_variants, n_points) with beta samples.
+    """
+    a_posteriors_beta = np.asarray(a_posteriors_beta, dtype=float)[:, None]
+    b_posteriors_beta = np.asarray(b_posteriors_beta, dtype=float)[:, None]
+    return special.betaincinv(a_posteriors_beta, b_posteriors_beta, uniforms)
+
+
+def lognormal_posteriors_sobol(
+    a_post_ig: float,
+    b_post_ig: float,
+    w_post: float,
+    m_post: float,
+    uniforms_ig: np.ndarray,
+    uniforms_normal: np.ndarray,
+) -> np.ndarray:
+    """
+    Posterior lognormal means obtained by inverse CDFs from Sobol points, i.e.
+    sigma^2 from Inverse Gamma quantiles and mu from conditional Normal quantiles.
+    NaN posterior parameters (no lognormal observation) give zero means.
+    Parameters
+    ----------
+    a_post_ig : Posterior alpha parameter for Inverse Gamma distribution.
+    b_post_ig : Posterior beta parameter for Inverse Gamma distribution.
+    w_post : Posterior w parameter for the variance of the Normal distribution.
+    m_post : Posterior m (mean) parameter for the Normal distribution.
+    uniforms_ig : Sobol points used for sigma^2.
+    uniforms_normal : Sobol points used for mu.
+    Returns
+    -------
+    res : Array of simulated lognormal means.
+    """
+    if np.isnan(m_post):
+        return np.zeros(len(uniforms_ig))
+    # 1 / sigma^2 is Gamma distributed with rate b_post_ig
+    sig_2_post = b_post_ig / special.gammaincinv(a_post_ig, uniforms_ig)
+    mu_post = m_post + np.sqrt(sig_2_post / w_post) * special.ndtri(uniforms_normal)
+    return np.exp(mu_post + (sig_2_post / 2))
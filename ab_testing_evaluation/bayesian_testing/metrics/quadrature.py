@@ -0,0 +1,297 @@
+from typing import List, Tuple, Callable, Sequence
+
+import numpy as np
+from scipy import stats, special
+from bayesian_testing.utilities import get_logger
+from bayesian_testing.utilities.common import two_variant_differences
+
+logger = get_logger("bayesian_testing")
+
+# Numbers of quadrature nodes per integrated dimension tried by adaptive refinement.
+NODE_COUNTS = (8, 12, 16, 24, 32, 48, 64)
+# Delta-lognormal rules have n^3 nodes and CDF mixtures of n^2 components,
+# so evaluation grows as n^5 and node counts are capped.
+DELTA_LOGNORMAL_NODE_COUNTS = (8, 12, 16, 24)
+# Maximal number of elements of values x components matrix evaluated at once.
+CDF_BLOCK_ELEMENTS = 2**22
+
+
+class QuadratureError(ArithmeticError):
+    """
+    Quadrature results are not finite (e.g. expected loss of delta-lognormal variants
+    with very few positive observations, whose posterior means are too heavy-tailed).
+    """
+
+
+def _hermite_nodes(n_nodes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Gauss-Hermite nodes and weights for expectations over a standard normal variable.
+    """
+    nodes, weights = np.polynomial.hermite_e.hermegauss(n_nodes)
+    return nodes, weights / weights.sum()
+
+
+def _quantiles(dist, nodes: np.ndarray, *args, **kwds) -> np.ndarray:
+    """
+    Quantiles of scipy distribution at standard normal nodes, precise in both tails.
+    """
+    return np.where(
+        nodes < 0,
+        dist.ppf(special.ndtr(nodes), *args, **kwds),
+        dist.isf(special.ndtr(-nodes), *args, **kwds),
+    )
+
+
+def beta_nodes(
+    a_posterior: float, b_posterior: float, n_nodes: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quadrature nodes and weights for expectations over Beta posterior.
+    Gauss-Hermite rule is mapped through posterior quantile function, so the nodes follow
+    the posterior mass however concentrated it is.
+    """
+    nodes, weights = _hermite_nodes(n_nodes)
+    return _quantiles(stats.beta, nodes, a_posterior, b_posterior), weights
+
+
+def beta_cdf(a_posterior: float, b_posterior: float) -> Callable:
+    """
+    Posterior CDF of Beta distributed variant.
+    """
+    return lambda x: special.betainc(a_posterior, b_posterior, x)
+
+
+def _delta_lognormal_components(
+    a_posterior_beta: float,
+    b_posterior_beta: float,
+    a_posterior_ig: float,
+    b_posterior_ig: float,
+    w_posterior: float,
+    m_posterior: float,
+    n_nodes: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Log of posterior mean, log(p) + mu + sigma^2 / 2, conditionally on p and sigma^2 is normal.
+    Integrating p and sigma^2 out by Gauss-Hermite rule mapped through their quantile functions
+    represents it as a mixture of normal distributions.
+    Returns
+    -------
+    locs : Means of the normal mixture components.
+    scales : Standard deviations of the normal mixture components.
+    weights : Weights of the normal mixture components.
+    """
+    nodes, weights = _hermite_nodes(n_nodes)
+    log_p = np.log(_quantiles(stats.beta, nodes, a_posterior_beta, b_posterior_beta))
+    sig_2 = _quantiles(stats.invgamma, nodes, a_posterior_ig, scale=b_posterior_ig)
+
+    locs = log_p[:, None] + m_posterior + sig_2[None, :] / 2
+    scales = np.broadcast_to(np.sqrt(sig_2 / w_posterior)[None, :], locs.shape)
+    return locs.ravel(), scales.ravel(), np.outer(weights, weights).ravel()
+
+
+def delta_lognormal_nodes(
+    components: Tuple[np.ndarray, np.ndarray, np.ndarray], n_nodes: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quadrature nodes and weights for expectations over posterior of delta-lognormal mean.
+    """
+    locs, scales, weights = components
+    nodes, node_weights = _hermite_nodes(n_nodes)
+    log_values = locs[:, None] + scales[:, None] * nodes[None, :]
+    return np.exp(log_values).ravel(), np.outer(weights, node_weights).ravel()
+
+
+def delta_lognormal_cdf(
+    components: Tuple[np.ndarray, np.ndarray, np.ndarray]
+) -> Callable:
+    """
+    Posterior CDF of delta-lognormal mean as a mixture of log-normal CDFs.
+    """
+    locs, scales, weights = components
+
+    def cdf(x: np.ndarray) -> np.ndarray:
+        res = np.empty(len(x))
+        block_size = max(1, CDF_BLOCK_ELEMENTS // len(locs))
+        for start in range(0, len(x), block_size):
+            block = slice(start, start + block_size)
+            with np.errstate(divide="ignore"):
+                z = (np.log(x[block])[:, None] - locs[None, :]) / scales[None, :]
+            res[block] = special.ndtr(z) @ weights
+        return res
+
+    return cdf
+
+
+def integrate_nodes(
+    values: List[np.ndarray], weights: List[np.ndarray], cdfs: List[Callable]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Probabilities of being best, expected loss and expected total gain from quadrature rules.
+    P(i is max) = E[prod_{j != i} F_j(X_i)],
+    E[max_j X_j] = sum_i E[X_i * prod_{j != i} F_j(X_i)],
+    E[max_j X_j - X_i] = E[max_j X_j] - E[X_i].
+    Parameters
+    ----------
+    values : List of quadrature nodes (values of posterior variable) for each variant.
+    weights : List of quadrature weights for each variant.
+    cdfs : List of posterior CDFs for each variant.
+    Returns
+    -------
+    pbbs : Array of probabilities of being best for each variant.
+    loss : Array of expected loss for each variant.
+    total_gain : Array of expected total gains for each variant.
+    """
+    n_variants = len(values)
+    pbbs = np.empty(n_variants)
+    max_parts = np.empty(n_variants)
+    means = np.array([np.sum(weights[i] * values[i]) for i in range(n_variants)])
+    for i in range(n_variants):
+        others = np.ones(len(values[i]))
+        for j in range(n_variants):
+            if j != i:
+                others *= cdfs[j](values[i])
+        pbbs[i] = np.sum(weights[i] * others)
+        max_parts[i] = np.sum(weights[i] * values[i] * others)
+
+    loss = np.sum(max_parts) - means
+    return pbbs, loss, two_variant_differences(means)
+
+
+def _check_finite(res: Tuple[np.ndarray, np.ndarray, np.ndarray], n_nodes: int) -> None:
+    pbbs, loss, _ = res
+    if not (np.all(np.isfinite(pbbs)) and np.all(np.isfinite(loss))):
+        raise QuadratureError(
+            f"Quadrature results with {n_nodes} nodes are not finite "
+            "(posteriors are too heavy-tailed)."
+        )
+
+
+def _integrate_adaptive(
+    evaluate: Callable[[int], Tuple[np.ndarray, np.ndarray, np.ndarray]],
+    tol: float,
+    node_counts: Sequence[int] = NODE_COUNTS,
+) -> Tuple[List[float], List[float], List[float]]:
+    """
+    Increase number of quadrature nodes until consecutive results differ by less than tol.
+    Raises QuadratureError if results are not finite, warns if tol is not reached
+    with the largest number of nodes.
+    """
+    # overflows of heavy-tailed posteriors are reported by _check_finite
+    with np.errstate(over="ignore", invalid="ignore"):
+        res = evaluate(node_counts[0])
+    _check_finite(res, node_counts[0])
+    error = np.inf
+    for n_nodes in node_counts[1:]:
+        with np.errstate(over="ignore", invalid="ignore"):
+            new_res = evaluate(n_nodes)
+        _check_finite(new_res, n_nodes)
+        error = max(
+            np.max(np.abs(new_res[0] - res[0])), np.max(np.abs(new_res[1] - res[1]))
+        )
+        res = new_res
+        if error < tol:
+            break
+    else:
+        logger.warning(
+            f"Quadrature did not reach tolerance {tol} with {node_counts[-1]} nodes, "
+            f"last change of results was {error:.3g}."
+        )
+    pbbs, loss, total_gain = res
+    return (
+        list(np.clip(pbbs, 0, 1).round(7)),
+        list(np.maximum(loss, 0).round(7)),
+        list(total_gain.round(7)),
+    )
+
+
+def eval_beta_quadrature(
+    a_posteriors: List[float],
+    b_posteriors: List[float],
+    tol: float = 1e-6,
+) -> Tuple[List[float], List[float], List[float]]:
+    """
+    Probabilities of being best, expected loss and expected total gain for any number
+    of variants with Beta posteriors, computed by deterministic numerical integration.
+    Parameters
+    ----------
+    a_posteriors : List of posterior alpha parameters for Beta distributions for each variant.
+    b_posteriors : List of posterior beta parameters for Beta distributions for each variant.
+    tol : Absolute tolerance for probabilities of being best and expected loss.
+    Returns
+    -------
+    res_pbbs : List of probabilities of being best for each variant.
+    res_loss : List of expected loss for each variant.
+    res_total_gain : List of expected total gains for each variant.
+    """
+    cdfs = [
+        beta_cdf(a_posteriors[i], b_posteriors[i]) for i in range(len(a_posteriors))
+    ]
+
+    def evaluate(n_nodes: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # one dimensional rules are cheap, so they can use more nodes
+        rules = [
+            beta_nodes(a_posteriors[i], b_posteriors[i], 4 * n_nodes)
+            for i in range(len(a_posteriors))
+        ]
+        return integrate_nodes([r[0] for r in rules], [r[1] for r in rules], cdfs)
+
+    return _integrate_adaptive(evaluate, tol)
+
+
+def eval_delta_lognormal_quadrature(
+    a_posteriors_beta: List[float],
+    b_posteriors_beta: List[float],
+    a_posteriors_ig: List[float],
+    b_posteriors_ig: List[float],
+    w_posteriors: List[float],
+    m_posteriors: List[float],
+    tol: float = 1e-6,
+) -> Tuple[List[float], List[float], List[float]]:
+    """
+    Probabilities of being best, expected loss and expected total gain for any number
+    of delta-lognormal variants computed by deterministic numerical integration over
+    marginal posteriors of their means p * exp(mu + sigma^2 / 2).
+    Variants without positive observations (NaN normal posterior parameters)
+    have all posterior mass of the mean in zero.
+    Posterior means are heavy-tailed for few positive observations, then expected loss
+    does not converge and QuadratureError is raised if results are not finite.
+    Parameters
+    ----------
+    a_posteriors_beta : List of posterior alpha parameters for Beta distributions.
+    b_posteriors_beta : List of posterior beta parameters for Beta distributions.
+    a_posteriors_ig : List of posterior alphas for Inverse Gamma distributions.
+    b_posteriors_ig : List of posterior betas for Inverse Gamma distributions.
+    w_posteriors : List of posterior effective sample sizes.
+    m_posteriors : List of posterior means of logarithms of non-zero data.
+    tol : Absolute tolerance for probabilities of being best and expected loss.
+    Returns
+    -------
+    res_pbbs : List of probabilities of being best for each variant.
+    res_loss : List of expected loss for each variant.
+    res_total_gain : List of expected total gains for each variant.
+    """
+
+    def evaluate(n_nodes: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        values, weights, cdfs = [], [], []
+        for i in range(len(m_posteriors)):
+            if np.isnan(m_posteriors[i]):
+                values.append(np.zeros(1))
+                weights.append(np.ones(1))
+                cdfs.append(lambda x: np.ones(len(x)))
+                continue
+            components = _delta_lognormal_components(
+                a_posteriors_beta[i],
+                b_posteriors_beta[i],
+                a_posteriors_ig[i],
+                b_posteriors_ig[i],
+                w_posteriors[i],
+                m_posteriors[i],
+                n_nodes,
+            )
+            variant_values, variant_weights = delta_lognormal_nodes(components, n_nodes)
+            values.append(variant_values)
+            weights.append(variant_weights)
+            cdfs.append(delta_lognormal_cdf(components))
+        return integrate_nodes(values, weights, cdfs)
+
+    return _integrate_adaptive(evaluate, tol, DELTA_LOGNORMAL_NODE_COUNTS)
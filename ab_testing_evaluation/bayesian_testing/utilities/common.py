@@ -1,4 +1,8 @@
-from typing import List
+import os
+from typing import List, Union, Callable, Iterable
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
 
 
 def check_list_lengths(lists: List[List]) -> None:
@@ -12,3 +16,116 @@ def check_list_lengths(lists: List[List]) -> None:
     the_len = len(next(it))
     if not all(len(l) == the_len for l in it):
         raise ValueError("Not all lists have same length!")
+
+
+# numbers of set bits in all byte values (used if numpy does not have bitwise_count)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def count_set_bits(packed: np.ndarray) -> int:
+    """
+    Count bits set to one in bytes (e.g. binary data packed by np.packbits).
+    Parameters
+    ----------
+    packed : Array of uint8 values.
+    Returns
+    -------
+    res : Number of set bits.
+    """
+    if hasattr(np, "bitwise_count"):
+        return int(np.sum(np.bitwise_count(packed), dtype=np.int64))
+    return int(np.sum(_POPCOUNT_TABLE[packed], dtype=np.int64))
+
+
+def two_variant_differences(values: Union[List, np.ndarray]) -> np.ndarray:
+    """
+    Differences of values (e.g. means or sums of simulations) of each variant to the other
+    variant, as used by expected total gain, which is defined only for two variants.
+    Parameters
+    ----------
+    values : Array with values of variants along the first axis.
+    Returns
+    -------
+    res : Array of differences, all NaN if number of variants is not two.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) != 2:
+        return np.full(values.shape, np.nan)
+    return values - values[[1, 0]]
+
+
+def to_numpy_array(data, dtype: type = float) -> np.ndarray:
+    """
+    Convert one dimensional data (list, numpy array, pandas Series, Arrow array)
+    to numpy array without copying if possible. Missing values in pandas or Arrow data
+    (for float dtype) become NaN.
+    Parameters
+    ----------
+    data : One dimensional array-like data.
+    dtype : Numpy dtype of the result (None keeps dtype of the data).
+    Returns
+    -------
+    res : One dimensional numpy array.
+    """
+    if hasattr(data, "to_numpy") and not isinstance(data, np.ndarray):
+        try:
+            # Arrow arrays
+            data = data.to_numpy(zero_copy_only=False)
+        except TypeError:
+            # pandas Series (including nullable extension dtypes)
+            if dtype is not None and np.issubdtype(dtype, np.floating):
+                data = data.to_numpy(dtype=dtype, na_value=np.nan)
+            else:
+                data = data.to_numpy(dtype=dtype)
+    res = np.asarray(data, dtype=dtype)
+    if res.ndim != 1:
+        raise ValueError(f"Data needs to be one dimensional, got shape {res.shape}.")
+    return res
+
+
+def parallel_map(
+    fn: Callable,
+    iterables: List[Iterable],
+    n_jobs: int = None,
+    executor: Executor = None,
+) -> list:
+    """
+    Map function over arguments sequentially or in parallel, results keep the input order.
+    Parameters
+    ----------
+    fn : Function to be applied (needs to be picklable for process pools).
+    iterables : List of iterables with positional arguments of fn.
+    n_jobs : Number of worker processes of a temporary process pool
+        (None or 1 means no parallelism, -1 means all CPUs). Not used if executor is set.
+    executor : Existing executor (process or thread pool) to be used.
+    Returns
+    -------
+    res : List of results.
+    """
+    if executor is not None:
+        return list(executor.map(fn, *iterables))
+    if n_jobs is None or n_jobs == 1:
+        return list(map(fn, *iterables))
+    with ProcessPoolExecutor(max_workers=n_jobs if n_jobs > 0 else None) as pool:
+        return list(pool.map(fn, *iterables))
+
+
+def thread_map(fn: Callable, iterables: List[Iterable], n_threads: int = None) -> list:
+    """
+    Map function over arguments in a temporary thread pool, results keep the input order.
+    Useful for numpy work releasing the GIL (random generators, ufuncs, reductions).
+    Parameters
+    ----------
+    fn : Function to be applied.
+    iterables : List of iterables with positional arguments of fn.
+    n_threads : Number of threads (None or 1 means no threads, -1 means all CPUs).
+    Returns
+    -------
+    res : List of results.
+    """
+    if n_threads is None or n_threads == 1:
+        return list(map(fn, *iterables))
+    with ThreadPoolExecutor(
+        max_workers=n_threads if n_threads > 0 else os.cpu_count()
+    ) as pool:
+        return list(pool.map(fn, *iterables))
@@ -0,0 +1,127 @@
+"""
+Sequential run_ab_testing per config compared to run_ab_testing_batch with separate
+and merged queries, with a local stand-in for Athena returning synthetic aggregated data
+after fixed latency per scan of the source table.
+Run from ab_testing_evaluation directory: python benchmarks/benchmark_batch.py
+"""
+import re
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+from batch import plan_queries, run_ab_testing_batch
+from testing import AbTestEvaluationConfig, run_ab_testing
+
+N_TESTS = 32
+QUERY_LATENCY = 0.5
+QUERY_WORKERS = 8
+N_JOBS = -1
+
+BASE_CONFIG = {
+    "company_id": "century-games-ncmgu",
+    "project_id": "spongebob-x7d9q",
+    "test_name": "benchmark",
+    "ab_test_id": "benchmark",
+    "start_date": "2022-01-01",
+    "end_date": "2022-02-01",
+    "winsorized": False,
+    "personalized": True,
+    "datapoint_type": "one_datapoint_per_user_per_meta_date",
+    "n_days_spend": 0,
+    "min_first_login_date": "2022-01-01",
+    "max_first_login_date": "2022-02-01",
+    "variant_name_1": "P",
+    "variant_name_2": "C",
+    "a_prior_beta_1": 1.0,
+    "a_prior_beta_2": 1.0,
+    "b_prior_beta_1": 1.0,
+    "b_prior_beta_2": 1.0,
+    "m_prior_1": 1.0,
+    "m_prior_2": 1.0,
+    "a_prior_ig_1": 0.0,
+    "a_prior_ig_2": 0.0,
+    "b_prior_ig_1": 0.0,
+    "b_prior_ig_2": 0.0,
+    "w_prior_1": 0.01,
+    "w_prior_2": 0.01,
+    "initial_test_start_date": "2022-01-01",
+    "output_bucket": "benchmark",
+    "output_key": "benchmark.json",
+}
+
+
+# date window of a test, the same in single test and merged queries
+TEST_WINDOW = re.compile(
+    r"meta_date\s+BETWEEN\s+DATE '([\d-]+)'\s+AND\s+DATE '([\d-]+)'"
+)
+MERGED_TEST = re.compile(r"CASE WHEN (.*?) THEN '([^']+)' END")
+
+
+def synthetic_rows(window: str) -> list:
+    rng = np.random.default_rng(zlib.crc32(window.encode()))
+    rows = []
+    for test_group in ("P", "C"):
+        totals = int(rng.integers(50000, 100000))
+        positives = int(rng.binomial(totals, 0.02))
+        logs = rng.normal(1.0, 1.0, positives)
+        rows.append(
+            {
+                "test_group": test_group,
+                "totals": totals,
+                "positives": positives,
+                "sum_values": np.exp(logs).sum(),
+                "sum_logs": logs.sum(),
+                "sum_logs_squared": np.dot(logs, logs),
+            }
+        )
+    return rows
+
+
+def local_athena(query: str) -> pd.DataFrame:
+    """
+    Stand-in for Athena, data of a test depend only on its date window.
+    """
+    time.sleep(QUERY_LATENCY)
+    merged_tests = MERGED_TEST.findall(query)
+    if not merged_tests:
+        return pd.DataFrame(synthetic_rows(str(TEST_WINDOW.search(query).groups())))
+    return pd.DataFrame(
+        [
+            {"ab_test_id": ab_test_id, **row}
+            for predicate, ab_test_id in merged_tests
+            for row in synthetic_rows(str(TEST_WINDOW.search(predicate).groups()))
+        ]
+    )
+
+
+if __name__ == "__main__":
+    configs = [
+        AbTestEvaluationConfig(
+            **{
+                **BASE_CONFIG,
+                "ab_test_id": f"benchmark-{i}",
+                "end_date": f"2022-02-{i % 28 + 1:02d}",
+            }
+        )
+        for i in range(N_TESTS)
+    ]
+
+    start = time.perf_counter()
+    sequential = [run_ab_testing(config, local_athena) for config in configs]
+    sequential_seconds = time.perf_counter() - start
+
+    print(f"{N_TESTS} tests, query latency {QUERY_LATENCY} s")
+    print(f"sequential: {N_TESTS} scans, {sequential_seconds:.2f} s")
+    for merge_queries in (False, True):
+        n_scans = len(plan_queries(configs, merge_queries))
+        start = time.perf_counter()
+        batch = run_ab_testing_batch(
+            configs, local_athena, QUERY_WORKERS, N_JOBS, merge_queries
+        )
+        batch_seconds = time.perf_counter() - start
+        assert all(a.to_json() == b.to_json() for a, b in zip(sequential, batch))
+        print(
+            f"batch (merge_queries={merge_queries}, {QUERY_WORKERS} query workers): "
+            f"{n_scans} scans, {batch_seconds:.2f} s"
+        )
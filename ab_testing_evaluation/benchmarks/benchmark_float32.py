@@ -0,0 +1,73 @@
+"""
+Accuracy and speed of float32 simulations compared to float64 ones.
+Differences of float32 and float64 results are compared to Monte Carlo standard errors
+of float64 results estimated from repeated evaluations with different seeds.
+Run from ab_testing_evaluation directory: python benchmarks/benchmark_float32.py
+"""
+import timeit
+
+import numpy as np
+from bayesian_testing.metrics import eval_bernoulli_agg, eval_delta_lognormal_agg
+
+SEEDS = range(20)
+REPEATS = 5
+
+BERNOULLI_DATA = ([100000, 100000, 100000], [1000, 1050, 1010])
+DELTA_LOGNORMAL_DATA = (
+    [100000, 100000],
+    [1000, 1050],
+    [1500.0, 1600.0],
+    [3800.0, 4000.0],
+)
+
+
+def compare(name: str, evaluate, sim_count: int) -> None:
+    res = {
+        dtype: np.array(
+            [
+                evaluate(sim_count=sim_count, seed=seed, dtype=dtype)[:2]
+                for seed in SEEDS
+            ]
+        )
+        for dtype in (np.float64, np.float32)
+    }
+    # axes: seed, metric (probability of being best, expected loss), variant
+    mean_64, mean_32 = res[np.float64].mean(axis=0), res[np.float32].mean(axis=0)
+    se_64 = res[np.float64].std(axis=0, ddof=1)
+    seconds = {
+        dtype: min(
+            timeit.repeat(
+                lambda: evaluate(sim_count=sim_count, seed=0, dtype=dtype),
+                number=1,
+                repeat=REPEATS,
+            )
+        )
+        for dtype in (np.float64, np.float32)
+    }
+    print(f"{name}, sim_count={sim_count}")
+    for i, metric in enumerate(["prob_being_best", "expected_loss"]):
+        print(
+            f"  {metric:<16} max |mean32 - mean64| = "
+            f"{np.max(np.abs(mean_32[i] - mean_64[i])):.2e}, "
+            f"max Monte Carlo SE of one evaluation = {np.max(se_64[i]):.2e}"
+        )
+    print(
+        f"  time float64 {seconds[np.float64] * 1000:.1f} ms, "
+        f"float32 {seconds[np.float32] * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    for count in [20000, 200000]:
+        compare(
+            "bernoulli",
+            lambda **kwargs: eval_bernoulli_agg(*BERNOULLI_DATA, **kwargs),
+            count,
+        )
+        compare(
+            "delta-lognormal",
+            lambda **kwargs: eval_delta_lognormal_agg(
+                *DELTA_LOGNORMAL_DATA, cache_draws=False, **kwargs
+            ),
+            count,
+        )
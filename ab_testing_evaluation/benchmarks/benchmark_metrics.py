@@ -0,0 +1,50 @@
+"""
+Benchmark of estimation of probabilities of being best, expected loss and expected total gain
+from simulated data: separate estimate_* functions vs fused single-pass estimate_metrics.
+Run from ab_testing_evaluation directory: python benchmarks/benchmark_metrics.py
+"""
+import timeit
+
+import numpy as np
+from bayesian_testing.metrics.evaluation import (
+    _fused_sums,
+    estimate_metrics,
+    _fused_sums_numpy,
+    estimate_expected_loss,
+    estimate_probabilities,
+    estimate_expected_total_gain,
+)
+
+REPEATS = 20
+
+
+def separate_metrics(data: np.ndarray) -> tuple:
+    return (
+        estimate_probabilities(data),
+        estimate_expected_loss(data),
+        estimate_expected_total_gain(data),
+    )
+
+
+def fused_metrics_numpy(data: np.ndarray) -> tuple:
+    return _fused_sums_numpy(data)
+
+
+def run_benchmark(sim_count: int, seed: int = 42) -> None:
+    rng = np.random.default_rng(seed)
+    data = rng.beta([[100], [105]], [[900], [895]], (2, sim_count))
+    # first call compiles numba kernel (if numba is installed)
+    estimate_metrics(data)
+
+    for name, fn in [
+        ("separate estimate_* functions", separate_metrics),
+        ("fused, numpy fallback", fused_metrics_numpy),
+        (f"fused, estimate_metrics ({_fused_sums.__name__})", estimate_metrics),
+    ]:
+        seconds = min(timeit.repeat(lambda: fn(data), number=1, repeat=REPEATS))
+        print(f"sim_count={sim_count:>9}  {name:<45} {seconds * 1000:9.3f} ms")
+
+
+if __name__ == "__main__":
+    for count in [20000, 200000, 2000000]:
+        run_benchmark(count)
@@ -0,0 +1,192 @@
+"""
+Local disk cache of query results. Results are stored as Parquet files named by hash
+of normalized SQL and query parameters, they expire after TTL and least recently used
+results are evicted when the cache exceeds its size limit.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Union, Callable, Optional
+from pathlib import Path
+
+import pandas as pd
+
+# single quoted SQL strings (with '' escapes) are kept as they are by normalization
+SQL_STRING = re.compile(r"('(?:[^']|'')*')")
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Query with whitespace runs outside of string literals replaced by single space
+    and without trailing semicolon, so that formatting does not change the cache key.
+    """
+    parts = SQL_STRING.split(query)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"\s+", " ", parts[i])
+    return "".join(parts).strip().rstrip(";").rstrip()
+
+
+def _run_athena_query(query: str, params: Optional[dict] = None) -> pd.DataFrame:
+    from ml_lib.feature_store.offline.client import FeatureStoreOfflineClient
+
+    if params is None:
+        return FeatureStoreOfflineClient.run_athena_query_pandas(query)
+    return FeatureStoreOfflineClient.run_athena_query_pandas(query, params)
+
+
+class QueryCache:
+    """
+    Cache of query results on local disk, wrapping a query function such as
+    FeatureStoreOfflineClient.run_athena_query_pandas. Instances are callable with the
+    same arguments as the wrapped function (e.g. as query backend of run_ab_testing).
+    Creation time of a result is the modification time of its file, last use is its
+    access time (set explicitly on every hit).
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path] = ".query_cache",
+        ttl: Optional[float] = None,
+        max_bytes: int = 2**30,
+        run_query: Callable[..., pd.DataFrame] = _run_athena_query,
+    ) -> None:
+        """
+        Initialize QueryCache class.
+        Parameters
+        ----------
+        cache_dir : Directory with cached results (created if missing).
+        ttl : Time to live of results in seconds, results never expire if None.
+        max_bytes : Maximal total size of cached results in bytes.
+        run_query : Function running query (with optional parameters) uncached,
+            Athena through the offline feature store by default.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.run_query = run_query
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, params: Optional[dict] = None) -> str:
+        """
+        Cache key of query, hash of normalized SQL and parameters.
+        """
+        content = json.dumps(
+            [normalize_sql(query), params], sort_keys=True, default=str
+        )
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def _read(self, path: Path) -> Optional[pd.DataFrame]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        now = time.time()
+        if self.ttl is not None and now - stat.st_mtime > self.ttl:
+            path.unlink(missing_ok=True)
+            self.expired += 1
+            return None
+        try:
+            data = pd.read_parquet(path)
+        except FileNotFoundError:
+            # evicted by another process
+            return None
+        # access time marks the last use for LRU eviction
+        os.utime(path, (now, stat.st_mtime))
+        return data
+
+    def _write(self, path: Path, data: pd.DataFrame) -> None:
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}")
+        try:
+            data.to_parquet(tmp_path)
+        except (ValueError, TypeError, ImportError):
+            # results which cannot be stored as Parquet (e.g. mixed types) are not cached
+            tmp_path.unlink(missing_ok=True)
+            return
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _cached_files(self) -> list:
+        files = []
+        for path in self.cache_dir.glob("*.parquet"):
+            try:
+                files.append((path.stat(), path))
+            except FileNotFoundError:
+                pass
+        return files
+
+    def _evict(self) -> None:
+        files = self._cached_files()
+        total_bytes = sum(stat.st_size for stat, _ in files)
+        for stat, path in sorted(files, key=lambda file: file[0].st_atime):
+            if total_bytes <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_bytes -= stat.st_size
+            self.evictions += 1
+
+    def __call__(self, query: str, params: Optional[dict] = None) -> pd.DataFrame:
+        """
+        Result of query, from cache if available.
+        Parameters
+        ----------
+        query : SQL query.
+        params : Query parameters passed to the query function.
+        Returns
+        -------
+        data : Query result.
+        """
+        path = self._path(self.key(query, params))
+        with self._lock:
+            data = self._read(path)
+            if data is not None:
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        if params is None:
+            data = self.run_query(query)
+        else:
+            data = self.run_query(query, params)
+
+        with self._lock:
+            self._write(path, data)
+        return data
+
+    def clear(self) -> None:
+        """
+        Remove all cached results.
+        """
+        with self._lock:
+            for path in self.cache_dir.glob("*.parquet"):
+                path.unlink(missing_ok=True)
+
+    @property
+    def metrics(self) -> Dict[str, Union[int, float]]:
+        """
+        Numbers of hits, misses, expired and evicted results, hit rate
+        and current size of the cache in bytes.
+        """
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "size_bytes": sum(stat.st_size for stat, _ in self._cached_files()),
+        }
+
+    def __repr__(self) -> str:
+        return f"QueryCache(cache_dir={str(self.cache_dir)!r}, metrics={self.metrics})"
@@ -0,0 +1,345 @@
+"""
+Incremental evaluation of running tests. Daily sufficient statistics of tests
+(per test, test_group and meta_date) are kept in a SQLite file, each run queries only
+dates missing in the store (and the last days, which can still change) and evaluates
+the test from sums of stored statistics.
+The SQLite file is a local file, it can be synchronized with S3 between runs.
+Usage: python stats_store.py --store-path stats.sqlite [--store-bucket b --store-key k]
+"""
+import json
+import hashlib
+import sqlite3
+import argparse
+from typing import Set, List, Tuple
+from datetime import datetime, timedelta
+
+import boto3
+import pandas as pd
+from testing import (
+    QueryBackend,
+    AbTestEvaluationConfig,
+    PossibleDatapointTypes,
+    build_data_query,
+    evaluate_ab_test,
+    run_athena_query,
+    upload_output_to_s3,
+    build_too_early_output,
+    is_too_early_to_run_test,
+)
+from botocore.exceptions import ClientError
+
+STATS_COLUMNS = ["totals", "positives", "sum_values", "sum_logs", "sum_logs_squared"]
+
+
+class DailyStatsStore:
+    """
+    SQLite store of daily sufficient statistics of tests. Dates whose data were queried
+    are recorded separately, so that days without any data are not queried again.
+    """
+
+    def __init__(self, path: str = ":memory:") -> None:
+        """
+        Initialize DailyStatsStore class.
+        Parameters
+        ----------
+        path : Path to SQLite file (created if missing), in memory store by default.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS daily_stats (
+                    stats_key TEXT NOT NULL,
+                    test_group TEXT NOT NULL,
+                    meta_date TEXT NOT NULL,
+                    totals INTEGER,
+                    positives INTEGER,
+                    sum_values REAL,
+                    sum_logs REAL,
+                    sum_logs_squared REAL,
+                    PRIMARY KEY (stats_key, test_group, meta_date)
+                )"""
+            )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS covered_dates (
+                    stats_key TEXT NOT NULL,
+                    meta_date TEXT NOT NULL,
+                    PRIMARY KEY (stats_key, meta_date)
+                )"""
+            )
+
+    def covered_dates(
+        self, stats_key: str, first_date: str, last_date: str
+    ) -> Set[str]:
+        """
+        Dates between first_date and last_date (inclusive) with data in the store.
+        """
+        rows = self.connection.execute(
+            "SELECT meta_date FROM covered_dates"
+            " WHERE stats_key = ? AND meta_date BETWEEN ? AND ?",
+            (stats_key, first_date, last_date),
+        )
+        return {meta_date for (meta_date,) in rows}
+
+    def add(
+        self, stats_key: str, daily_df: pd.DataFrame, first_date: str, last_date: str
+    ) -> None:
+        """
+        Replace statistics of dates between first_date and last_date (inclusive).
+        Parameters
+        ----------
+        stats_key : Key of test statistics (see stats_key).
+        daily_df : Result of daily data query (build_data_query with daily=True).
+        first_date : First queried date.
+        last_date : Last queried date.
+        """
+        daily_df = daily_df[daily_df.test_group.notna()]
+        meta_dates = pd.to_datetime(daily_df.meta_date).dt.strftime("%Y-%m-%d")
+        rows = [
+            (stats_key, test_group, meta_date, *stats)
+            for test_group, meta_date, *stats in zip(
+                daily_df.test_group,
+                meta_dates,
+                *(daily_df[column].tolist() for column in STATS_COLUMNS),
+            )
+        ]
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM daily_stats"
+                " WHERE stats_key = ? AND meta_date BETWEEN ? AND ?",
+                (stats_key, first_date, last_date),
+            )
+            self.connection.executemany(
+                "INSERT INTO daily_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO covered_dates VALUES (?, ?)",
+                [(stats_key, date) for date in _date_range(first_date, last_date)],
+            )
+
+    def aggregate(
+        self, stats_key: str, first_date: str, last_date: str
+    ) -> pd.DataFrame:
+        """
+        Statistics of dates between first_date and last_date (inclusive) per test_group,
+        in format of result of build_data_query.
+        """
+        return pd.read_sql_query(
+            """
+            SELECT MAX(meta_date) AS meta_date
+                , test_group
+                , SUM(totals) AS totals
+                , SUM(positives) AS positives
+                , SUM(sum_values) AS sum_values
+                , SUM(sum_logs) AS sum_logs
+                , SUM(sum_logs_squared) AS sum_logs_squared
+            FROM daily_stats
+            WHERE stats_key = ? AND meta_date BETWEEN ? AND ?
+            GROUP BY test_group""",
+            self.connection,
+            params=(stats_key, first_date, last_date),
+        )
+
+    def daily(self, stats_key: str, first_date: str, last_date: str) -> pd.DataFrame:
+        """
+        Statistics of dates between first_date and last_date (inclusive) per meta_date
+        and test_group, in format of result of daily data query.
+        """
+        return pd.read_sql_query(
+            f"""
+            SELECT meta_date, test_group, {", ".join(STATS_COLUMNS)}
+            FROM daily_stats
+            WHERE stats_key = ? AND meta_date BETWEEN ? AND ?
+            ORDER BY meta_date, test_group""",
+            self.connection,
+            params=(stats_key, first_date, last_date),
+        )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "DailyStatsStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def _date_range(first_date: str, last_date: str) -> List[str]:
+    first = datetime.strptime(first_date, "%Y-%m-%d")
+    n_days = (datetime.strptime(last_date, "%Y-%m-%d") - first).days
+    return [(first + timedelta(i)).strftime("%Y-%m-%d") for i in range(n_days + 1)]
+
+
+def _shift_date(date: str, days: int) -> str:
+    return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days)).strftime("%Y-%m-%d")
+
+
+def _date_runs(dates: List[str]) -> List[Tuple[str, str]]:
+    """
+    First and last dates of runs of consecutive days in sorted dates.
+    """
+    runs = []
+    for date in dates:
+        if runs and _shift_date(runs[-1][1], 1) == date:
+            runs[-1] = (runs[-1][0], date)
+        else:
+            runs.append((date, date))
+    return runs
+
+
+def date_offset(config: AbTestEvaluationConfig) -> int:
+    """
+    Number of days between date of daily statistics and end date of data they include
+    (first n day spend statistics are dated by first_login, n - 1 days before).
+    """
+    if (
+        config.datapoint_type
+        == PossibleDatapointTypes.one_datapoint_per_user_first_n_day_spend
+        and config.n_days_spend
+    ):
+        return config.n_days_spend - 1
+    return 0
+
+
+def stats_key(config: AbTestEvaluationConfig) -> str:
+    """
+    Key of daily statistics of the test, tests share statistics only if all settings
+    of their data query except of dates are the same.
+    """
+    settings = {
+        name: getattr(config, name)
+        for name in [
+            "company_id",
+            "project_id",
+            "datapoint_type",
+            "n_days_spend",
+            "winsorized",
+            "personalized",
+            "min_first_login_date",
+            "max_first_login_date",
+        ]
+    }
+    digest = hashlib.sha1(json.dumps(settings, default=str).encode()).hexdigest()
+    return f"{config.ab_test_id}:{digest[:16]}"
+
+
+def stats_date_range(config: AbTestEvaluationConfig) -> Tuple[str, str]:
+    """
+    First and last date of daily statistics of the test.
+    """
+    offset = date_offset(config)
+    return _shift_date(config.start_date, -offset), _shift_date(
+        config.end_date, -offset
+    )
+
+
+def run_ab_testing_incremental(
+    config: AbTestEvaluationConfig,
+    store: DailyStatsStore,
+    query_backend: QueryBackend = run_athena_query,
+    refresh_last_days: int = 1,
+) -> pd.DataFrame:
+    """
+    Evaluate the test as run_ab_testing, querying only dates missing in the store.
+    Parameters
+    ----------
+    config : Test configuration.
+    store : Store of daily statistics, updated by queried data.
+    query_backend : Function running SQL query and returning its result as DataFrame.
+    refresh_last_days : Number of last days of the test queried again even if stored
+        (data of the newest partitions can still be incomplete).
+    Returns
+    -------
+    output_df : One row DataFrame with test inputs, results and definition.
+    """
+    if is_too_early_to_run_test(config):
+        return build_too_early_output(config)
+
+    update_store(config, store, query_backend, refresh_last_days)
+    first_date, last_date = stats_date_range(config)
+    return evaluate_ab_test(
+        config, store.aggregate(stats_key(config), first_date, last_date)
+    )
+
+
+def update_store(
+    config: AbTestEvaluationConfig,
+    store: DailyStatsStore,
+    query_backend: QueryBackend = run_athena_query,
+    refresh_last_days: int = 1,
+) -> None:
+    """
+    Query daily statistics of the test for dates missing in the store (and for last
+    refresh_last_days days of the test) and add them to the store. Every run
+    of consecutive missing dates is queried separately, so stored days between
+    gaps are not scanned again.
+    """
+    key = stats_key(config)
+    first_date, last_date = stats_date_range(config)
+    dates = _date_range(first_date, last_date)
+    covered = store.covered_dates(key, first_date, last_date)
+    missing = [
+        date
+        for i, date in enumerate(dates)
+        if date not in covered or i >= len(dates) - refresh_last_days
+    ]
+
+    offset = date_offset(config)
+    for run_first_date, run_last_date in _date_runs(missing):
+        query_config = config.copy(
+            update={
+                "start_date": _shift_date(run_first_date, offset),
+                "end_date": _shift_date(run_last_date, offset),
+            }
+        )
+        daily_df = query_backend(build_data_query(query_config, daily=True))
+        store.add(key, daily_df, run_first_date, run_last_date)
+
+
+def download_store_from_s3(bucket: str, key: str, path: str) -> None:
+    """
+    Download store file from S3, a new store is started if there is no such object.
+    """
+    try:
+        boto3.client("s3").download_file(bucket, key, path)
+    except ClientError as error:
+        if error.response["Error"]["Code"] not in ("404", "NoSuchKey"):
+            raise
+
+
+def upload_store_to_s3(path: str, bucket: str, key: str) -> None:
+    boto3.client("s3").upload_file(path, bucket, key)
+
+
+if __name__ == "__main__":
+    from ml_lib.util.sentry import configure_sentry
+
+    parser = argparse.ArgumentParser(description="Evaluate A/B test incrementally.")
+    parser.add_argument("--store-path", required=True, help="SQLite file of the store.")
+    parser.add_argument("--store-bucket", default=None)
+    parser.add_argument("--store-key", default=None)
+    parser.add_argument("--refresh-last-days", type=int, default=1)
+    args = parser.parse_args()
+
+    configure_sentry()
+
+    ab_test_config = AbTestEvaluationConfig()
+    sync_with_s3 = args.store_bucket and args.store_key
+    if sync_with_s3:
+        download_store_from_s3(args.store_bucket, args.store_key, args.store_path)
+
+    with DailyStatsStore(args.store_path) as stats_store:
+        ab_testing_output = run_ab_testing_incremental(
+            ab_test_config, stats_store, refresh_last_days=args.refresh_last_days
+        )
+
+    if sync_with_s3:
+        upload_store_to_s3(args.store_path, args.store_bucket, args.store_key)
+    upload_output_to_s3(
+        output=ab_testing_output,
+        bucket=ab_test_config.output_bucket,
+        key=ab_test_config.output_key,
+    )
@@ -1,5 +1,6 @@
 from enum import Enum
 from datetime import datetime, timedelta
+from typing import Callable, List, Optional
 
 import boto3
 import pandas as pd
@@ -75,8 +76,26 @@ class AbTestEvaluationConfig(
     output_key: str
 
 
-def run_ab_testing(config: AbTestEvaluationConfig) -> pd.DataFrame:
-    # create dict for saving the test definition
+QueryBackend = Callable[[str], pd.DataFrame]
+
+
+def run_athena_query(query: str) -> pd.DataFrame:
+    """
+    Default query backend, runs the query in Athena through the offline feature store.
+    """
+    return FeatureStoreOfflineClient.run_athena_query_pandas(query)
+
+
+def _spend_offset(config: AbTestEvaluationConfig) -> Optional[str]:
+    if config.n_days_spend:
+        return str(config.n_days_spend - 1)
+    return None
+
+
+def build_test_definition(config: AbTestEvaluationConfig) -> dict:
+    """
+    Test definition saved together with the results.
+    """
     test_definition_dict = {
         "company_id": config.company_id.value,
         "project_id": config.project_id.value,
@@ -91,34 +110,13 @@ def run_ab_testing(config: AbTestEvaluationConfig) -> pd.DataFrame:
         "max_first_login_date": config.max_first_login_date,
     }
 
-    sanitized_company_id = config.company_id.replace("-", "_")
-    sanitized_project_id = config.project_id.replace("-", "_")
+    return test_definition_dict
 
-    # prepare query params
-    if config.personalized:
-        personalized_num: int = 0
-    else:
-        personalized_num = 9
-
-    if config.winsorized:
-        spend_column: str = "wins_spend"
-    else:
-        spend_column = "spend"
 
-    if config.project_id in ["spongebob-x7d9q", "terragenesis-m89uz"]:
-        spending_line = f", SUM({spend_column}) as total_spend"
-    else:
-        spending_line = f", COALESCE(SUM(CASE WHEN fl_personalized_offer_spend <> {personalized_num} THEN {spend_column} END), 0) total_spend"
-
-    if config.n_days_spend:
-        spend_offset = str(config.n_days_spend - 1)
-
-    if sanitized_project_id == "idle_mafia_ecbqb":
-        table_name = 'user_level_performance_after_1_6_2022'
-    else: 
-        table_name = 'user_level_performance'
-
-    # check whether it isn't too early to perform the test
+def is_too_early_to_run_test(config: AbTestEvaluationConfig) -> bool:
+    """
+    Check whether it isn't too early to perform the test (no complete data yet).
+    """
     too_early_to_run_test = False
     end_date_datetime = datetime.strptime(config.end_date, "%Y-%m-%d")
     initial_test_start_date_datetime = datetime.strptime(
@@ -135,70 +133,141 @@ def run_ab_testing(config: AbTestEvaluationConfig) -> pd.DataFrame:
         == PossibleDatapointTypes.one_datapoint_per_user_first_n_day_spend
     ):
         if (
-            end_date_datetime - timedelta(int(spend_offset))
+            end_date_datetime - timedelta(int(_spend_offset(config)))
             < initial_test_start_date_datetime
         ):
             too_early_to_run_test = True
 
-    if too_early_to_run_test:
-        inputs_dict = {
-            "totals_variant_1": 0.0,
-            "totals_variant_2": 0.0,
-            "positives_variant_1": 0.0,
-            "positives_variant_2": 0.0,
-            "sum_values_variant_1": 0.0,
-            "sum_values_variant_2": 0.0,
-            "sum_logs_variant_1": 0.0,
-            "sum_logs_variant_2": 0.0,
-            "sum_logs_squared_variant_1": 0.0,
-            "sum_logs_squared_variant_2": 0.0,
-            "a_prior_beta_variant_1": 0.0,
-            "a_prior_beta_variant_2": 0.0,
-            "b_prior_beta_variant_1": 0.0,
-            "b_prior_beta_variant_2": 0.0,
-            "m_prior_variant_1": 0.0,
-            "m_prior_variant_2": 0.0,
-            "a_prior_ig_variant_1": 0.0,
-            "a_prior_ig_variant_2": 0.0,
-            "b_prior_ig_variant_1": 0.0,
-            "b_prior_ig_variant_2": 0.0,
-            "w_prior_variant_1": 0.0,
-            "w_prior_variant_2": 0.0,
-        }
-
-        results_dict = {
-            "too_early_to_run_test": too_early_to_run_test,
-            "prob_being_best_variant_1": None,
-            "prob_being_best_variant_2": None,
-            "expected_loss_variant_1": None,
-            "expected_loss_variant_2": None,
-            "expected_total_gain_variant_1": None,
-            "expected_total_gain_variant_2": None,
-        }
-
-        output_dict = {
-            "inputs": inputs_dict,
-            "name_variant_1": config.variant_name_1,
-            "name_variant_2": config.variant_name_2,
-            "a_post_beta_variant_1": config.a_prior_beta_1,
-            "a_post_beta_variant_2": config.a_prior_beta_2,
-            "b_post_beta_variant_1": config.b_prior_beta_1,
-            "b_post_beta_variant_2": config.b_prior_beta_2,
-            "m_post_variant_1": config.m_prior_1,
-            "m_post_variant_2": config.m_prior_2,
-            "a_post_ig_variant_1": config.a_prior_ig_1,
-            "a_post_ig_variant_2": config.a_prior_ig_2,
-            "b_post_ig_variant_1": config.b_prior_ig_1,
-            "b_post_ig_variant_2": config.b_prior_ig_2,
-            "w_post_variant_1": config.w_prior_1,
-            "w_post_variant_2": config.w_prior_2,
-            "results": results_dict,
-            "test_definition": test_definition_dict,
-        }
-
-        output_df = pd.Series(output_dict).to_frame().transpose()
-
-        return output_df
+    return too_early_to_run_test
+
+
+def build_too_early_output(config: AbTestEvaluationConfig) -> pd.DataFrame:
+    """
+    Output of a test which is too early to run, priors are reported as posteriors.
+    """
+    return _build_prior_output(config, too_early_to_run_test=True)
+
+
+def build_error_output(config: AbTestEvaluationConfig, error: str) -> pd.DataFrame:
+    """
+    Output of a test which failed to be queried or evaluated, priors are reported
+    as posteriors and the error message is added to results.
+    """
+    return _build_prior_output(config, too_early_to_run_test=False, error=error)
+
+
+def _build_prior_output(
+    config: AbTestEvaluationConfig, too_early_to_run_test: bool, error: str = None
+) -> pd.DataFrame:
+    test_definition_dict = build_test_definition(config)
+
+    inputs_dict = {
+        "totals_variant_1": 0.0,
+        "totals_variant_2": 0.0,
+        "positives_variant_1": 0.0,
+        "positives_variant_2": 0.0,
+        "sum_values_variant_1": 0.0,
+        "sum_values_variant_2": 0.0,
+        "sum_logs_variant_1": 0.0,
+        "sum_logs_variant_2": 0.0,
+        "sum_logs_squared_variant_1": 0.0,
+        "sum_logs_squared_variant_2": 0.0,
+        "a_prior_beta_variant_1": 0.0,
+        "a_prior_beta_variant_2": 0.0,
+        "b_prior_beta_variant_1": 0.0,
+        "b_prior_beta_variant_2": 0.0,
+        "m_prior_variant_1": 0.0,
+        "m_prior_variant_2": 0.0,
+        "a_prior_ig_variant_1": 0.0,
+        "a_prior_ig_variant_2": 0.0,
+        "b_prior_ig_variant_1": 0.0,
+        "b_prior_ig_variant_2": 0.0,
+        "w_prior_variant_1": 0.0,
+        "w_prior_variant_2": 0.0,
+    }
+
+    results_dict = {
+        "too_early_to_run_test": too_early_to_run_test,
+        "prob_being_best_variant_1": None,
+        "prob_being_best_variant_2": None,
+        "expected_loss_variant_1": None,
+        "expected_loss_variant_2": None,
+        "expected_total_gain_variant_1": None,
+        "expected_total_gain_variant_2": None,
+    }
+    if error is not None:
+        results_dict["error"] = error
+
+    output_dict = {
+        "inputs": inputs_dict,
+        "name_variant_1": config.variant_name_1,
+        "name_variant_2": config.variant_name_2,
+        "a_post_beta_variant_1": config.a_prior_beta_1,
+        "a_post_beta_variant_2": config.a_prior_beta_2,
+        "b_post_beta_variant_1": config.b_prior_beta_1,
+        "b_post_beta_variant_2": config.b_prior_beta_2,
+        "m_post_variant_1": config.m_prior_1,
+        "m_post_variant_2": config.m_prior_2,
+        "a_post_ig_variant_1": config.a_prior_ig_1,
+        "a_post_ig_variant_2": config.a_prior_ig_2,
+        "b_post_ig_variant_1": config.b_prior_ig_1,
+        "b_post_ig_variant_2": config.b_prior_ig_2,
+        "w_post_variant_1": config.w_prior_1,
+        "w_post_variant_2": config.w_prior_2,
+        "results": results_dict,
+        "test_definition": test_definition_dict,
+    }
+
+    output_df = pd.Series(output_dict).to_frame().transpose()
+
+    return output_df
+
+
+def _source_table(config: AbTestEvaluationConfig) -> str:
+    sanitized_company_id = config.company_id.replace("-", "_")
+    sanitized_project_id = config.project_id.replace("-", "_")
+
+    if sanitized_project_id == "idle_mafia_ecbqb":
+        table_name = "user_level_performance_after_1_6_2022"
+    else:
+        table_name = "user_level_performance"
+
+    return f"analytics__{sanitized_company_id}__{sanitized_project_id}.{table_name}"
+
+
+def build_data_query(config: AbTestEvaluationConfig, daily: bool = False) -> str:
+    """
+    Athena query aggregating data of test variants (totals, positives, sums of values,
+    of logarithms of values and of their squares per test_group).
+    If daily, data are aggregated per meta_date (first_login for first n day spend)
+    and test_group, sums of daily statistics give statistics of the whole test.
+    """
+    # prepare query params
+    if config.personalized:
+        personalized_num: int = 0
+    else:
+        personalized_num = 9
+
+    if config.winsorized:
+        spend_column: str = "wins_spend"
+    else:
+        spend_column = "spend"
+
+    if config.project_id in ["spongebob-x7d9q", "terragenesis-m89uz"]:
+        spending_line = f", SUM({spend_column}) as total_spend"
+    else:
+        spending_line = f", COALESCE(SUM(CASE WHEN fl_personalized_offer_spend <> {personalized_num} THEN {spend_column} END), 0) total_spend"
+
+    spend_offset = _spend_offset(config)
+
+    source_table = _source_table(config)
+
+    if daily:
+        date_column: str = "meta_date"
+        group_by_columns: str = "meta_date, test_group"
+    else:
+        date_column = "MAX(meta_date) as meta_date"
+        group_by_columns = "test_group"
 
     if (
         config.datapoint_type
@@ -215,7 +284,7 @@ def run_ab_testing(config: AbTestEvaluationConfig) -> pd.DataFrame:
                             WHEN group_tag = 'personalized' THEN 'P'
                         END                                                                              test_group
                         {spending_line}
-                    FROM analytics__{sanitized_company_id}__{sanitized_project_id}.{table_name}
+                    FROM {source_table}
                     WHERE meta_date  BETWEEN  DATE '{config.start_date}' AND  DATE '{config.end_date}'
                     AND first_login BETWEEN DATE '{config.min_first_login_date}' AND DATE '{config.max_first_login_date}'
                     GROUP BY user_id
@@ -224,7 +293,7 @@ def run_ab_testing(config: AbTestEvaluationConfig) -> pd.DataFrame:
                         , group_tag
                     )
 
-            SELECT MAX(meta_date) as meta_date
+            SELECT {date_column}
                 , test_group
                 , COUNT(*)                                         AS totals
                 , SUM(CASE WHEN total_spend > 0 THEN 1 ELSE 0 END) AS positives
@@ -232,7 +301,7 @@ def run_ab_testing(config: AbTestEvaluationConfig) -> pd.DataFrame:
                 , SUM(LN(CASE WHEN total_spend > 0 THEN total_spend END)) AS sum_logs
                 , SUM(power(LN(CASE WHEN total_spend > 0 THEN total_spend END), 2.0)) AS sum_logs_squared
             FROM base_table
-            GROUP BY test_group;"""
+            GROUP BY {group_by_columns};"""
     elif (
         config.datapoint_type
         == PossibleDatapointTypes.one_datapoint_per_user_first_n_day_spend
@@ -247,7 +316,7 @@ def run_ab_testing(config: AbTestEvaluationConfig) -> pd.DataFrame:
                         WHEN group_tag = 'personalized' THEN 'P'
                     END                             test_group
                     {spending_line}
-                FROM analytics__{sanitized_company_id}__{sanitized_project_id}.{table_name}
+                FROM {source_table}
                 WHERE first_login BETWEEN  DATE '{config.start_date}' - INTERVAL '{spend_offset}' DAY AND  DATE '{config.end_date}' - INTERVAL '{spend_offset}' DAY
                 AND first_login >= DATE '{config.min_first_login_date}'
                 GROUP BY user_id
@@ -269,7 +338,182 @@ def run_ab_testing(config: AbTestEvaluationConfig) -> pd.DataFrame:
                 )
             
             
-            SELECT MAX(meta_date) as meta_date
+            SELECT {date_column}
+                , test_group
+                , COUNT(*)                                              AS totals
+                , SUM(CASE WHEN total_spend > 0 THEN 1 ELSE 0 END) AS positives
+                , SUM(total_spend) AS sum_values
+                , SUM(LN(CASE WHEN total_spend > 0 THEN total_spend END)) AS sum_logs
+                , SUM(power(LN(CASE WHEN total_spend > 0 THEN total_spend END), 2.0)) AS sum_logs_squared
+            FROM base_table
+            GROUP BY {group_by_columns};"""
+
+    return data_query
+
+
+def merged_query_key(config: AbTestEvaluationConfig) -> tuple:
+    """
+    Tests with the same key read the same source table the same way and can share
+    one merged query (see build_merged_data_query).
+    """
+    return _source_table(config), config.datapoint_type
+
+
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _merged_test_predicate(config: AbTestEvaluationConfig) -> str:
+    if (
+        config.datapoint_type
+        == PossibleDatapointTypes.one_datapoint_per_user_per_meta_date
+    ):
+        return (
+            f"meta_date BETWEEN DATE '{config.start_date}' AND DATE '{config.end_date}'"
+            f" AND first_login BETWEEN DATE '{config.min_first_login_date}'"
+            f" AND DATE '{config.max_first_login_date}'"
+        )
+    spend_offset = _spend_offset(config)
+    return (
+        f"first_login BETWEEN DATE '{config.start_date}' - INTERVAL '{spend_offset}' DAY"
+        f" AND DATE '{config.end_date}' - INTERVAL '{spend_offset}' DAY"
+        f" AND first_login >= DATE '{config.min_first_login_date}'"
+    )
+
+
+def _merged_spending_line(configs: List[AbTestEvaluationConfig]) -> str:
+    # spend column and personalized filter of each test, selected by its ab_test_id
+    whens = []
+    for config in configs:
+        spend_column = "wins_spend" if config.winsorized else "spend"
+        condition = f"tests.ab_test_id = {_sql_string(config.ab_test_id)}"
+        if configs[0].project_id not in ["spongebob-x7d9q", "terragenesis-m89uz"]:
+            personalized_num = 0 if config.personalized else 9
+            condition += f" AND fl_personalized_offer_spend <> {personalized_num}"
+        whens.append(f"WHEN {condition} THEN {spend_column}")
+    spend = "CASE " + " ".join(whens) + " END"
+
+    if configs[0].project_id in ["spongebob-x7d9q", "terragenesis-m89uz"]:
+        return f", SUM({spend}) as total_spend"
+    return f", COALESCE(SUM({spend}), 0) total_spend"
+
+
+def build_merged_data_query(configs: List[AbTestEvaluationConfig]) -> str:
+    """
+    One Athena query aggregating data of variants of many tests (see build_data_query)
+    with a single scan of their source table. Rows are assigned to tests by per-test
+    CASE filters and aggregated per ab_test_id and test_group.
+    Parameters
+    ----------
+    configs : Configurations of tests with the same merged_query_key and unique ab_test_id.
+    Returns
+    -------
+    data_query : SQL query, its result has column ab_test_id and columns of build_data_query.
+    """
+    if len({merged_query_key(config) for config in configs}) != 1:
+        raise ValueError("Merged tests need to share source table and datapoint type.")
+    if len({config.ab_test_id for config in configs}) != len(configs):
+        raise ValueError("Merged tests need to have unique ab_test_id.")
+
+    source_table = _source_table(configs[0])
+    spending_line = _merged_spending_line(configs)
+    test_filters = [
+        f"CASE WHEN {_merged_test_predicate(config)} THEN {_sql_string(config.ab_test_id)} END"
+        for config in configs
+    ]
+    # rows of any test, lets Athena prune partitions before assigning rows to tests
+    any_test_filter = " OR ".join(
+        f"({predicate})"
+        for predicate in dict.fromkeys(map(_merged_test_predicate, configs))
+    )
+
+    if (
+        configs[0].datapoint_type
+        == PossibleDatapointTypes.one_datapoint_per_user_per_meta_date
+    ):
+        test_filters_lines = "\n                        , ".join(test_filters)
+        data_query = f"""
+            WITH
+                base_table AS (
+                    SELECT tests.ab_test_id
+                        , user_id
+                        , meta_date
+                        , first_login
+                        , CASE
+                            WHEN group_tag = 'control'      THEN 'C'
+                            WHEN group_tag = 'personalized' THEN 'P'
+                        END                                                                              test_group
+                        {spending_line}
+                    FROM {source_table}
+                    CROSS JOIN UNNEST(ARRAY[
+                        {test_filters_lines}
+                    ]) AS tests (ab_test_id)
+                    WHERE ({any_test_filter})
+                    AND tests.ab_test_id IS NOT NULL
+                    GROUP BY tests.ab_test_id
+                        , user_id
+                        , meta_date
+                        , first_login
+                        , group_tag
+                    )
+
+            SELECT ab_test_id
+                , MAX(meta_date) as meta_date
+                , test_group
+                , COUNT(*)                                         AS totals
+                , SUM(CASE WHEN total_spend > 0 THEN 1 ELSE 0 END) AS positives
+                , SUM(total_spend) AS sum_values
+                , SUM(LN(CASE WHEN total_spend > 0 THEN total_spend END)) AS sum_logs
+                , SUM(power(LN(CASE WHEN total_spend > 0 THEN total_spend END), 2.0)) AS sum_logs_squared
+            FROM base_table
+            GROUP BY ab_test_id, test_group;"""
+    else:
+        spend_windows = "\n                    ".join(
+            f"WHEN {_sql_string(config.ab_test_id)} THEN meta_date <= first_login"
+            f" + INTERVAL '{_spend_offset(config)}' DAY"
+            for config in configs
+        )
+        test_filters_lines = "\n                    , ".join(test_filters)
+        data_query = f"""
+            WITH daily_user_spend AS (
+                SELECT tests.ab_test_id
+                    , user_id
+                    , meta_date
+                    , first_login
+                    , CASE
+                        WHEN group_tag = 'control' THEN 'C'
+                        WHEN group_tag = 'personalized' THEN 'P'
+                    END                             test_group
+                    {spending_line}
+                FROM {source_table}
+                CROSS JOIN UNNEST(ARRAY[
+                    {test_filters_lines}
+                ]) AS tests (ab_test_id)
+                WHERE ({any_test_filter})
+                AND tests.ab_test_id IS NOT NULL
+                GROUP BY tests.ab_test_id
+                    , user_id
+                    , meta_date
+                    , first_login
+                    , group_tag)
+
+            , daily_user_spend_only_first_n_days AS (
+                SELECT *
+                FROM daily_user_spend
+                WHERE meta_date >= first_login
+                AND CASE ab_test_id
+                    {spend_windows}
+                END
+                )
+
+            , base_table AS (
+                SELECT ab_test_id, user_id, first_login as meta_date, MAX(test_group) as test_group, SUM(total_spend) AS total_spend
+                FROM daily_user_spend_only_first_n_days
+                GROUP BY ab_test_id, user_id, first_login
+                )
+
+            SELECT ab_test_id
+                , MAX(meta_date) as meta_date
                 , test_group
                 , COUNT(*)                                              AS totals
                 , SUM(CASE WHEN total_spend > 0 THEN 1 ELSE 0 END) AS positives
@@ -277,9 +521,27 @@ def run_ab_testing(config: AbTestEvaluationConfig) -> pd.DataFrame:
                 , SUM(LN(CASE WHEN total_spend > 0 THEN total_spend END)) AS sum_logs
                 , SUM(power(LN(CASE WHEN total_spend > 0 THEN total_spend END), 2.0)) AS sum_logs_squared
             FROM base_table
-            GROUP BY test_group;"""
+            GROUP BY ab_test_id, test_group;"""
+
+    return data_query
+
 
-    data_df = FeatureStoreOfflineClient.run_athena_query_pandas(data_query)
+def select_test_data(data_df: pd.DataFrame, ab_test_id: str) -> pd.DataFrame:
+    """
+    Data of one test from result of build_merged_data_query (in format of build_data_query).
+    """
+    test_data_df = data_df[data_df.ab_test_id == ab_test_id]
+    return test_data_df.drop(columns="ab_test_id").reset_index(drop=True)
+
+
+def evaluate_ab_test(
+    config: AbTestEvaluationConfig, data_df: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Evaluate the test using aggregated data of its variants (result of build_data_query).
+    """
+    too_early_to_run_test = False
+    test_definition_dict = build_test_definition(config)
 
     if data_df.empty:
         raise Exception("No data available for the provided inputs")
@@ -329,7 +591,7 @@ def run_ab_testing(config: AbTestEvaluationConfig) -> pd.DataFrame:
         b_prior_ig=config.b_prior_ig_2,
         w_prior=config.w_prior_2,
     )
-    res_revenue_test = test_revenue.evaluate(seed=42)
+    res_revenue_test = test_revenue.evaluate(seed=42, as_result=True)
 
     inputs_dict = {
         "totals_variant_1": totals_1,
@@ -358,30 +620,34 @@ def run_ab_testing(config: AbTestEvaluationConfig) -> pd.DataFrame:
 
     results_dict = {
         "too_early_to_run_test": too_early_to_run_test,
-        "prob_being_best_variant_1": res_revenue_test[0]["prob_being_best"],
-        "prob_being_best_variant_2": res_revenue_test[1]["prob_being_best"],
-        "expected_loss_variant_1": res_revenue_test[0]["expected_loss"],
-        "expected_loss_variant_2": res_revenue_test[1]["expected_loss"],
-        "expected_total_gain_variant_1": res_revenue_test[0]["expected_total_gain"],
-        "expected_total_gain_variant_2": res_revenue_test[1]["expected_total_gain"],
+        "prob_being_best_variant_1": float(res_revenue_test["prob_being_best"][0]),
+        "prob_being_best_variant_2": float(res_revenue_test["prob_being_best"][1]),
+        "expected_loss_variant_1": float(res_revenue_test["expected_loss"][0]),
+        "expected_loss_variant_2": float(res_revenue_test["expected_loss"][1]),
+        "expected_total_gain_variant_1": float(
+            res_revenue_test["expected_total_gain"][0]
+        ),
+        "expected_total_gain_variant_2": float(
+            res_revenue_test["expected_total_gain"][1]
+        ),
     }
 
     output_dict = {
         "inputs": inputs_dict,
         "name_variant_1": config.variant_name_1,
         "name_variant_2": config.variant_name_2,
-        "a_post_beta_variant_1": res_revenue_test[0]["a_post_beta"],
-        "a_post_beta_variant_2": res_revenue_test[1]["a_post_beta"],
-        "b_post_beta_variant_1": res_revenue_test[0]["b_post_beta"],
-        "b_post_beta_variant_2": res_revenue_test[1]["b_post_beta"],
-        "m_post_variant_1": res_revenue_test[0]["m_post"],
-        "m_post_variant_2": res_revenue_test[1]["m_post"],
-        "a_post_ig_variant_1": res_revenue_test[0]["a_post_ig"],
-        "a_post_ig_variant_2": res_revenue_test[1]["a_post_ig"],
-        "b_post_ig_variant_1": res_revenue_test[0]["b_post_ig"],
-        "b_post_ig_variant_2": res_revenue_test[1]["b_post_ig"],
-        "w_post_variant_1": res_revenue_test[0]["w_post"],
-        "w_post_variant_2": res_revenue_test[1]["w_post"],
+        "a_post_beta_variant_1": float(res_revenue_test["a_post_beta"][0]),
+        "a_post_beta_variant_2": float(res_revenue_test["a_post_beta"][1]),
+        "b_post_beta_variant_1": float(res_revenue_test["b_post_beta"][0]),
+        "b_post_beta_variant_2": float(res_revenue_test["b_post_beta"][1]),
+        "m_post_variant_1": float(res_revenue_test["m_post"][0]),
+        "m_post_variant_2": float(res_revenue_test["m_post"][1]),
+        "a_post_ig_variant_1": float(res_revenue_test["a_post_ig"][0]),
+        "a_post_ig_variant_2": float(res_revenue_test["a_post_ig"][1]),
+        "b_post_ig_variant_1": float(res_revenue_test["b_post_ig"][0]),
+        "b_post_ig_variant_2": float(res_revenue_test["b_post_ig"][1]),
+        "w_post_variant_1": float(res_revenue_test["w_post"][0]),
+        "w_post_variant_2": float(res_revenue_test["w_post"][1]),
         "results": results_dict,
         "test_definition": test_definition_dict,
     }
@@ -391,6 +657,26 @@ def run_ab_testing(config: AbTestEvaluationConfig) -> pd.DataFrame:
     return output_df
 
 
+def run_ab_testing(
+    config: AbTestEvaluationConfig, query_backend: QueryBackend = run_athena_query
+) -> pd.DataFrame:
+    """
+    Query aggregated data of the test and evaluate it.
+    Parameters
+    ----------
+    config : Test configuration.
+    query_backend : Function running SQL query and returning its result as DataFrame.
+    Returns
+    -------
+    output_df : One row DataFrame with test inputs, results and definition.
+    """
+    if is_too_early_to_run_test(config):
+        return build_too_early_output(config)
+
+    data_df = query_backend(build_data_query(config))
+    return evaluate_ab_test(config, data_df)
+
+
 def upload_output_to_s3(output: pd.DataFrame, bucket: str, key: str):
     s3 = boto3.client("s3")
 
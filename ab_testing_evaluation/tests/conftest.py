@@ -0,0 +1,126 @@
+import re
+import sys
+import math
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# modules of ab_testing_evaluation are imported as top level modules (as in the image)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+UNNEST = re.compile(
+    r"CROSS JOIN UNNEST\(ARRAY\[(.*?)\]\) AS tests \(ab_test_id\)", re.DOTALL
+)
+
+
+class FakeAthena:
+    """
+    Query backend running Athena queries of the tests on SQLite copy of synthetic
+    user_level_performance table. Executed queries are kept in `queries`.
+    """
+
+    def __init__(self, first_date: str = "2022-01-01", n_days: int = 20) -> None:
+        rng = np.random.default_rng(0)
+        n_users = 200
+        meta_dates = pd.date_range(first_date, periods=n_days).strftime("%Y-%m-%d")
+        first_logins = pd.date_range(first_date, periods=n_days).strftime("%Y-%m-%d")
+        rows = []
+        for user_id in range(n_users):
+            group_tag = "personalized" if user_id % 2 else "control"
+            first_login = first_logins[rng.integers(n_days)]
+            for meta_date in meta_dates[rng.random(n_days) < 0.5]:
+                spend = rng.lognormal(1.0, 1.0) if rng.random() < 0.3 else 0.0
+                rows.append(
+                    (user_id, meta_date, first_login, group_tag, spend, min(spend, 5.0))
+                )
+        # queries can come from threads of the batch run
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self.lock = threading.Lock()
+        # NULL arguments give NULL as in Athena
+        self.connection.create_function(
+            "LN", 1, lambda x: None if x is None else math.log(x)
+        )
+        self.connection.create_function(
+            "power", 2, lambda x, y: None if x is None else math.pow(x, y)
+        )
+        self.connection.execute(
+            "CREATE TABLE user_level_performance"
+            " (user_id, meta_date, first_login, group_tag, spend, wins_spend)"
+        )
+        self.connection.executemany(
+            "INSERT INTO user_level_performance VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+        self.queries = []
+
+    @staticmethod
+    def to_sqlite(query: str) -> str:
+        query = re.sub(r"DATE '([\d-]+)'", r"'\1'", query)
+        query = re.sub(
+            r"(\S+) ([+-]) INTERVAL '(\d+)' DAY", r"date(\1, '\2\3 day')", query
+        )
+        query = re.sub(r"FROM \w+\.(\w+)", r"FROM \1", query)
+        unnest = UNNEST.search(query)
+        if unnest:
+            elements = re.split(r"\n\s*, (?=CASE)", unnest.group(1).strip())
+            ab_test_id = " ".join(
+                f"WHEN {i} THEN ({element})" for i, element in enumerate(elements)
+            )
+            ab_test_id = f"(CASE tests.i {ab_test_id} END)"
+            indices = " UNION ALL ".join(
+                f"SELECT {i} AS i" for i in range(len(elements))
+            )
+            query = query.replace(unnest.group(0), f"CROSS JOIN ({indices}) AS tests")
+            query = query.replace(
+                "SELECT tests.ab_test_id", f"SELECT {ab_test_id} AS ab_test_id", 1
+            )
+            query = query.replace("tests.ab_test_id", ab_test_id)
+        return query
+
+    def __call__(self, query: str) -> pd.DataFrame:
+        with self.lock:
+            self.queries.append(query)
+            return pd.read_sql_query(self.to_sqlite(query), self.connection)
+
+
+@pytest.fixture
+def athena() -> FakeAthena:
+    return FakeAthena()
+
+
+@pytest.fixture
+def test_config() -> dict:
+    return {
+        "company_id": "century-games-ncmgu",
+        "project_id": "spongebob-x7d9q",
+        "test_name": "test",
+        "ab_test_id": "test",
+        "start_date": "2022-01-01",
+        "end_date": "2022-01-20",
+        "winsorized": False,
+        "personalized": True,
+        "datapoint_type": "one_datapoint_per_user_per_meta_date",
+        "n_days_spend": 0,
+        "min_first_login_date": "2022-01-01",
+        "max_first_login_date": "2022-01-20",
+        "variant_name_1": "P",
+        "variant_name_2": "C",
+        "a_prior_beta_1": 0.5,
+        "a_prior_beta_2": 0.5,
+        "b_prior_beta_1": 0.5,
+        "b_prior_beta_2": 0.5,
+        "m_prior_1": 1.0,
+        "m_prior_2": 1.0,
+        "a_prior_ig_1": 0.0,
+        "a_prior_ig_2": 0.0,
+        "b_prior_ig_1": 0.0,
+        "b_prior_ig_2": 0.0,
+        "w_prior_1": 0.01,
+        "w_prior_2": 0.01,
+        "initial_test_start_date": "2022-01-01",
+        "output_bucket": "test",
+        "output_key": "test.json",
+    }
@@ -0,0 +1,123 @@
+import pandas as pd
+import pytest
+
+for module in ["pydantic", "boto3", "ml_lib"]:
+    pytest.importorskip(module)
+
+from batch import plan_queries, run_ab_testing_batch  # noqa: E402
+from testing import (  # noqa: E402
+    AbTestEvaluationConfig,
+    run_ab_testing,
+    build_data_query,
+    select_test_data,
+    build_merged_data_query,
+)
+
+NO_DATA_TEST = {
+    "ab_test_id": "no_data",
+    "min_first_login_date": "2022-02-01",
+    "max_first_login_date": "2022-02-10",
+}
+
+# tests of the same merge group (source table and datapoint type)
+TESTS = [
+    [
+        {"ab_test_id": "first", "start_date": "2022-01-01", "end_date": "2022-01-10"},
+        {"ab_test_id": "second", "start_date": "2022-01-05", "end_date": "2022-01-20"},
+        {
+            "ab_test_id": "first_login",
+            "min_first_login_date": "2022-01-08",
+            "max_first_login_date": "2022-01-15",
+        },
+        {"ab_test_id": "winsorized", "winsorized": True},
+    ],
+    [
+        {"ab_test_id": f"first_{n_days}_day_spend", "n_days_spend": n_days}
+        for n_days in [3, 5]
+    ],
+]
+N_DAY_SPEND = {
+    "datapoint_type": "one_datapoint_per_user_first_n_day_spend",
+    "start_date": "2022-01-05",
+    "end_date": "2022-01-15",
+}
+
+
+@pytest.fixture
+def config_groups(test_config):
+    meta_date_tests, n_day_spend_tests = TESTS
+    return [
+        [AbTestEvaluationConfig(**{**test_config, **test}) for test in meta_date_tests],
+        [
+            AbTestEvaluationConfig(**{**test_config, **N_DAY_SPEND, **test})
+            for test in n_day_spend_tests
+        ],
+    ]
+
+
+@pytest.mark.parametrize("group", [0, 1])
+def test_merged_query_matches_single_queries(athena, config_groups, group):
+    configs = config_groups[group]
+    merged_df = athena(build_merged_data_query(configs))
+    for config in configs:
+        expected = athena(build_data_query(config))
+        selected = select_test_data(merged_df, config.ab_test_id)
+        assert len(expected) == 2
+        pd.testing.assert_frame_equal(
+            selected.sort_values("test_group").reset_index(drop=True),
+            expected.sort_values("test_group").reset_index(drop=True),
+            check_exact=False,
+        )
+
+
+def test_batch_outputs_match_sequential_runs(athena, config_groups):
+    configs = [config for configs in config_groups for config in configs]
+    assert len(plan_queries(configs)) == 2
+    sequential = [run_ab_testing(config, athena) for config in configs]
+    for merge_queries in (False, True):
+        batch = run_ab_testing_batch(configs, athena, merge_queries=merge_queries)
+        assert [output.to_json() for output in batch] == [
+            output.to_json() for output in sequential
+        ]
+
+
+def test_batch_isolates_failed_tests(athena, config_groups, test_config):
+    meta_date_configs, n_day_spend_configs = config_groups
+    configs = [
+        *meta_date_configs,
+        AbTestEvaluationConfig(**{**test_config, **NO_DATA_TEST}),
+        *n_day_spend_configs,
+    ]
+
+    def failing_n_day_spend_backend(query):
+        if "INTERVAL" in query:
+            raise RuntimeError("Query exhausted resources")
+        return athena(query)
+
+    expected_errors = (
+        [None] * len(meta_date_configs)
+        + ["Exception: No data available for the provided inputs"]
+        + ["RuntimeError: Query exhausted resources"] * len(n_day_spend_configs)
+    )
+    for merge_queries in (False, True):
+        batch = run_ab_testing_batch(
+            configs, failing_n_day_spend_backend, merge_queries=merge_queries
+        )
+        errors = [output.results[0].get("error") for output in batch]
+        assert errors == expected_errors
+        for config, output in zip(meta_date_configs, batch):
+            assert output.to_json() == run_ab_testing(config, athena).to_json()
+        for output in batch[len(meta_date_configs) :]:
+            assert not output.results[0]["too_early_to_run_test"]
+            assert output.results[0]["prob_being_best_variant_1"] is None
+
+
+def test_output_values_are_python_floats(athena, test_config):
+    output = run_ab_testing(AbTestEvaluationConfig(**test_config), athena)
+    results = output.results[0]
+    assert all(
+        type(value) is float
+        for name, value in results.items()
+        if name != "too_early_to_run_test"
+    )
+    assert type(output.a_post_beta_variant_1[0]) is float
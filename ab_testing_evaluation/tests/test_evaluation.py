@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from bayesian_testing.metrics import eval_bernoulli_agg, eval_delta_lognormal_agg
+from bayesian_testing.metrics.evaluation import estimate_expected_total_gain_batch
+
+BERNOULLI_ARGS = ([1000, 1000], [100, 120])
+DELTA_LOGNORMAL_ARGS = ([1000, 1000], [100, 120], [150.0, 190.0], [400.0, 480.0])
+
+
+@pytest.mark.parametrize("max_sim_count", [0, -1, 999])
+def test_adaptive_max_sim_count_below_sim_count_raises(max_sim_count):
+    with pytest.raises(ValueError):
+        eval_bernoulli_agg(
+            *BERNOULLI_ARGS,
+            sim_count=1000,
+            target_se=0.01,
+            max_sim_count=max_sim_count,
+        )
+    with pytest.raises(ValueError):
+        eval_delta_lognormal_agg(
+            *DELTA_LOGNORMAL_ARGS,
+            sim_count=1000,
+            target_se=0.01,
+            max_sim_count=max_sim_count,
+        )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"target_se": 0.01, "n_threads": 2},
+        {"chunk_size": 100, "dtype": np.float32},
+        {"sampler": "sobol", "dtype": np.float32},
+    ],
+)
+def test_ignored_simulation_options_raise(options):
+    with pytest.raises(ValueError):
+        eval_bernoulli_agg(*BERNOULLI_ARGS, seed=1, **options)
+    with pytest.raises(ValueError):
+        eval_delta_lognormal_agg(*DELTA_LOGNORMAL_ARGS, seed=1, **options)
+
+
+def test_sobol_reduced_by_threads():
+    single = eval_delta_lognormal_agg(*DELTA_LOGNORMAL_ARGS, seed=1, sampler="sobol")
+    threaded = eval_delta_lognormal_agg(
+        *DELTA_LOGNORMAL_ARGS, seed=1, sampler="sobol", n_threads=2
+    )
+    assert single[0] == threaded[0]
+    assert np.allclose(single[1], threaded[1], atol=1e-7)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"chunk_size": 100}, {"target_se": 0.01}, {"engine": "quadrature"}],
+)
+def test_total_gain_defined_only_for_two_variants(options):
+    two = eval_bernoulli_agg(*BERNOULLI_ARGS, seed=1, **options)
+    three = eval_bernoulli_agg([1000] * 3, [100, 120, 110], seed=1, **options)
+    assert two[2][0] == pytest.approx(-two[2][1]) and two[2][0] < 0
+    assert np.all(np.isnan(three[2]))
+
+
+def test_batch_total_gain_defined_only_for_two_variants():
+    data = np.random.default_rng(1).normal(size=(4, 3, 100))
+    two = estimate_expected_total_gain_batch(data[:, :2])
+    assert np.allclose(two[:, 0], -two[:, 1])
+    three = estimate_expected_total_gain_batch(data)
+    assert three.shape == (4, 3) and np.all(np.isnan(three))
+
+
+@pytest.mark.parametrize(
+    "evaluate, args",
+    [
+        (eval_bernoulli_agg, BERNOULLI_ARGS),
+        (eval_delta_lognormal_agg, DELTA_LOGNORMAL_ARGS),
+    ],
+)
+def test_float32_within_monte_carlo_error_of_float64(evaluate, args):
+    sim_count = 50000
+    res_64 = evaluate(*args, sim_count=sim_count, seed=1)
+    res_32 = evaluate(*args, sim_count=sim_count, seed=1, dtype=np.float32)
+    # standard errors of one evaluation, from one batch of adaptive simulation
+    *_, diagnostics = evaluate(
+        *args, sim_count=sim_count, seed=2, target_se=1e-9, max_sim_count=sim_count
+    )
+    # float32 draws may be independent of float64 ones, differences have sqrt(2) x SE
+    for i, se in enumerate([diagnostics["pbb_se"], diagnostics["loss_se"]]):
+        difference = np.abs(np.subtract(res_32[i], res_64[i]))
+        assert np.all(difference <= 4 * np.sqrt(2) * np.array(se))
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"target_se": 0.01}, {"engine": "quadrature"}, {"metrics": []}]
+)
+def test_results_have_fixed_structure(options):
+    bernoulli = eval_bernoulli_agg(*BERNOULLI_ARGS, seed=1, **options)
+    delta_lognormal = eval_delta_lognormal_agg(*DELTA_LOGNORMAL_ARGS, seed=1, **options)
+    assert len(bernoulli) == 6 and len(delta_lognormal) == 10
+    for *_, diagnostics in [bernoulli, delta_lognormal]:
+        if "target_se" in options:
+            assert diagnostics["sim_count"] >= 20000
+        else:
+            assert diagnostics is None
+
+
+def test_delta_lognormal_without_positives_has_fixed_structure():
+    res = eval_delta_lognormal_agg([1000, 1000], [0, 0], [0.0, 0.0], [0.0, 0.0])
+    assert len(res) == 10 and res[-1] is None
+    assert res[0] == [0.5, 0.5]
+    assert np.all(np.isnan(res[1])) and np.all(np.isnan(res[2]))
+    assert res[3] == [0.5, 0.5] and res[4] == [1000.5, 1000.5]
+    assert eval_bernoulli_agg([], []) == ([], [], [], [], [], None)
+    assert eval_delta_lognormal_agg([], [], [], []) == ([],) * 9 + (None,)
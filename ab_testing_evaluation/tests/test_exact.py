@@ -0,0 +1,45 @@
+import warnings
+
+import numpy as np
+import pytest
+from scipy import integrate
+from bayesian_testing.metrics import eval_bernoulli_agg
+from bayesian_testing.metrics.exact import (
+    eval_beta_exact,
+    prob_greater_beta,
+    _prob_greater_quad,
+)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        (3.0, 5.0, 4.0, 2.0),
+        (30.5, 50.5, 40.5, 20.5),
+        (1000.5, 99000.5, 1050.5, 98950.5),
+        (746.3, 3164.3, 2861.3, 1361.3),
+        (90.3, 246.3, 387.7, 703.7),
+    ],
+)
+def test_prob_greater_beta_matches_integration(params):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", integrate.IntegrationWarning)
+        expected = _prob_greater_quad(*params)
+    assert prob_greater_beta(*params) == pytest.approx(expected, abs=1e-9)
+
+
+def test_exact_default_priors_without_integration_warning():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        exact = eval_bernoulli_agg([100000, 100000], [1000, 1050], engine="exact")
+    simulation = eval_bernoulli_agg(
+        [100000, 100000], [1000, 1050], sim_count=200000, seed=1
+    )
+    # Monte Carlo standard error of probabilities is below 0.0011
+    assert np.allclose(exact[0], simulation[0], atol=0.005)
+    assert np.allclose(exact[1], simulation[1], atol=2e-5)
+
+
+def test_exact_more_variants_raises():
+    with pytest.raises(ValueError):
+        eval_beta_exact([1.5, 2.5, 3.5], [4.5, 5.5, 6.5])
@@ -0,0 +1,64 @@
+import pytest
+from bayesian_testing.experiments import (
+    BinaryStats,
+    BinaryDataTest,
+    DeltaLognormalStats,
+    DeltaLognormalDataTest,
+)
+
+DATA = [0.0, 0.0, 2.5, 0.0, 7.0, 1.5]
+
+
+def test_accessors_share_one_cached_simulation(monkeypatch):
+    test = BinaryDataTest()
+    test.add_variant_data_agg("A", 1000, 100)
+    test.add_variant_data_agg("B", 1000, 120)
+    calls = []
+    eval_simulation = test.eval_simulation
+
+    def counting_eval_simulation(*args, **kwargs):
+        calls.append(kwargs.get("metrics"))
+        return eval_simulation(*args, **kwargs)
+
+    monkeypatch.setattr(test, "eval_simulation", counting_eval_simulation)
+    pbbs = test.probabs_of_being_best(seed=1)
+    loss = test.expected_loss(seed=1)
+    res = test.evaluate(seed=1)
+    assert calls == [None]
+    assert [variant["prob_being_best"] for variant in res] == list(pbbs.values())
+    assert [variant["expected_loss"] for variant in res] == list(loss.values())
+
+    test.probabs_of_being_best()
+    test.expected_loss()
+    assert calls == [None, ("prob_being_best",), ("expected_loss",)]
+
+
+def test_variant_data_from_stats_matches_aggregated_data():
+    binary_stats = BinaryStats.from_data([value > 0 for value in DATA])
+    from_stats, from_agg = BinaryDataTest(), BinaryDataTest()
+    from_stats.add_variant_data_stats("A", binary_stats, a_prior=2.0)
+    from_agg.add_variant_data_agg("A", 6, 3, a_prior=2.0)
+    assert from_stats.data.state_key() == from_agg.data.state_key()
+
+    stats = DeltaLognormalStats.from_data(DATA)
+    from_stats, from_agg = DeltaLognormalDataTest(), DeltaLognormalDataTest()
+    from_stats.add_variant_data_stats("A", stats, m_prior=2.0)
+    from_agg.add_variant_data_agg(
+        "A",
+        stats.totals,
+        stats.positives,
+        stats.sum_values,
+        stats.sum_logs,
+        stats.sum_logs_2,
+        m_prior=2.0,
+    )
+    assert from_stats.data.state_key() == from_agg.data.state_key()
+
+
+def test_missing_aggregated_data_raises():
+    with pytest.raises(TypeError):
+        BinaryDataTest().add_variant_data_agg("A", 1000)
+    with pytest.raises(TypeError):
+        DeltaLognormalDataTest().add_variant_data_agg("A", 1000, 10)
+    with pytest.raises(ValueError):
+        BinaryDataTest().add_variant_data_stats("A", DeltaLognormalStats())
@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from bayesian_testing.metrics import eval_delta_lognormal_agg
+from bayesian_testing.metrics.posteriors import BaseDrawsCache
+
+DELTA_LOGNORMAL_DATA = ([1000, 1000], [100, 120], [300.0, 330.0], [900.0, 1000.0])
+
+
+def test_cached_draws_give_the_same_results():
+    uncached = eval_delta_lognormal_agg(*DELTA_LOGNORMAL_DATA, seed=3)
+    for _ in range(2):
+        cached = eval_delta_lognormal_agg(
+            *DELTA_LOGNORMAL_DATA, seed=3, cache_draws=True
+        )
+        assert cached[:3] == uncached[:3]
+
+
+def test_draws_cache_is_bounded_by_bytes_from_threads():
+    # one entry has 1000 gamma and 1000 normal float64 draws
+    entry_bytes = 2 * 8 * 1000
+    cache = BaseDrawsCache(max_bytes=3 * entry_bytes)
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: cache.get(i % 5, 1000, 2.0), range(200)))
+    assert cache.nbytes == 3 * entry_bytes
+    assert sum(sum(d.nbytes for d in draws) for draws in cache._draws.values()) == (
+        cache.nbytes
+    )
+
+    cache.get(0, 10**6, 2.0)  # larger than the cache
+    assert cache.nbytes == 3 * entry_bytes
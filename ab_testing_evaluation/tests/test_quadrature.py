@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from bayesian_testing.metrics import eval_bernoulli_agg, eval_delta_lognormal_agg
+from bayesian_testing.metrics.quadrature import (
+    QuadratureError,
+    eval_delta_lognormal_quadrature,
+)
+
+
+def test_quadrature_few_positives_raises():
+    # posterior mean of variant is too heavy-tailed for finite expected loss
+    with pytest.raises(QuadratureError):
+        eval_delta_lognormal_quadrature(
+            [4.5, 5.5],
+            [1001.0, 1001.0],
+            [1.5, 2.0],
+            [0.5, 1.0],
+            [3.01, 4.01],
+            [1.0, 1.0],
+        )
+
+
+@pytest.mark.parametrize("positives", [[3, 4], [5, 6], [10, 11]])
+def test_quadrature_few_positives_falls_back_to_simulation(positives):
+    args = ([1000, 1000], positives, [2.0, 3.0], [5.0, 8.0])
+    quadrature = eval_delta_lognormal_agg(*args, seed=1, engine="quadrature")
+    simulation = eval_delta_lognormal_agg(*args, seed=1)
+    assert np.all(np.isfinite(quadrature[0])) and np.all(np.isfinite(quadrature[1]))
+    assert quadrature[:3] == simulation[:3]
+
+
+def _assert_within_mc_error(engine_res, simulation_res):
+    pbbs, loss, *_, diagnostics = simulation_res
+    assert np.all(
+        np.abs(np.array(engine_res[0]) - pbbs) <= 4 * np.array(diagnostics["pbb_se"])
+    )
+    assert np.all(
+        np.abs(np.array(engine_res[1]) - loss)
+        <= 4 * np.array(diagnostics["loss_se"]) + 1e-6
+    )
+
+
+def test_bernoulli_quadrature_agrees_with_simulation():
+    args = ([5000, 5200], [500, 560])
+    quadrature = eval_bernoulli_agg(*args, engine="quadrature")
+    simulation = eval_bernoulli_agg(
+        *args, sim_count=100000, seed=1, target_se=0.001, max_sim_count=2000000
+    )
+    _assert_within_mc_error(quadrature, simulation)
+
+
+def test_delta_lognormal_quadrature_agrees_with_simulation():
+    args = ([5000, 5200], [500, 560], [650.0, 700.0], [1100.0, 1180.0])
+    quadrature = eval_delta_lognormal_agg(*args, engine="quadrature")
+    simulation = eval_delta_lognormal_agg(
+        *args, sim_count=100000, seed=1, target_se=0.001, max_sim_count=2000000
+    )
+    _assert_within_mc_error(quadrature, simulation)
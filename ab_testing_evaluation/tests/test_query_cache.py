@@ -0,0 +1,76 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+from query_cache import QueryCache, normalize_sql
+
+
+class CountingQuery:
+    """
+    Query function returning a small result per query and counting its calls.
+    """
+
+    def __init__(self) -> None:
+        self.calls = []
+
+    def __call__(self, query: str) -> pd.DataFrame:
+        self.calls.append(query)
+        return pd.DataFrame({"query": [query] * 100, "value": range(100)})
+
+
+@pytest.fixture
+def run_query() -> CountingQuery:
+    return CountingQuery()
+
+
+def test_normalized_equivalent_queries_hit(tmp_path, run_query):
+    cache = QueryCache(tmp_path, run_query=run_query)
+    first = cache("SELECT *\n  FROM t\n WHERE name = 'a  b';")
+    second = cache("SELECT * FROM t WHERE name = 'a  b'")
+    cache("SELECT * FROM t WHERE name = 'a b'")
+    pd.testing.assert_frame_equal(first, second)
+    assert len(run_query.calls) == 2
+    assert normalize_sql("SELECT  1 ;") == "SELECT 1"
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.metrics["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_results_expire_after_ttl(tmp_path, run_query):
+    cache = QueryCache(tmp_path, ttl=60, run_query=run_query)
+    cache("SELECT 1")
+    cache("SELECT 1")
+    path = next(tmp_path.glob("*.parquet"))
+    created = time.time() - 61
+    os.utime(path, (created, created))
+    cache("SELECT 1")
+    assert len(run_query.calls) == 2
+    assert (cache.hits, cache.misses, cache.expired) == (1, 2, 1)
+
+
+def test_least_recently_used_results_are_evicted(tmp_path, run_query):
+    cache = QueryCache(tmp_path, run_query=run_query)
+    cache("SELECT 1")
+    entry_bytes = cache.metrics["size_bytes"]
+    cache.max_bytes = int(2.5 * entry_bytes)
+    cache("SELECT 2")
+    # the first result is used more recently than the second one
+    path_1 = tmp_path / f"{QueryCache.key('SELECT 1')}.parquet"
+    path_2 = tmp_path / f"{QueryCache.key('SELECT 2')}.parquet"
+    os.utime(path_2, (time.time() - 10, path_2.stat().st_mtime))
+    cache("SELECT 1")
+    cache("SELECT 3")
+    assert cache.evictions == 1
+    assert path_1.exists() and not path_2.exists()
+    assert cache.metrics["size_bytes"] <= cache.max_bytes
+
+    cache("SELECT 2")
+    assert run_query.calls == ["SELECT 1", "SELECT 2", "SELECT 3", "SELECT 2"]
+    assert cache.metrics == {
+        "hits": 1,
+        "misses": 4,
+        "hit_rate": 0.2,
+        "expired": 0,
+        "evictions": 2,
+        "size_bytes": cache.metrics["size_bytes"],
+    }
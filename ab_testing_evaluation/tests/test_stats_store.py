@@ -0,0 +1,65 @@
+import re
+
+import numpy as np
+import pytest
+
+for module in ["pydantic", "boto3", "ml_lib"]:
+    pytest.importorskip(module)
+
+from testing import AbTestEvaluationConfig, build_data_query  # noqa: E402
+from stats_store import (  # noqa: E402
+    STATS_COLUMNS,
+    DailyStatsStore,
+    stats_key,
+    _date_runs,
+    update_store,
+)
+
+WINDOW = re.compile(r"meta_date\s+BETWEEN\s+DATE '([\d-]+)'\s+AND\s+DATE '([\d-]+)'")
+
+
+def test_date_runs():
+    dates = ["2022-01-01", "2022-01-02", "2022-01-05", "2022-01-07", "2022-01-08"]
+    assert _date_runs(dates) == [
+        ("2022-01-01", "2022-01-02"),
+        ("2022-01-05", "2022-01-05"),
+        ("2022-01-07", "2022-01-08"),
+    ]
+    assert _date_runs([]) == []
+
+
+def test_update_store_queries_only_gaps(athena, test_config):
+    config = AbTestEvaluationConfig(
+        **{**test_config, "start_date": "2022-01-01", "end_date": "2022-01-10"}
+    )
+    key = stats_key(config)
+    store = DailyStatsStore()
+    for first_date, last_date in [("2022-01-03", "2022-01-04"), ("2022-01-07",) * 2]:
+        stored_config = config.copy(
+            update={"start_date": first_date, "end_date": last_date}
+        )
+        daily_df = athena(build_data_query(stored_config, daily=True))
+        store.add(key, daily_df, first_date, last_date)
+    athena.queries.clear()
+
+    update_store(config, store, athena, refresh_last_days=0)
+    assert [WINDOW.search(query).groups() for query in athena.queries] == [
+        ("2022-01-01", "2022-01-02"),
+        ("2022-01-05", "2022-01-06"),
+        ("2022-01-08", "2022-01-10"),
+    ]
+
+    expected = athena(build_data_query(config))
+    aggregated = store.aggregate(key, config.start_date, config.end_date)
+    assert len(expected) == len(aggregated) == 2
+    for test_group in ["P", "C"]:
+        assert np.allclose(
+            aggregated.loc[aggregated.test_group == test_group, STATS_COLUMNS],
+            expected.loc[expected.test_group == test_group, STATS_COLUMNS],
+        )
+
+    athena.queries.clear()
+    update_store(config, store, athena, refresh_last_days=2)
+    assert [WINDOW.search(query).groups() for query in athena.queries] == [
+        ("2022-01-09", "2022-01-10")
+    ]
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from bayesian_testing.experiments.sufficient_stats import (
+    BinaryStats,
+    DeltaLognormalStats,
+)
+
+
+def _chunks(data, n_chunks):
+    return np.array_split(
+        data, np.sort(np.random.default_rng(1).integers(0, len(data), n_chunks - 1))
+    )
+
+
+def test_binary_stats_merge_equals_concatenated_data():
+    data = np.random.default_rng(0).integers(0, 2, 1000)
+    chunks = _chunks(data, 5)
+    merged = BinaryStats()
+    for chunk in chunks:
+        merged = merged.merge(BinaryStats.from_data(chunk))
+    assert merged == BinaryStats.from_data(data)
+    assert sum(BinaryStats.from_data(chunk) for chunk in chunks) == merged
+    assert BinaryStats.from_chunks(chunks) == merged
+
+
+def test_delta_lognormal_stats_merge_equals_concatenated_data():
+    rng = np.random.default_rng(0)
+    data = rng.lognormal(1.0, 1.0, 1000) * (rng.random(1000) < 0.3)
+    chunks = _chunks(data, 5)
+    merged = sum(DeltaLognormalStats.from_data(chunk) for chunk in chunks)
+    expected = DeltaLognormalStats.from_data(data)
+    assert (merged.totals, merged.positives) == (expected.totals, expected.positives)
+    assert np.allclose(
+        [merged.sum_values, merged.sum_logs, merged.sum_logs_2],
+        [expected.sum_values, expected.sum_logs, expected.sum_logs_2],
+        rtol=1e-12,
+    )
+    assert DeltaLognormalStats.from_chunks(chunks) == merged
+
+
+def test_stats_of_different_types_cannot_be_merged():
+    with pytest.raises(TypeError):
+        BinaryStats(10, 2).merge(DeltaLognormalStats(10, 2))
+
+
+@pytest.mark.parametrize("bitorder", ["big", "little"])
+@pytest.mark.parametrize("totals", [0, 1, 8, 13])
+def test_binary_stats_from_packed(bitorder, totals):
+    data = np.random.default_rng(totals).integers(0, 2, totals)
+    packed = np.packbits(data, bitorder=bitorder)
+    stats = BinaryStats.from_packed(packed, totals, bitorder)
+    assert stats == BinaryStats.from_data(data)
+
+
+@pytest.mark.parametrize("bitorder", ["Big", "middle", None])
+def test_binary_stats_from_packed_unknown_bitorder_raises(bitorder):
+    packed = np.packbits([1, 0, 1])
+    with pytest.raises(ValueError):
+        BinaryStats.from_packed(packed, 3, bitorder)
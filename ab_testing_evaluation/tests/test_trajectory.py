@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+for module in ["pydantic", "boto3", "ml_lib"]:
+    pytest.importorskip(module)
+
+from testing import AbTestEvaluationConfig, run_ab_testing  # noqa: E402
+from trajectory import cumulative_stats, run_ab_testing_trajectory  # noqa: E402
+from bayesian_testing.metrics import eval_delta_lognormal_agg  # noqa: E402
+
+SIM_COUNT = 20000
+# prior arguments of eval_delta_lognormal_agg and prior fields of test config
+PRIOR_ARGUMENTS = {
+    "a_priors_beta": "a_prior_beta",
+    "b_priors_beta": "b_prior_beta",
+    "m_priors": "m_prior",
+    "a_priors_ig": "a_prior_ig",
+    "b_priors_ig": "b_prior_ig",
+    "w_priors": "w_prior",
+}
+
+
+def test_last_day_matches_run_ab_testing(athena, test_config):
+    config = AbTestEvaluationConfig(**{**test_config, "end_date": "2022-01-10"})
+    trajectory = run_ab_testing_trajectory(config, athena, sim_count=SIM_COUNT)
+    assert list(trajectory.end_date) == list(
+        pd.date_range("2022-01-01", "2022-01-10").strftime("%Y-%m-%d")
+    )
+
+    last_day = trajectory.iloc[-1]
+    output = run_ab_testing(config, athena)
+    inputs, results = output.inputs[0], output.results[0]
+    for variant in ["variant_1", "variant_2"]:
+        for column in ["totals", "positives", "sum_values"]:
+            assert last_day[f"{column}_{variant}"] == pytest.approx(
+                inputs[f"{column}_{variant}"]
+            )
+
+    # both are simulations of the same posteriors with different draws
+    *_, diagnostics = eval_delta_lognormal_agg(
+        *[
+            [inputs[f"{column}_variant_{i}"] for i in (1, 2)]
+            for column in ["totals", "positives", "sum_logs", "sum_logs_squared"]
+        ],
+        sim_count=SIM_COUNT,
+        **{
+            argument: [getattr(config, f"{prior}_{i}") for i in (1, 2)]
+            for argument, prior in PRIOR_ARGUMENTS.items()
+        },
+        seed=1,
+        target_se=1e-9,
+        max_sim_count=SIM_COUNT,
+    )
+    for metric, se in [
+        ("prob_being_best", diagnostics["pbb_se"]),
+        ("expected_loss", diagnostics["loss_se"]),
+    ]:
+        for i, variant in enumerate(["variant_1", "variant_2"]):
+            difference = abs(
+                last_day[f"{metric}_{variant}"] - results[f"{metric}_{variant}"]
+            )
+            assert difference <= 4 * np.sqrt(2) * se[i]
+
+
+def test_cumulative_stats_fill_days_without_data(test_config):
+    config = AbTestEvaluationConfig(
+        **{**test_config, "start_date": "2022-01-01", "end_date": "2022-01-06"}
+    )
+    # no positives of variant C on 2022-01-02, no data of any variant on 2022-01-03
+    # and of variant P on 2022-01-04, no data after 2022-01-05
+    daily_df = pd.DataFrame(
+        [
+            ("2022-01-01", "P", 10, 2, 5.0, 1.0, 2.0),
+            ("2022-01-01", "C", 12, 1, 3.0, 0.5, 0.25),
+            ("2022-01-02", "P", 8, 1, 2.0, 0.7, 0.49),
+            ("2022-01-02", "C", 9, 0, 0.0, None, None),
+            ("2022-01-04", "C", 7, 2, 4.0, 1.2, 0.8),
+            ("2022-01-05", "P", 11, 3, 6.0, 1.5, 1.1),
+            ("2022-01-05", "C", 10, 1, 1.0, 0.0, 0.0),
+        ],
+        columns=[
+            "meta_date",
+            "test_group",
+            "totals",
+            "positives",
+            "sum_values",
+            "sum_logs",
+            "sum_logs_squared",
+        ],
+    )
+    dates, stats = cumulative_stats(config, daily_df)
+
+    assert list(dates.strftime("%Y-%m-%d")) == [
+        "2022-01-01",
+        "2022-01-02",
+        "2022-01-03",
+        "2022-01-04",
+        "2022-01-05",
+    ]
+    assert np.all(np.isfinite(stats))
+    assert np.array_equal(stats[:, 0, 0], [10, 18, 18, 18, 29])
+    assert np.array_equal(stats[:, 1, 0], [12, 21, 21, 28, 38])
+    assert np.array_equal(stats[:, 1, 1], [1, 1, 1, 3, 4])
+    assert np.allclose(stats[:, 1, 3], [0.5, 0.5, 0.5, 1.7, 1.7])
+    assert np.array_equal(stats[2], stats[1])
+    assert np.allclose(
+        stats[-1],
+        daily_df.groupby("test_group")
+        .sum(numeric_only=True)
+        .loc[["P", "C"]]
+        .to_numpy(),
+    )
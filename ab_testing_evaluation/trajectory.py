@@ -0,0 +1,155 @@
+"""
+Trajectory of test results, i.e. results the test would have if it ended on each of
+its days. Daily statistics of the test are queried once (or kept in daily statistics
+store), cumulated over days and all days are evaluated in one batched evaluation.
+Usage: python trajectory.py [--store-path stats.sqlite] [--output-key key]
+"""
+import argparse
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+from testing import (
+    QueryBackend,
+    AbTestEvaluationConfig,
+    build_data_query,
+    run_athena_query,
+    upload_output_to_s3,
+)
+from stats_store import (
+    STATS_COLUMNS,
+    DailyStatsStore,
+    stats_key,
+    date_offset,
+    update_store,
+    stats_date_range,
+)
+from bayesian_testing.metrics import eval_delta_lognormal_batch
+
+
+def cumulative_stats(
+    config: AbTestEvaluationConfig, daily_df: pd.DataFrame
+) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+    """
+    Cumulative statistics of both variants of the test up to each day with data.
+    Parameters
+    ----------
+    config : Test configuration.
+    daily_df : Daily statistics of the test (result of build_data_query with daily=True).
+    Returns
+    -------
+    dates : Dates of daily statistics from the first day of the test to the last day
+        with data.
+    stats : Array of shape (n_dates, 2, 5) with cumulative statistics
+        [totals, positives, sum_values, sum_logs, sum_logs_squared] of variants.
+    """
+    meta_dates = pd.to_datetime(daily_df.meta_date)
+    first_date, last_date = stats_date_range(config)
+    dates = pd.date_range(first_date, min(pd.Timestamp(last_date), meta_dates.max()))
+
+    stats = np.zeros((len(dates), 2, len(STATS_COLUMNS)))
+    for j, variant_name in enumerate([config.variant_name_1, config.variant_name_2]):
+        is_variant = (daily_df.test_group == variant_name).to_numpy()
+        variant_daily = (
+            daily_df.loc[is_variant, STATS_COLUMNS]
+            .groupby(meta_dates[is_variant].to_numpy())
+            .sum()
+            .reindex(dates, fill_value=0)
+        )
+        # days without positives have NULL sums of logarithms
+        stats[:, j] = variant_daily.fillna(0).to_numpy()
+    return dates, np.cumsum(stats, axis=0)
+
+
+def run_ab_testing_trajectory(
+    config: AbTestEvaluationConfig,
+    query_backend: QueryBackend = run_athena_query,
+    store: DailyStatsStore = None,
+    refresh_last_days: int = 1,
+    sim_count: int = 20000,
+    seed: int = 42,
+    n_jobs: int = None,
+) -> pd.DataFrame:
+    """
+    Results of the test for each end date from the first day of the test to end_date.
+    Parameters
+    ----------
+    config : Test configuration.
+    query_backend : Function running SQL query and returning its result as DataFrame.
+    store : Store of daily statistics, if set only dates missing in the store are queried.
+    refresh_last_days : Number of last days queried again even if stored.
+    sim_count : Number of simulations.
+    seed : Random seed, each day gets its own child seed spawned from it.
+    n_jobs : Number of processes evaluating days in parallel (-1 for all CPUs).
+    Returns
+    -------
+    trajectory_df : DataFrame with one row per end date with cumulative inputs
+        and results of both variants.
+    """
+    if store is None:
+        daily_df = query_backend(build_data_query(config, daily=True))
+    else:
+        update_store(config, store, query_backend, refresh_last_days)
+        daily_df = store.daily(stats_key(config), *stats_date_range(config))
+
+    if daily_df.empty:
+        raise Exception("No data available for the provided inputs")
+
+    dates, stats = cumulative_stats(config, daily_df)
+    priors = [
+        [
+            getattr(config, f"{prior}_{i}")
+            for prior in [
+                "a_prior_beta",
+                "b_prior_beta",
+                "m_prior",
+                "a_prior_ig",
+                "b_prior_ig",
+                "w_prior",
+            ]
+        ]
+        for i in (1, 2)
+    ]
+    res_pbbs, res_loss, res_total_gain, _ = eval_delta_lognormal_batch(
+        stats, priors, sim_count=sim_count, seed=seed, n_jobs=n_jobs
+    )
+
+    end_dates = dates + pd.Timedelta(days=date_offset(config))
+    trajectory = {"end_date": end_dates.strftime("%Y-%m-%d")}
+    for j, variant in enumerate(["variant_1", "variant_2"]):
+        trajectory[f"totals_{variant}"] = stats[:, j, 0].astype(int)
+        trajectory[f"positives_{variant}"] = stats[:, j, 1].astype(int)
+        trajectory[f"sum_values_{variant}"] = stats[:, j, 2]
+        trajectory[f"prob_being_best_{variant}"] = res_pbbs[:, j]
+        trajectory[f"expected_loss_{variant}"] = res_loss[:, j]
+        trajectory[f"expected_total_gain_{variant}"] = res_total_gain[:, j]
+    return pd.DataFrame(trajectory)
+
+
+if __name__ == "__main__":
+    from ml_lib.util.sentry import configure_sentry
+
+    parser = argparse.ArgumentParser(description="Evaluate A/B test for every day.")
+    parser.add_argument("--store-path", default=None, help="SQLite file of the store.")
+    parser.add_argument("--output-key", default=None)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    configure_sentry()
+
+    ab_test_config = AbTestEvaluationConfig()
+    if args.store_path:
+        with DailyStatsStore(args.store_path) as stats_store:
+            trajectory_output = run_ab_testing_trajectory(
+                ab_test_config, store=stats_store, n_jobs=args.n_jobs
+            )
+    else:
+        trajectory_output = run_ab_testing_trajectory(
+            ab_test_config, n_jobs=args.n_jobs
+        )
+
+    upload_output_to_s3(
+        output=trajectory_output,
+        bucket=ab_test_config.output_bucket,
+        key=args.output_key or ab_test_config.output_key,
+    )
@@ -10,9 +10,9 @@ import matplotlib as plt
 import scipy.stats
 from scipy.stats import norm
 from ml_lib.feature_store import configure_offline_feature_store
-from ml_lib.feature_store.offline.client import FeatureStoreOfflineClient
 
 from ab_testing.constants import target_col, client_name
+from ab_testing_evaluation.query_cache import QueryCache
 from ab_testing.data_acquisition.acquire_data import queries_dict  # AcquireData
 from ab_testing.predictions.produce_predictions import ProducePredictions
 from ab_testing.distribution_fit.fit_distribution import FitDistribution
@@ -62,13 +62,19 @@ spend_default = "personalised"
 
 configure_offline_feature_store(workgroup="development", catalog_name="production")
 
+
+@st.experimental_singleton
+def get_query_cache() -> QueryCache:
+    # one cache for all reruns of the app, so that its metrics are kept
+    return QueryCache(ttl=12 * 60 * 60)
+
+
+# reruns of the app and repeated inputs reuse results of the same queries
+query_cache = get_query_cache()
+
 if client_name:
-    initial_data = FeatureStoreOfflineClient.run_athena_query_pandas(
-        queries_dict[client_name + "_sample"]
-    )
-    data_date_limits = FeatureStoreOfflineClient.run_athena_query_pandas(
-        queries_dict[client_name + "_date_limits"]
-    )
+    initial_data = query_cache(queries_dict[client_name + "_sample"])
+    data_date_limits = query_cache(queries_dict[client_name + "_date_limits"])
 
     st.markdown("### Data Preview")
     st.dataframe(initial_data.head())
@@ -174,7 +180,7 @@ if client_name:
             spend_type = 0
         elif spend_type[0] == "non-personalised":
             spend_type = 1
-        initial_data = FeatureStoreOfflineClient.run_athena_query_pandas(
+        initial_data = query_cache(
             queries_dict[client_name],
             {
                 "strt_date": str(start_date)[0:10],